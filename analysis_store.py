@@ -0,0 +1,142 @@
+"""
+Armazenamento de análises compartilhado por todas as sessões do processo.
+
+Os resultados são guardados por chave (hash de conteúdo do ZIP, parte da
+análise): duas sessões que enviam o mesmo projeto reutilizam o mesmo
+resultado e cada sessão guarda só o hash. Cálculos simultâneos da mesma chave
+rodam uma única vez (os demais threads esperam o resultado) e o total em
+memória fica limitado a STORE_MAX_BYTES, descartando por LRU.
+
+O tamanho de cada valor é estimado quando ele é guardado: valores guardados
+não devem ser alterados depois (o que for derivado deles vai em outra chave).
+
+Não depende de Streamlit. Tamanho máximo configurável pela variável de
+ambiente SMI_STORE_MAX_MB (padrão: 1024).
+"""
+import logging
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+STORE_MAX_BYTES = int(os.environ.get("SMI_STORE_MAX_MB", "1024")) * 1024 * 1024  # Excedente é removido por LRU
+
+_lock = threading.Lock()
+_entries = OrderedDict()  # chave -> (valor, bytes estimados), do menos ao mais recente
+_inflight = {}  # chave -> threading.Event do cálculo em andamento
+_total_bytes = 0
+_logger = logging.getLogger(__name__)
+
+def estimate_size(value):
+    """
+    Approximate memory footprint of value in bytes: DataFrames and arrays by
+    their buffers, containers recursively. Objects shared between parts of the
+    value are counted once; other objects (callables etc.) by sys.getsizeof.
+    """
+    vistos = set()
+    pendentes = [value]
+    total = 0
+    while pendentes:
+        obj = pendentes.pop()
+        if id(obj) in vistos:
+            continue
+        vistos.add(id(obj))
+        if isinstance(obj, (pd.DataFrame, pd.Series, pd.Index)):
+            uso = obj.memory_usage(deep=True)
+            total += int(uso.sum()) if isinstance(uso, pd.Series) else int(uso)
+        elif isinstance(obj, np.ndarray):
+            total += obj.nbytes
+            if obj.dtype == object:
+                pendentes.extend(obj.ravel().tolist())
+        elif isinstance(obj, dict):
+            total += sys.getsizeof(obj)
+            pendentes.extend(obj.keys())
+            pendentes.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            total += sys.getsizeof(obj)
+            pendentes.extend(obj)
+        else:
+            total += sys.getsizeof(obj)
+    return total
+
+def _evict_locked(max_bytes):
+    global _total_bytes
+    while _entries and _total_bytes > max_bytes:
+        _, (_, tamanho) = _entries.popitem(last=False)
+        _total_bytes -= tamanho
+
+def _put_locked(chave, valor, tamanho):
+    global _total_bytes
+    if chave in _entries:
+        _total_bytes -= _entries.pop(chave)[1]
+    # Maior que o limite inteiro: não guarda (esvaziaria o armazenamento por nada)
+    if tamanho > STORE_MAX_BYTES:
+        _logger.warning(
+            "analysis_store: %s (%.1f MB) excede SMI_STORE_MAX_MB (%.1f MB) e não foi guardado",
+            chave, tamanho / 2**20, STORE_MAX_BYTES / 2**20
+        )
+        return
+    _entries[chave] = (valor, tamanho)
+    _total_bytes += tamanho
+    _evict_locked(STORE_MAX_BYTES)
+
+def get(chave, default=None):
+    """Stored value of chave (marked as recently used), or default."""
+    with _lock:
+        entrada = _entries.get(chave)
+        if entrada is None:
+            return default
+        _entries.move_to_end(chave)
+        return entrada[0]
+
+def put(chave, valor):
+    """Store valor under chave, evicting least recently used entries past STORE_MAX_BYTES."""
+    tamanho = estimate_size(valor)
+    with _lock:
+        _put_locked(chave, valor, tamanho)
+
+def get_or_compute(chave, func, *args):
+    """
+    Stored value of chave, computing func(*args) on a miss (single-flight).
+
+    While one thread computes a key, other threads asking for it wait and get
+    the same result instead of recomputing. Errors are not stored: if the
+    computing thread fails, a waiting thread computes the key itself. The
+    size is estimated once, when the value is stored, so callers must not
+    modify the returned value.
+    """
+    while True:
+        with _lock:
+            entrada = _entries.get(chave)
+            if entrada is not None:
+                _entries.move_to_end(chave)
+                return entrada[0]
+            pendente = _inflight.get(chave)
+            if pendente is None:
+                _inflight[chave] = threading.Event()
+                break
+        pendente.wait()
+
+    # Este thread calcula; o lock não é mantido durante o cálculo
+    try:
+        valor = func(*args)
+        tamanho = estimate_size(valor)
+        with _lock:
+            _put_locked(chave, valor, tamanho)
+        return valor
+    finally:
+        with _lock:
+            _inflight.pop(chave).set()
+
+def evict(max_bytes=None):
+    """Drop least recently used entries until the store fits in max_bytes (default STORE_MAX_BYTES)."""
+    with _lock:
+        _evict_locked(STORE_MAX_BYTES if max_bytes is None else max_bytes)
+
+def store_stats():
+    """Number of entries and estimated bytes currently stored."""
+    with _lock:
+        return {'entradas': len(_entries), 'bytes': _total_bytes}
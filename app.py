@@ -1,19 +1,29 @@
 import streamlit as st
 import pandas as pd
-import networkx as nx
-from pyvis.network import Network
-import tempfile
-import os
+import numpy as np
 import json
+import hashlib
 import streamlit.components.v1 as components
 import zipfile
-import re
-from pathlib import Path
-import plotly.express as px
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from openpyxl.utils.dataframe import dataframe_to_rows
-from io import BytesIO
+from collections import OrderedDict
+from functools import partial
+# plotly, pyvis/networkx e openpyxl são importados só quando o recurso é usado
+from engine import (
+    adjacent_nodes, build_adjacency_index, build_dependency_store, build_info_map,
+    build_page_index, build_page_stats, build_reachability_index, build_structure_dataframe,
+    calcular_complexity_scores, collapse_by_group, count_measure_dependents, dependency_edges_frame, diff_models, downstream_of, find_orphan_measures,
+    layered_layout, pages_using, read_pbip_zip, top_impact_measures, traverse_dependencies, upstream_of
+)
+from reports import gerar_relatorio_excel, gerar_relatorio_texto
+import analysis_store
+
+# Grafo com mais nós que isso abre agrupado por tabela/pasta (nível de detalhe);
+# aproximar o zoom além de GRAFO_LOD_ESCALA abre os grupos visíveis
+GRAFO_LOD_MIN_NOS = 300
+GRAFO_LOD_ESCALA = 0.5
+# HTML dos grafos já renderizados, por sessão (LRU limitado em quantidade e tamanho)
+GRAFO_HTML_CACHE_MAX = 16
+GRAFO_HTML_CACHE_MAX_BYTES = 64 * 1024 * 1024
 
 # --- CONFIGURAÇÃO DA PÁGINA ---
 st.set_page_config(layout="wide", page_title="Semantic Model Insights")
@@ -123,596 +133,108 @@ st.markdown("""
 
 st.title("Semantic Model Insights: Alta Performance & Governança DAX")
 
-# --- FUNÇÕES AUXILIARES ---
-def limpar_dax(texto):
-    if pd.isnull(texto) or texto == "None":
-        return ""
-    return str(texto).replace("_x000D_", "").strip()
-
-# --- FUNÇÕES DE PARSING TMDL OTIMIZADAS ---
-# Compilar regex patterns uma vez (muito mais rápido)
-_MEASURE_PATTERN = re.compile(r"measure\s+['\"]?([^'\"=]+)['\"]?\s*=\s*(.*)")
-_BRACKET_PATTERN = re.compile(r'\[([^\]]+)\]')
-_COLUMN_PATTERN = re.compile(r"'?([A-Za-z_][A-Za-z0-9_ ]*)'?\[([^\]]+)\]")
-_PROPERTY_KEYWORDS = frozenset(['formatString', 'displayFolder', 'lineageTag', 
-                                'annotation', 'dataCategory', 'isHidden',
-                                'sourceLineageTag', 'changedProperty',
-                                'formatStringDefinition'])
-
-@st.cache_data(show_spinner=False)
-def parse_tmdl_file_cached(filepath_str):
-    """
-    Parse a TMDL file (CACHED for speed).
-    Returns a list of dicts with 'name' and 'expression' keys.
-    """
-    measures = []
-    
-    with open(filepath_str, 'r', encoding='utf-8') as f:
-        lines = f.readlines()  # Ler direto em lista é mais rápido
-    
-    i = 0
-    n_lines = len(lines)
-    
-    while i < n_lines:
-        line = lines[i].strip()
-        
-        if line.startswith('measure '):
-            measure_match = _MEASURE_PATTERN.match(line)
-            
-            if measure_match:
-                measure_name = measure_match.group(1).strip()
-                rest_of_line = measure_match.group(2).strip()
-                
-                if rest_of_line.startswith('```'):
-                    # Multi-line expression
-                    expression_lines = []
-                    i += 1
-                    while i < n_lines and lines[i].strip() != '```':
-                        expression_lines.append(lines[i])
-                        i += 1
-                    expression = ''.join(expression_lines).strip()  # join é mais rápido que \n.join
-                else:
-                    # Single-line expression
-                    expression_lines = [rest_of_line]
-                    i += 1
-                    while i < n_lines:
-                        next_line = lines[i]
-                        stripped = next_line.strip()
-                        
-                        if stripped and not next_line.startswith('\t'):
-                            break
-                        # Usar any() com generator é mais rápido
-                        if any(stripped.startswith(kw) for kw in _PROPERTY_KEYWORDS):
-                            break
-                        
-                        expression_lines.append(next_line)
-                        i += 1
-                    expression = ''.join(expression_lines).strip()
-                    i -= 1
-                
-                measures.append((measure_name, expression))  # Tuple é mais rápido que dict
-        
-        i += 1
-    
-    return measures
-
-def find_measure_references_fast(expression, all_measure_names_set):
-    """
-    Find measure references (OPTIMIZED with set lookups).
-    Ignora referências em comentários (// ou --).
-    """
-    # Remover comentários antes de buscar referências
-    lines = expression.split('\n')
-    clean_lines = []
-    for line in lines:
-        # Remover comentários // e --
-        if '//' in line:
-            line = line.split('//')[0]
-        if '--' in line:
-            line = line.split('--')[0]
-        clean_lines.append(line)
-    
-    clean_expression = '\n'.join(clean_lines)
-    matches = _BRACKET_PATTERN.findall(clean_expression)
-    return [m.strip() for m in matches if m.strip() in all_measure_names_set]
-
-def find_column_references(expression):
-    """
-    Find column references in Table[Column] format.
-    Returns list of tuples: (table_name, column_name)
-    """
-    matches = _COLUMN_PATTERN.findall(expression)
-    return [(table.strip(), col.strip()) for table, col in matches]
+def _guardar_html_grafo(cache, chave, html):
+    """Store a rendered graph in the session LRU, evicting the least recently used views."""
+    cache[chave] = html
+    while len(cache) > GRAFO_HTML_CACHE_MAX or (len(cache) > 1 and sum(map(len, cache.values())) > GRAFO_HTML_CACHE_MAX_BYTES):
+        cache.popitem(last=False)
 
-@st.cache_data(show_spinner=False, ttl=3600)
-def build_dependency_dataframe(tmdl_folder_path):
+def _analisar_projeto(arquivo, anterior, complexidade_anterior):
     """
-    Build dependency DataFrame (CACHED and OPTIMIZED).
+    Analyze an uploaded PBIP ZIP (shared by sessions through analysis_store).
+    anterior / complexidade_anterior: analysis and scores of the previous
+    version from the same session, or None; their memos make the analysis
+    incremental and the adjacency index is reused when the graph did not change.
     """
-    tmdl_files = list(Path(tmdl_folder_path).glob('*.tmdl'))
-    
-    if not tmdl_files:
-        return None
-    
-    # Processar em batch - dict comprehension é mais rápido
-    all_measures_list = []
-    for tmdl_file in tmdl_files:
-        measures = parse_tmdl_file_cached(str(tmdl_file))  # Cache hit depois da primeira vez
-        all_measures_list.extend(measures)
-    
-    # Criar dict uma vez
-    all_measures = dict(all_measures_list)
-    all_measure_names = frozenset(all_measures.keys())  # frozenset é mais rápido para lookup
-    
-    # Criar dependências em batch
-    dependencies = []
-    
-    # 1. Dependências de MEASURE para MEASURE
-    for measure_name, expression in all_measures.items():
-        # Referências a outras medidas
-        for ref in find_measure_references_fast(expression, all_measure_names):
-            dependencies.append({
-                '[Tipo Origem]': 'MEASURE',
-                '[Origem]': ref,
-                '[Expressão Origem]': all_measures[ref],
-                '[Tipo Destino]': 'MEASURE',
-                '[Destino]': measure_name,
-                '[Expressão Destino]': expression
-            })
-        
-        # 2. Referências a colunas (Table[Column])
-        for table_name, column_name in find_column_references(expression):
-            col_full_name = f"{table_name}[{column_name}]"
-            dependencies.append({
-                '[Tipo Origem]': 'COLUMN',
-                '[Origem]': col_full_name,
-                '[Expressão Origem]': '',
-                '[Tipo Destino]': 'MEASURE',
-                '[Destino]': measure_name,
-                '[Expressão Destino]': expression
-            })
-    
-    if not dependencies:
-        return None
-    
-    # Criar DataFrame direto é mais rápido que append
-    return pd.DataFrame(dependencies)
-
+    # Cópia rasa: o engine substitui (não altera) as seções do memo, o da versão anterior fica intacto
+    memo = dict(anterior['memo']) if anterior is not None else {}
+    if complexidade_anterior is not None:
+        memo['score'] = complexidade_anterior['score_memo']
+    with zipfile.ZipFile(arquivo, 'r') as zip_ref:
+        projeto = read_pbip_zip(zip_ref)
+    if projeto['tmdl'] is None:
+        return {'erro': "❌ Não foi possível encontrar a pasta `.SemanticModel/definition/tables` no ZIP."}
+
+    store = build_dependency_store(projeto['tmdl'], memo=memo)
+    df = dependency_edges_frame(*store) if store is not None else None
+    if df is None or df.empty:
+        return {'erro': "❌ Nenhuma medida ou dependência encontrada."}
+    nodes, edges = store
+
+    # Mesmo grafo da versão anterior (ex.: só visuais ou fórmulas sem novas referências):
+    # índices de adjacência e alcançabilidade continuam válidos
+    mesmo_grafo = (
+        anterior is not None
+        and nodes[['name', 'type']].equals(anterior['nodes'][['name', 'type']])
+        and edges.equals(anterior['edges'])
+    )
+    df_st = build_structure_dataframe(projeto['report'], memo=memo) if projeto['report'] is not None else None
+    return {
+        'erro': None,
+        'df': df,
+        'nodes': nodes,
+        'edges': edges,
+        'adjacency': anterior['adjacency'] if mesmo_grafo else build_adjacency_index(nodes, edges),
+        'page_index': build_page_index(df_st) if df_st is not None else None,
+        'memo': memo
+    }
 
-def calcular_complexity_score(expressao, nome_medida="", medidas_dependentes=0):
+def _calcular_complexidade(nodes, edges, info_map, memo):
     """
-    Calcula Complexity  Score (0-100) com 5 dimensões baseado em SQLBI + Microsoft Learn.
-    
-    Dimensões:
-    - D1: Funções (SUMX, RANKX, FILTER, etc)
-    - D2: CALCULATE e contexto
-    - D3: Estrutura (linhas, VAR, comentários)
-    - D4: Dependências
-    - D5: Anti-patterns
-    
-    Returns:
-        (score, classificacao, detalhes)
+    Complexity scores of every measure and dependent counts (shared by both menus).
+    The score memo goes in the result, not in memo (stored values are not modified).
     """
-    import re
-    
-    if not expressao or expressao == "":
-        return 0, "🟢 Simples", []
-    
-    score = 0
-    detalhes = []
-    
-    # === D1: FUNÇÕES (Peso Alto) ===
-    funcoes_peso = {
-        'SUMX': 8, 'AVERAGEX': 8, 'MINX': 8, 'MAXX': 8,
-        'RANKX': 12,
-        'FILTER': 10,
-        'ADDCOLUMNS': 10,
-        'SUMMARIZE': 12, 'SUMMARIZECOLUMNS': 12,
-        'GENERATE': 15,
-        'EARLIER': 20,
-        'PATH': 8, 'CONTAINSROW': 8
+    global_dependentes_count = count_measure_dependents(nodes, edges)
+    memo_score = {'score': memo.get('score', {})}
+    df_complexidade = calcular_complexity_scores(
+        ((nome_medida, info.get("exp", "")) for nome_medida, info in info_map.items() if info.get("tipo") == "MEASURE"),
+        global_dependentes_count,
+        memo=memo_score
+    )
+    return {
+        'global_dependentes_count': global_dependentes_count,
+        'df_complexidade': df_complexidade,
+        'score_memo': memo_score['score']
     }
-    
-    for func, penalty in funcoes_peso.items():
-        count = expressao.upper().count(func)
-        if count > 0:
-            score += count * penalty
-            detalhes.append(f"D1: {func} ({count}x) = +{count * penalty}")
-    
-    # === D2: CALCULATE E CONTEXTO ===
-    calculate_count = expressao.upper().count('CALCULATE')
-    if calculate_count > 0:
-        score += calculate_count * 5
-        detalhes.append(f"D2: CALCULATE ({calculate_count}x) = +{calculate_count * 5}")
-    
-    # Múltiplos filtros em CALCULATE
-    calc_pattern = r'CALCULATE\s*\([^,]+,([^)]+)\)'
-    for match in re.findall(calc_pattern, expressao, re.IGNORECASE):
-        filters = match.count(',') + 1
-        if filters > 1:
-            penalty = (filters - 1) * 3
-            score += penalty
-            detalhes.append(f"D2: CALCULATE c/ {filters} filtros = +{penalty}")
-    
-    # ALL, ALLEXCEPT, REMOVEFILTERS
-    context_funcs = {'ALL': 6, 'ALLEXCEPT': 6, 'REMOVEFILTERS': 6, 'KEEPFILTERS': 3}
-    for func, penalty in context_funcs.items():
-        count = expressao.upper().count(func)
-        if count > 0:
-            score += count * penalty
-            detalhes.append(f"D2: {func} ({count}x) = +{count * penalty}")
-    
-    # === D3: ESTRUTURA ===
-    linhas = expressao.count('\n') + 1
-    if linhas > 20:
-        # +10 para passar de 20, +5 a cada 20 linhas adicionais
-        linhas_extras = linhas - 20
-        blocos_extras = linhas_extras // 20
-        penalty = 10 + (blocos_extras * 5)
-        score += penalty
-        detalhes.append(f"D3: >20 linhas ({linhas}) = +{penalty}")
-    elif linhas > 10:
-        score += 5
-        detalhes.append(f"D3: >10 linhas ({linhas}) = +5")
-    
-    # Bônus: VAR
-    if 'VAR' in expressao.upper():
-        var_count = expressao.upper().count('VAR')
-        bonus = var_count * 5
-        score -= bonus
-        detalhes.append(f"D3: VAR ({var_count}x) = -{bonus} (bônus)")
-    
-    # Bônus: Comentários
-    comentarios = expressao.count('--') + expressao.count('//')
-    if comentarios > 0:
-        bonus = min(comentarios * 2, 10)
-        score -= bonus
-        detalhes.append(f"D3: Comentários ({comentarios}) = -{bonus} (bônus)")
-    
-    # === D4: DEPENDÊNCIAS ===
-    if medidas_dependentes > 0:
-        penalty = medidas_dependentes * 4
-        score += penalty
-        detalhes.append(f"D4: {medidas_dependentes} dependentes = +{penalty}")
-    
-    # === D5: ANTI-PATTERNS ===
-    if re.search(r'FILTER\s*\(\s*ALL\s*\(', expressao, re.IGNORECASE):
-        score += 20
-        detalhes.append("D5: FILTER(ALL(Tabela)) = +20")
-    
-    if 'DATE' in expressao.upper() and not any(x in expressao.upper() for x in ['SAMEPERIODLASTYEAR', 'DATESYTD', 'TOTALYTD', 'DATEADD']):
-        score += 8
-        detalhes.append("D5: Time intelligence manual = +8")
-    
-    # === CLASSIFICAÇÃO ===
-    final_score = min(100, max(0, score))
-    
-    if final_score <= 20:
-        classificacao = "🟢 Simples"
-    elif final_score <= 40:
-        classificacao = "🟡 Moderada"
-    elif final_score <= 60:
-        classificacao = "🟠 Complexa"
-    elif final_score <= 80:
-        classificacao = "🔴 Muito Complexa"
-    else:
-        classificacao = "⚫ Crítica"
-    
-    return final_score, classificacao, detalhes
 
+def _analise_global(nodes, edges, page_index, reachability):
+    """Safe-to-delete candidates and top impact measures of the Global dashboard."""
+    # Medidas em visuais
+    medidas_em_visuais = set(page_index['medidas']) if page_index is not None else set()
+    return {
+        # Candidatas = medidas (incluindo isoladas) que NÃO são usadas por outras E NÃO estão em visuais
+        'candidatas_descarte': find_orphan_measures(nodes, edges, medidas_em_visuais),
+        # Top 10 mais impactantes (contagens do índice de alcançabilidade)
+        'top_impacto': top_impact_measures(nodes, edges, reachability),
+        'medidas_em_visuais': medidas_em_visuais
+    }
 
-def gerar_relatorio_texto(metricas, medidas_orfas, medidas_impacto, top_complexas=None, df_structure=None):
-    """Gera relatório em texto para download (MELHORIA 24)"""
-    
-    # Formatar lista de medidas complexas
-    secao_complexidade = ""
-    if top_complexas:
-        lista_formatada = chr(10).join(f"  • {m['medida']} (Score: {m['score']} - {m['classificacao']})" for m in top_complexas[:10])
-        secao_complexidade = f"""
-🔥 TOP 10 MEDIDAS MAIS COMPLEXAS (CRÍTICAS)
-────────────────────────────────────────────────────────────
-{lista_formatada}
-"""
-
-    # Formatar lista de medidas por página
-    secao_paginas = ""
-    if df_structure is not None:
-        paginas_info = []
-        todas_paginas = df_structure['Página'].unique().tolist()
-        for pagina in sorted(todas_paginas):
-            mask = df_structure['Página'] == pagina
-            medidas_na_pagina = set()
-            for m_list in df_structure[mask]['Medidas'].dropna():
-                # Assumindo que 'Medidas' é uma string com medidas separadas por vírgula ou similar
-                # mas baseado no código anterior, parece que fazemos .str.contains
-                # Se for o CSV do pbi_structure_analysis, a coluna Medidas contém as medidas do visual
-                for m in m_list.split(','):
-                    medidas_na_pagina.add(m.strip())
-            
-            if medidas_na_pagina:
-                lista_medidas = chr(10).join(f"    - {m}" for m in sorted(list(medidas_na_pagina)) if m)
-                paginas_info.append(f"📄 Página: {pagina}\n{lista_medidas}")
-        
-        if paginas_info:
-            secao_paginas = f"""
-📑 MEDIDAS POR PÁGINA
-────────────────────────────────────────────────────────────
-{chr(10).join(paginas_info)}
-"""
-
-    relatorio = f"""═══════════════════════════════════════════════════════════
-            RELATÓRIO DE DEPENDÊNCIAS DAX - POWER BI
-═══════════════════════════════════════════════════════════
-
-📊 MÉTRICAS GERAIS
-────────────────────────────────────────────────────────────
-Objetos no Modelo: {metricas.get('objetos', 0)}
-Nós no Grafo: {metricas.get('nos', 0)}
-Relacionamentos: {metricas.get('relacionamentos', 0)}
-Medidas para Descarte: {metricas.get('orfas', 0)}
-Impacto Total: {metricas.get('impacto', 0)}
-{secao_complexidade}{secao_paginas}
-⚠️ SUGESTÃO DE DESCARTE SEGURO ({len(medidas_orfas)})
-────────────────────────────────────────────────────────────
-O que são estas Medidas?
-Estas medidas foram identificadas como candidatas a descarte pois:
-1. NÃO são referenciadas por nenhuma outra medida (DAX).
-2. NÃO foram encontradas em nenhum visual ou página do relatório.
-
-Lista de Medidas para Descarte:
-{chr(10).join(f"  • {m}" for m in sorted(list(medidas_orfas))) if medidas_orfas else "  Nenhuma medida desnecessária encontrada!"}
-
-📊 ANÁLISE DE IMPACTO
-────────────────────────────────────────────────────────────
-{chr(10).join(f"  • {m['medida']}: {m['impacto']} objetos dependentes" for m in medidas_impacto) if medidas_impacto else "  Nenhuma medida selecionada"}
-
-═══════════════════════════════════════════════════════════
-Relatório gerado automaticamente
-═══════════════════════════════════════════════════════════
-"""
-    return relatorio
-
-def gerar_relatorio_excel(metricas, todas_medidas_complexas, candidatas_descarte, df_st, global_dependentes_count, info_map):
-    """
-    Gera relatório Excel profissional com múltiplas abas formatadas.
-    """
-    output = BytesIO()
-    wb = Workbook()
-    
-    # Estilos reutilizáveis
-    header_fill = PatternFill(start_color="2E5090", end_color="2E5090", fill_type="solid")
-    header_font = Font(bold=True, color="FFFFFF", size=12, name='Segoe UI')
-    cell_font = Font(size=10, name='Segoe UI')
-    thin_border = Border(
-        left=Side(style='thin', color='D0D0D0'),
-        right=Side(style='thin', color='D0D0D0'),
-        top=Side(style='thin', color='D0D0D0'),
-        bottom=Side(style='thin', color='D0D0D0')
+def _relatorios_globais(model_hash, metr_exp, candidatas_descarte, top_impacto, df_complexidade, page_index, page_stats, global_dependentes_count, info_map):
+    """TXT report and the on-demand Excel callable of the Global dashboard."""
+    relatorios = {
+        'txt': gerar_relatorio_texto(metr_exp, candidatas_descarte, top_impacto, df_complexidade, page_index, page_stats)
+    }
+    # Excel gerado só no clique do download (callable do Streamlit, em outra thread),
+    # em chave própria do armazenamento
+    relatorios['excel_fn'] = partial(
+        analysis_store.get_or_compute, (model_hash, 'excel'), gerar_relatorio_excel,
+        metr_exp, df_complexidade, candidatas_descarte, page_stats, global_dependentes_count, info_map
     )
-    center_align = Alignment(horizontal='center', vertical='center')
-    
-    # === ABA 1: RESUMO EXECUTIVO ===
-    ws_resumo = wb.active
-    ws_resumo.title = "📊 Resumo Executivo"
-    
-    # Título principal
-    ws_resumo['A1'] = "ANÁLISE DE DEPENDÊNCIAS DAX - POWER BI"
-    ws_resumo['A1'].font = Font(bold=True, size=16, color="2E5090", name='Segoe UI')
-    ws_resumo.merge_cells('A1:D1')
-    ws_resumo['A1'].alignment = center_align
-    ws_resumo.row_dimensions[1].height = 30
-    
-    # Métricas principais
-    ws_resumo['A3'] = "MÉTRICAS GERAIS"
-    ws_resumo['A3'].font = Font(bold=True, size=12, color="2E5090", name='Segoe UI')
-    ws_resumo.merge_cells('A3:D3')
-    
-    metrics_data = [
-        ['Métrica', 'Valor', 'Descrição'],
-        ['Objetos no Modelo', metricas.get('objetos', 0), 'Total de medidas, colunas e tabelas'],
-        ['Relacionamentos', metricas.get('relacionamentos', 0), 'Dependências DAX mapeadas'],
-        ['Medidas para Descarte', metricas.get('orfas', 0), 'Não usadas em fórmulas ou visuais'],
-        ['Complexidade Média', f"{round(sum(m['score'] for m in todas_medidas_complexas) / len(todas_medidas_complexas), 1) if todas_medidas_complexas else 0}/100", 'Score médio de todas as medidas']
-    ]
-    
-    for row_idx, row_data in enumerate(metrics_data, start=4):
-        for col_idx, value in enumerate(row_data, start=1):
-            cell = ws_resumo.cell(row=row_idx, column=col_idx, value=value)
-            cell.font = header_font if row_idx == 4 else cell_font
-            cell.fill = header_fill if row_idx == 4 else PatternFill()
-            cell.border = thin_border
-            cell.alignment = center_align if col_idx == 2 or row_idx == 4 else Alignment(vertical='center')
-    
-    # Auto-width
-    ws_resumo.column_dimensions['A'].width = 30
-    ws_resumo.column_dimensions['B'].width = 20
-    ws_resumo.column_dimensions['C'].width = 50
-    
-    # === ABA 2: RANKING DE COMPLEXIDADE ===
-    ws_complex = wb.create_sheet("🔥 Complexidade")
-    
-    df_complex = pd.DataFrame(todas_medidas_complexas).sort_values('score', ascending=False)
-    
-    # Escrever cabeçalho
-    headers = ['Posição', 'Medida', 'Score', 'Classificação']
-    for col_idx, header in enumerate(headers, start=1):
-        cell = ws_complex.cell(row=1, column=col_idx, value=header)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.border = thin_border
-        cell.alignment = center_align
-    
-    # Escrever dados
-    for row_idx, (idx, row) in enumerate(df_complex.iterrows(), start=2):
-        ws_complex.cell(row=row_idx, column=1, value=row_idx - 1).alignment = center_align
-        ws_complex.cell(row=row_idx, column=2, value=row['medida'])
-        ws_complex.cell(row=row_idx, column=3, value=row['score']).alignment = center_align
-        # Remover emojis da classificação (apenas texto)
-        classificacao_texto = row['classificacao'].split(' ')[-1] if ' ' in row['classificacao'] else row['classificacao']
-        ws_complex.cell(row=row_idx, column=4, value=classificacao_texto).alignment = center_align
-        
-        # Formatação condicional por score
-        score_val = row['score']
-        if score_val >= 80:
-            color = "FF4444"  # Vermelho
-        elif score_val >= 60:
-            color = "FF9800"  # Laranja
-        elif score_val >= 40:
-            color = "FFC107"  # Amarelo
-        else:
-            color = "4CAF50"  # Verde
-        
-        for col in range(1, 5):
-            cell = ws_complex.cell(row=row_idx, column=col)
-            cell.font = cell_font
-            cell.border = thin_border
-            if col == 3:
-                cell.fill = PatternFill(start_color=color, end_color=color, fill_type="solid")
-                cell.font = Font(bold=True, color="FFFFFF", size=10, name='Segoe UI')
-    
-    ws_complex.column_dimensions['A'].width = 12
-    ws_complex.column_dimensions['B'].width = 45
-    ws_complex.column_dimensions['C'].width = 15
-    ws_complex.column_dimensions['D'].width = 20
-    
-    # === ABA 3: DESCARTE SEGURO ===
-    ws_trash = wb.create_sheet("🗑️ Descarte Seguro")
-    
-    score_map = {m['medida']: m['score'] for m in todas_medidas_complexas}
-    trash_data = sorted(
-        [{'Medida': m, 'Score': score_map.get(m, 0)} for m in candidatas_descarte],
-        key=lambda x: x['Score'],
-        reverse=True
+    return relatorios
+
+def _comparar_versoes(arquivo_anterior, nodes, edges, page_index):
+    """Diff between the ZIP of a previous version and the current model (None if it has no measures)."""
+    with zipfile.ZipFile(arquivo_anterior, 'r') as zip_ref:
+        projeto_anterior = read_pbip_zip(zip_ref)
+    store_anterior = build_dependency_store(projeto_anterior['tmdl']) if projeto_anterior['tmdl'] is not None else None
+    if store_anterior is None:
+        return None
+    df_st_anterior = build_structure_dataframe(projeto_anterior['report']) if projeto_anterior['report'] is not None else None
+    return diff_models(
+        store_anterior, (nodes, edges),
+        build_page_index(df_st_anterior) if df_st_anterior is not None else None,
+        page_index
     )
-    
-    headers = ['Medida', 'Complexidade', 'Status']
-    for col_idx, header in enumerate(headers, start=1):
-        cell = ws_trash.cell(row=1, column=col_idx, value=header)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.border = thin_border
-        cell.alignment = center_align
-    
-    for row_idx, item in enumerate(trash_data, start=2):
-        ws_trash.cell(row=row_idx, column=1, value=item['Medida'])
-        ws_trash.cell(row=row_idx, column=2, value=item['Score']).alignment = center_align
-        ws_trash.cell(row=row_idx, column=3, value='✅ Seguro para deletar').alignment = center_align
-        
-        for col in range(1, 4):
-            cell = ws_trash.cell(row=row_idx, column=col)
-            cell.font = cell_font
-            cell.border = thin_border
-    
-    ws_trash.column_dimensions['A'].width = 50
-    ws_trash.column_dimensions['B'].width = 15
-    ws_trash.column_dimensions['C'].width = 25
-    
-    # === ABA 4: MEDIDAS POR PÁGINA ===
-    if df_st is not None:
-        ws_pages = wb.create_sheet("📄 Por Página")
-        
-        # Processar dados
-        page_data = []
-        for page in sorted(df_st['Página'].unique()):
-            medidas_page = set()
-            for _, row in df_st[df_st['Página'] == page].iterrows():
-                m_raw = str(row['Medidas'])
-                if m_raw and m_raw != 'nan':
-                    for m in m_raw.split(','):
-                        if m.strip():
-                            medidas_page.add(m.strip())
-            
-            if medidas_page:
-                scores = [score_map.get(m, 0) for m in medidas_page]
-                avg_complexity = round(sum(scores) / len(scores), 1) if scores else 0
-                page_data.append({
-                    'Página': page,
-                    'Total Medidas': len(medidas_page),
-                    'Complexidade Média': avg_complexity
-                })
-        
-        headers = ['Página', 'Total de Medidas', 'Complexidade Média']
-        for col_idx, header in enumerate(headers, start=1):
-            cell = ws_pages.cell(row=1, column=col_idx, value=header)
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.border = thin_border
-            cell.alignment = center_align
-        
-        for row_idx, item in enumerate(page_data, start=2):
-            ws_pages.cell(row=row_idx, column=1, value=item['Página'])
-            ws_pages.cell(row=row_idx, column=2, value=item['Total Medidas']).alignment = center_align
-            ws_pages.cell(row=row_idx, column=3, value=item['Complexidade Média']).alignment = center_align
-            
-            for col in range(1, 4):
-                cell = ws_pages.cell(row=row_idx, column=col)
-                cell.font = cell_font
-                cell.border = thin_border
-        
-        ws_pages.column_dimensions['A'].width = 40
-        ws_pages.column_dimensions['B'].width = 20
-        ws_pages.column_dimensions['C'].width = 22
-    
-    # === ABA 5: TOP DEPENDÊNCIAS ===
-    ws_deps = wb.create_sheet("🔗 Top Dependências")
-    
-    deps_data = sorted(
-        [{'Medida': m, 'Dependentes': global_dependentes_count.get(m, 0)} 
-         for m in info_map.keys() if info_map[m].get('tipo') == 'MEASURE'],
-        key=lambda x: x['Dependentes'],
-        reverse=True
-    )[:50]  # Top 50
-    
-    headers = ['Posição', 'Medida', 'Nº de Dependentes', 'Impacto']
-    for col_idx, header in enumerate(headers, start=1):
-        cell = ws_deps.cell(row=1, column=col_idx, value=header)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.border = thin_border
-        cell.alignment = center_align
-    
-    for row_idx, item in enumerate(deps_data, start=2):
-        ws_deps.cell(row=row_idx, column=1, value=row_idx - 1).alignment = center_align
-        ws_deps.cell(row=row_idx, column=2, value=item['Medida'])
-        ws_deps.cell(row=row_idx, column=3, value=item['Dependentes']).alignment = center_align
-        
-        # Classificar impacto
-        deps_count = item['Dependentes']
-        if deps_count >= 20:
-            impact = "🔴 Crítico"
-            color = "FF4444"
-        elif deps_count >= 10:
-            impact = "🟠 Alto"
-            color = "FF9800"
-        elif deps_count >= 5:
-            impact = "🟡 Médio"
-            color = "FFC107"
-        else:
-            impact = "🟢 Baixo"
-            color = "4CAF50"
-        
-        cell_impact = ws_deps.cell(row=row_idx, column=4, value=impact)
-        cell_impact.alignment = center_align
-        cell_impact.fill = PatternFill(start_color=color, end_color=color, fill_type="solid")
-        cell_impact.font = Font(bold=True, color="FFFFFF", size=10, name='Segoe UI')
-        
-        for col in range(1, 5):
-            ws_deps.cell(row=row_idx, column=col).font = cell_font
-            ws_deps.cell(row=row_idx, column=col).border = thin_border
-    
-    ws_deps.column_dimensions['A'].width = 12
-    ws_deps.column_dimensions['B'].width = 50
-    ws_deps.column_dimensions['C'].width = 20
-    ws_deps.column_dimensions['D'].width = 18
-    
-    # Desabilitar linhas de grade em todas as abas
-    for sheet in wb:
-        sheet.sheet_view.showGridLines = False
-    
-    # Salvar
-    wb.save(output)
-    output.seek(0)
-    return output.getvalue()
 
 # --- 1. SESSÃO DE INSTRUÇÕES E UPLOAD ---
 with st.expander("📖 Como usar este analisador?", expanded=False):
@@ -747,164 +269,69 @@ uploaded_file = st.file_uploader(
     help="Compacte a pasta do projeto PBIP e faça upload aqui"
 )
 
-# --- FUNÇÕES DE ESTRUTURA (REPORT) ---
-def extract_measures_from_query(query_obj):
-    measures = set()
-    def recursive_search(obj):
-        if isinstance(obj, dict):
-            if "Measure" in obj:
-                m = obj["Measure"]
-                if isinstance(m, dict) and "Property" in m: measures.add(m["Property"])
-            if "Aggregation" in obj:
-                agg = obj["Aggregation"]
-                if isinstance(agg, dict) and "Expression" in agg: recursive_search(agg["Expression"])
-            for value in obj.values(): recursive_search(value)
-        elif isinstance(obj, list):
-            for item in obj: recursive_search(item)
-    if query_obj: recursive_search(query_obj)
-    return sorted(list(measures))
-
-def extract_visual_info(visual_path):
-    try:
-        with open(visual_path, 'r', encoding='utf-8') as f: visual_data = json.load(f)
-        v_name = visual_data.get("name", "Unknown")
-        v_type = "Unknown"
-        if "visual" in visual_data and isinstance(visual_data["visual"], dict):
-            v_type = visual_data["visual"].get("visualType", "Unknown")
-        measures = []
-        if "visual" in visual_data and isinstance(visual_data["visual"], dict):
-            if "query" in visual_data["visual"]: measures = extract_measures_from_query(visual_data["visual"]["query"])
-            if "objects" in visual_data["visual"]: measures.extend(extract_measures_from_query(visual_data["visual"]["objects"]))
-            # Detectar medidas em formatação condicional
-            if "visualContainerObjects" in visual_data["visual"]: measures.extend(extract_measures_from_query(visual_data["visual"]["visualContainerObjects"]))
-            if "singleVisual" in visual_data["visual"]: measures.extend(extract_measures_from_query(visual_data["visual"]["singleVisual"]))
-        return {"visual_name": v_name, "visual_type": v_type, "measures": sorted(list(set(measures)))}
-    except: return None
-
-def build_structure_dataframe(report_folder):
-    pages_path = Path(report_folder) / "definition" / "pages"
-    if not pages_path.exists(): return None
-    results = []
-    for page_dir in sorted(pages_path.iterdir()):
-        if page_dir.is_dir():
-            p_json = page_dir / "page.json"
-            if p_json.exists():
-                try:
-                    with open(p_json, 'r', encoding='utf-8') as f: p_data = json.load(f)
-                    p_display = p_data.get("displayName", "Unknown")
-                    v_dir = page_dir / "visuals"
-                    if v_dir.exists() and v_dir.is_dir():
-                        for v_path in sorted(v_dir.iterdir()):
-                            if v_path.is_dir():
-                                v_json = v_path / "visual.json"
-                                if v_json.exists():
-                                    v_info = extract_visual_info(v_json)
-                                    if v_info: results.append({"Página": p_display, "Visual": v_info["visual_name"], "Medidas": ", ".join(v_info["measures"])})
-                    else:
-                        results.append({"Página": p_display, "Visual": "Nenhum visual", "Medidas": ""})
-                except: pass
-    return pd.DataFrame(results) if results else None
-
-
 if uploaded_file:
-    # Usar session_state para armazenar o DataFrame processado
-    file_key = f"{uploaded_file.name}_{uploaded_file.size}"
-    
-    if 'current_file_key' not in st.session_state or st.session_state.current_file_key != file_key:
+    # A análise fica no armazenamento do processo (analysis_store), pelo hash do
+    # conteúdo do ZIP: sessões com o mesmo projeto compartilham o resultado. A
+    # sessão guarda só o hash; uma parte descartada do armazenamento é recalculada
+    # (file_id muda a cada upload, mesmo que nome e tamanho se repitam)
+    file_key = uploaded_file.file_id
+    novo_upload = st.session_state.get('current_file_key') != file_key
+    if novo_upload:
         st.info("⏳ Processando arquivo ZIP...")
-        
-        with tempfile.TemporaryDirectory() as temp_dir:
-            try:
-                with zipfile.ZipFile(uploaded_file, 'r') as zip_ref:
-                    for member in zip_ref.namelist():
-                        # Ignora qualquer arquivo chamado cache.abf em qualquer subpasta
-                        if member.lower().endswith('cache.abf'):
-                            continue
-                        zip_ref.extract(member, temp_dir)
-                
-                # 1. Procurar Modelo Semântico (TMDL)
-                tmdl_folder = None
-                report_folder = None
-                for root, dirs, files in os.walk(temp_dir):
-                    if root.endswith(os.path.join('definition', 'tables')) or root.endswith('definition\\tables'):
-                        tmdl_folder = root
-                    if root.endswith('.Report') or root.endswith('.report'):
-                        report_folder = root
-                
-                if not tmdl_folder:
-                    st.error("❌ Não foi possível encontrar a pasta `.SemanticModel/definition/tables` no ZIP.")
-                    st.stop()
-                
-                # 2. Processar TMDL
-                with st.spinner("🔄 Analisando medidas e dependências..."):
-                    df = build_dependency_dataframe(tmdl_folder)
-                    
-                    # Ler TODAS as medidas do modelo (incluindo isoladas)
-                    tmdl_files = list(Path(tmdl_folder).glob('*.tmdl'))
-                    todas_medidas_modelo = set()
-                    for tmdl_file in tmdl_files:
-                        measures = parse_tmdl_file_cached(str(tmdl_file))
-                        for m in measures:
-                            todas_medidas_modelo.add(m[0])  # m é tupla (name, expression)
-                
-                if df is None or df.empty:
-                    st.error("❌ Nenhuma medida ou dependência encontrada.")
-                    st.stop()
-                
-                # 3. Processar Estrutura (Report)
-                df_st_new = None
-                if report_folder:
-                    with st.spinner("🔄 Analisando estrutura das páginas..."):
-                        df_st_new = build_structure_dataframe(report_folder)
-                
-                # SALVAR NO SESSION STATE E LIMPAR CACHES
-                st.session_state.current_file_key = file_key
-                st.session_state.df_cached = df.copy()
-                st.session_state.df_st_cached = df_st_new.copy() if df_st_new is not None else None
-                st.session_state.todas_medidas_modelo = todas_medidas_modelo  # Salvar TODAS as medidas
-                
-                # Limpar caches de análise (forçar recalculo para novo arquivo)
-                for cache_key in ['analise_global_cache', 'relatorios_global_cache', 'pages_analysis_cache']:
-                    if cache_key in st.session_state:
-                        del st.session_state[cache_key]
-                
-                df_st = st.session_state.df_st_cached
-                st.success("✅ Análise concluída com sucesso!")
-                
-            except Exception as e:
-                st.error(f"❌ Erro ao processar o arquivo: {str(e)}")
-                st.stop()
-    else:
-        df = st.session_state.df_cached
-        df_st = st.session_state.get('df_st_cached')
+    
+    try:
+        hash_anterior = st.session_state.get('model_hash')
+        model_hash = hashlib.sha256(uploaded_file.getvalue()).hexdigest() if novo_upload else hash_anterior
+        # Resultados por hash de conteúdo da versão anterior: uma nova versão do
+        # mesmo projeto só reprocessa tabelas, expressões, visuais e scores alterados
+        anterior, complexidade_anterior = None, None
+        if novo_upload and hash_anterior:
+            anterior = analysis_store.get((hash_anterior, 'modelo'))
+            complexidade_anterior = analysis_store.get((hash_anterior, 'complexidade'))
+        with st.spinner("🔄 Analisando medidas, dependências e páginas..."):
+            modelo = analysis_store.get_or_compute(
+                (model_hash, 'modelo'), _analisar_projeto, uploaded_file, anterior, complexidade_anterior
+            )
+    except Exception as e:
+        st.error(f"❌ Erro ao processar o arquivo: {str(e)}")
+        st.stop()
+    
+    if modelo['erro']:
+        st.error(modelo['erro'])
+        st.stop()
+    
+    if novo_upload:
+        # Mesmo grafo da versão anterior: o fecho transitivo continua válido
+        if anterior is not None and modelo['adjacency'] is anterior['adjacency']:
+            reachability_anterior = analysis_store.get((hash_anterior, 'reachability'))
+            if reachability_anterior is not None:
+                analysis_store.put((model_hash, 'reachability'), reachability_anterior)
+        st.session_state.current_file_key = file_key
+        st.session_state.model_hash = model_hash
+        st.success("✅ Análise concluída com sucesso!")
+    
+    df = modelo['df']
+    nodes = modelo['nodes']
+    edges = modelo['edges']
+    adjacency = modelo['adjacency']
+    page_index = modelo['page_index']
 
     col_origem, col_destino = "[Origem]", "[Destino]"
-    col_tipo_origem, col_exp_origem, col_exp_destino = "[Tipo Origem]", "[Expressão Origem]", "[Expressão Destino]"
+    col_tipo_origem = "[Tipo Origem]"
 
     if col_origem in df.columns and col_destino in df.columns:
-        df[col_origem] = df[col_origem].astype(str).replace('nan', None)
-        df[col_destino] = df[col_destino].astype(str).replace('nan', None)
-        df = df.dropna(subset=[col_origem, col_destino])
-
         # --- NAVEGAÇÃO ---
         st.sidebar.header("Navegação")
-        menu = st.sidebar.radio("Ir para:", ["Análise Global", "Análise por Medida"], index=1)
+        menu = st.sidebar.radio("Ir para:", ["Análise Global", "Análise por Medida", "Comparar Versões"], index=1)
         st.sidebar.markdown("---")
 
         # --- 3. CÁLCULOS GLOBAIS (Pre-processamento) ---
-        # Cache de mapeamento de info (leve, pode rodar sempre)
-        cache_info_key = 'info_map_cache'
-        if cache_info_key not in st.session_state:
-            info_map = {}
-            for _, row in df.iterrows():
-                dest = str(row[col_destino])
-                orig = str(row[col_origem])
-                info_map[dest] = {"exp": limpar_dax(row[col_exp_destino]), "tipo": "MEASURE"}
-                if orig not in info_map or not info_map[orig]["exp"]:
-                    info_map[orig] = {"exp": limpar_dax(row[col_exp_origem]), "tipo": str(row[col_tipo_origem])}
-            st.session_state[cache_info_key] = info_map
-        else:
-            info_map = st.session_state[cache_info_key]
+        # Partes derivadas da análise, no armazenamento do processo pelo hash do modelo
+        info_map = analysis_store.get_or_compute((model_hash, 'info_map'), build_info_map, nodes, edges)
+
+        # Fecho transitivo (uma vez por modelo, compartilhado pelas análises de impacto)
+        reachability = analysis_store.get_or_compute((model_hash, 'reachability'), build_reachability_index, adjacency)
+        downstream_count = reachability['downstream_count']
 
         # --- CÁLCULOS PESADOS - SOMENTE PARA ANÁLISE GLOBAL (Cachear!) ---
         if menu == "Análise por Medida":
@@ -918,7 +345,7 @@ if uploaded_file:
                 padrão = ["MEASURE"] if "MEASURE" in tipos_disponiveis else []
                 tipos_selecionados = st.sidebar.multiselect("Filtrar Origens por Tipo:", options=tipos_disponiveis, default=padrão)
 
-            df_filtrado = df[df[col_tipo_origem].isin(tipos_selecionados)]
+            tipos_permitidos = np.isin(adjacency['types'], tipos_selecionados)
             todas_destinos = sorted([str(m) for m in df[col_destino].unique()])
             
             # Buscar Medida
@@ -953,139 +380,87 @@ if uploaded_file:
                 index=0
             )
             
+            niveis_pre_carregados = 3
+            if "Expansível" in modo_visualizacao:
+                niveis_pre_carregados = st.sidebar.number_input(
+                    "Níveis pré-carregados para expansão:",
+                    min_value=1, max_value=20, value=3,
+                    help="Quantos níveis além do grafo atual são enviados ao navegador. Nós na borda podem ser selecionados na barra lateral para continuar a expansão."
+                )
+            else:
+                agrupar_por = st.sidebar.radio(
+                    "Agrupar grafos grandes por:",
+                    options=["Tabela", "Pasta de exibição"],
+                    index=0,
+                    help=f"Com mais de {GRAFO_LOD_MIN_NOS} nós o grafo abre agrupado. Clique em um grupo (ou aproxime o zoom) para ver seus nós."
+                )
+            
             export_placeholder = st.sidebar.container()
         else:
             medidas_selecionadas = []
-            df_filtrado = df.copy()
             direcao_grafo = "⬇️"
             modo_visualizacao = "Completo"
 
         # === 4. ANÁLISE GLOBAL ===
         if menu == "Análise Global":
             # --- CALCULAR COMPLEXIDADE E DEPENDÊNCIAS (CACHE) ---
-            cache_complexity_key = 'complexity_cache'
-            if cache_complexity_key not in st.session_state:
-                global_dependentes_count = df[col_destino].value_counts().to_dict()
-                todas_medidas_complexas = []
-                for nome_medida, info in info_map.items():
-                    if info.get("tipo") == "MEASURE":
-                        exp = info.get("exp", "")
-                        n_dependentes = global_dependentes_count.get(nome_medida, 0)
-                        score, classificacao, _ = calcular_complexity_score(exp, nome_medida, n_dependentes)
-                        todas_medidas_complexas.append({
-                            'medida': nome_medida, 
-                            'score': score, 
-                            'classificacao': classificacao
-                        })
-                st.session_state[cache_complexity_key] = {
-                    'global_dependentes_count': global_dependentes_count,
-                    'todas_medidas_complexas': todas_medidas_complexas
-                }
+            complexidade = analysis_store.get_or_compute(
+                (model_hash, 'complexidade'), _calcular_complexidade, nodes, edges, info_map, modelo['memo']
+            )
+            global_dependentes_count = complexidade['global_dependentes_count']
+            df_complexidade = complexidade['df_complexidade']
             
-            global_dependentes_count = st.session_state[cache_complexity_key]['global_dependentes_count']
-            todas_medidas_complexas = st.session_state[cache_complexity_key]['todas_medidas_complexas']
+            # --- ESTATÍSTICAS POR PÁGINA (CACHE) - compartilhadas por gráfico e relatórios ---
+            page_stats = analysis_store.get_or_compute(
+                (model_hash, 'paginas'), build_page_stats, page_index, df_complexidade, global_dependentes_count
+            ) if page_index is not None else None
             
             # Métricas Gerais em Cards
             m1, m2, m3, m4 = st.columns(4)
             m1.metric("Objetos no Modelo", len(info_map), help="Total de Tabelas, Colunas e Medidas encontradas nos arquivos TMDL do projeto.")
             m2.metric("Relacionamentos Total", len(df), help="Total de conexões diretas entre medidas (dependências DAX).")
             # --- CÁLCULO DE DESCARTE SEGURO (PARA O DASHBOARD) - CACHE ---
-            cache_key = 'analise_global_cache'
-            if cache_key not in st.session_state:
-                # Pegar TODAS as medidas do modelo (incluindo isoladas sem dependências)
-                todas_as_medidas = st.session_state.get('todas_medidas_modelo', set())
-                
-                # Medidas que SÃO USADAS por outras medidas (aparecem na coluna Destino)
-                medidas_usadas_destino = set(d for d in df[col_destino].unique() if d in todas_as_medidas)
-                
-                # Medidas em visuais
-                medidas_em_visuais_global = set()
-                if df_st is not None:
-                    for _, r in df_st.iterrows():
-                        m_raw = str(r['Medidas'])
-                        if m_raw and m_raw != 'nan' and m_raw != 'None':
-                            for m_ctx in [x.strip() for x in m_raw.split(',') if x.strip()]:
-                                medidas_em_visuais_global.add(m_ctx)
-                
-                # Candidatas = medidas que NÃO são usadas por outras E NÃO estão em visuais
-                candidatas_descarte_global = todas_as_medidas - medidas_usadas_destino - medidas_em_visuais_global
-                
-                # Construir grafo completo (PESADO - cachear!)
-                G_full = nx.from_pandas_edgelist(df, col_origem, col_destino, create_using=nx.DiGraph())
-                
-                # Top 10 mais impactantes (MUITO PESADO - cachear!)
-                top_impacto = []
-                if not df.empty:
-                    for n in G_full.nodes():
-                        if info_map.get(n, {}).get('tipo') == 'MEASURE':
-                            top_impacto.append({'medida': n, 'impacto': len(nx.descendants(G_full, n))})
-                    top_impacto = sorted(top_impacto, key=lambda x: x['impacto'], reverse=True)[:10]
-                
-                # Armazenar no cache
-                st.session_state[cache_key] = {
-                    'candidatas_descarte': candidatas_descarte_global,
-                    'G_full': G_full,
-                    'top_impacto': top_impacto,
-                    'medidas_em_visuais': medidas_em_visuais_global
-                }
-            
-            # Recuperar do cache
-            candidatas_descarte_global = st.session_state[cache_key]['candidatas_descarte']
-            G_full = st.session_state[cache_key]['G_full']
-            top_impacto = st.session_state[cache_key]['top_impacto']
-            medidas_em_visuais_global = st.session_state[cache_key]['medidas_em_visuais']
+            analise_global = analysis_store.get_or_compute(
+                (model_hash, 'analise_global'), _analise_global, nodes, edges, page_index, reachability
+            )
+            candidatas_descarte_global = analise_global['candidatas_descarte']
+            top_impacto = analise_global['top_impacto']
+            medidas_em_visuais_global = analise_global['medidas_em_visuais']
             
             m3.metric("Descarte Seguro", len(candidatas_descarte_global), help="Medidas que NÃO são usadas em fórmulas DAX e NÃO aparecem em nenhum visual do relatório. Candidatas seguras para exclusão.")
             
             # --- MÉTRICAS PARA RELATÓRIOS ---
             metr_exp = {
                 'objetos': len(info_map), 
-                'nos': len(G_full.nodes()), 
+                'nos': len(info_map), 
                 'relacionamentos': len(df), 
                 'orfas': len(candidatas_descarte_global),
                 'impacto': 0 
             }
 
             # Cache de relatórios (só gerar quando solicitado via download)
-            relatorio_cache_key = 'relatorios_global_cache'
-            if relatorio_cache_key not in st.session_state:
-                relatorio_txt = gerar_relatorio_texto(
-                    metr_exp, 
-                    candidatas_descarte_global, 
-                    top_impacto, 
-                    sorted(todas_medidas_complexas, key=lambda x: x['score'], reverse=True), 
-                    df_st
-                )
-                excel_bytes = gerar_relatorio_excel(
-                    metr_exp,
-                    todas_medidas_complexas,
-                    candidatas_descarte_global,
-                    df_st,
-                    global_dependentes_count,
-                    info_map
-                )
-                st.session_state[relatorio_cache_key] = {
-                    'txt': relatorio_txt,
-                    'excel': excel_bytes
-                }
+            relatorios = analysis_store.get_or_compute(
+                (model_hash, 'relatorios'), _relatorios_globais, model_hash,
+                metr_exp, candidatas_descarte_global, top_impacto, df_complexidade, page_index, page_stats, global_dependentes_count, info_map
+            )
             
             st.sidebar.download_button(
                 "📄 Baixar Relatório Completo (TXT)", 
-                st.session_state[relatorio_cache_key]['txt'], 
+                relatorios['txt'], 
                 "relatorio_global.txt", 
                 "text/plain", 
                 use_container_width=True
             )
             st.sidebar.download_button(
                 "📊 Baixar Relatório Excel (Formatado)", 
-                st.session_state[relatorio_cache_key]['excel'], 
+                relatorios['excel_fn'], 
                 "relatorio_completo.xlsx", 
                 "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
                 type="primary",
                 use_container_width=True
             )
             
-            score_geral = round(sum(m['score'] for m in todas_medidas_complexas) / len(todas_medidas_complexas), 1) if todas_medidas_complexas else 0
+            score_geral = round(df_complexidade['score'].mean(), 1) if not df_complexidade.empty else 0
             m4.metric("Complexidade DAX Média", f"{score_geral}/100", help="Média do Score D1-D5 de todas as medidas DAX. Quanto menor, mais performático e legível é o seu modelo.")
             
             st.markdown("---")
@@ -1093,7 +468,7 @@ if uploaded_file:
             # --- MENSAGEM DE INTRODUÇÃO ---
             # Calcular informações dinâmicas
             total_medidas = len([m for m, info in info_map.items() if info.get("tipo") == "MEASURE"])
-            total_paginas = len(df_st['Página'].unique()) if df_st is not None else 0
+            total_paginas = len(page_index['paginas']) if page_index is not None else 0
             
             # Classificar criticidade geral baseada no score médio
             if score_geral >= 60:
@@ -1134,54 +509,13 @@ if uploaded_file:
             st.markdown("---")
 
             # --- GRÁFICO DE BARRAS: MEDIDAS POR PÁGINA (Reposicionado para o topo) - CACHE ---
-            if df_st is not None:
+            if page_stats is not None:
                 try:
-                    cache_pages_key = 'pages_analysis_cache'
-                    if cache_pages_key not in st.session_state:
-                        d_mat_raw = []
-                        for _, r in df_st.iterrows():
-                            p = r['Página']
-                            meds_raw = str(r['Medidas'])
-                            if meds_raw and meds_raw != 'nan':
-                                for m_ctx in [x.strip() for x in meds_raw.split(',') if x.strip()]:
-                                    d_mat_raw.append({"Página": p, "Medida": m_ctx})
-                        
-                        if d_mat_raw:
-                            df_mat_full = pd.DataFrame(d_mat_raw).drop_duplicates()
-                            df_count = df_mat_full.groupby('Página')['Medida'].nunique().reset_index()
-                            df_count.columns = ['Página', 'Total de Medidas']
-                            
-                            comp_map = {m['medida']: m['score'] for m in todas_medidas_complexas}
-                            page_stats = []
-                            for pg in df_count['Página']:
-                                meds = df_mat_full[df_mat_full['Página'] == pg]['Medida'].unique()
-                                scores = [comp_map.get(m, 0) for m in meds]
-                                avg_c = round(sum(scores)/len(scores), 1) if scores else 0
-                                m_complex = max(meds, key=lambda x: comp_map.get(x, 0)) if len(meds)>0 else "-"
-                                m_dep = max(meds, key=lambda x: global_dependentes_count.get(x, 0)) if len(meds)>0 else "-"
-                                n_dep = global_dependentes_count.get(m_dep, 0)
-                                page_stats.append({
-                                    'Página': pg, 
-                                    'Complexidade Média': avg_c, 
-                                    'Top Complexidade': f"{m_complex} (Score: {comp_map.get(m_complex, 0)})", 
-                                    'Top Dependências': f"{m_dep} ({n_dep} dependentes)"
-                                })
-                            
-                            st.session_state[cache_pages_key] = {
-                                'df_count': df_count,
-                                'page_stats': page_stats
-                            }
-                        else:
-                            st.session_state[cache_pages_key] = None
-                    
-                    # Recuperar do cache e renderizar
-                    if st.session_state[cache_pages_key]:
-                        df_count = st.session_state[cache_pages_key]['df_count']
-                        page_stats = st.session_state[cache_pages_key]['page_stats']
-                        
-                        df_count = df_count.merge(pd.DataFrame(page_stats), on='Página').sort_values('Total de Medidas', ascending=True)
+                    if not page_stats.empty:
+                        df_count = page_stats.sort_values('Total de Medidas', ascending=True, kind='stable')
                         
                         st.markdown("#### Distribuição de Medidas por Página")
+                        import plotly.express as px
                         fig = px.bar(df_count, y='Página', x='Total de Medidas', orientation='h', text='Total de Medidas', color='Total de Medidas',
                                     color_continuous_scale=['#E3F2FD', '#2196F3', '#0D47A1'], 
                                     labels={'Total de Medidas': 'Nº de Medidas', 'Top Complexidade': 'Mais Complexa', 'Top Dependências': 'Mais Reutilizada'},
@@ -1217,9 +551,9 @@ if uploaded_file:
             **D3: Estrutura** (Linhas, VARs) | **D4: Dependências** (Impacto no modelo) | 
             **D5: Anti-patterns** (Boas práticas).
             """)
-            df_rk = pd.DataFrame(todas_medidas_complexas).sort_values(by="score", ascending=False)
+            df_rk = df_complexidade.sort_values(by="score", ascending=False)
             st.dataframe(
-                df_rk[['medida', 'score', 'classificacao']], 
+                df_rk, 
                 hide_index=True, 
                 use_container_width=True, 
                 height=400,
@@ -1231,7 +565,12 @@ if uploaded_file:
                         min_value=0,
                         max_value=100,
                         color="blue"
-                    )
+                    ),
+                    "d1_funcoes": st.column_config.NumberColumn("D1", help="Funções de iteração"),
+                    "d2_contexto": st.column_config.NumberColumn("D2", help="CALCULATE e contexto"),
+                    "d3_estrutura": st.column_config.NumberColumn("D3", help="Linhas, VARs e comentários"),
+                    "d4_dependencias": st.column_config.NumberColumn("D4", help="Medidas dependentes"),
+                    "d5_antipatterns": st.column_config.NumberColumn("D5", help="Anti-patterns")
                 }
             )
             
@@ -1282,12 +621,10 @@ if uploaded_file:
                 ]), hide_index=True, use_container_width=True)
             st.markdown("---")
             st.markdown("##### Mais Dependentes")
-            G_gl = nx.DiGraph()
-            G_gl.add_edges_from([(row[col_destino], row[col_origem]) for _, row in df.iterrows()])
             l_dp = []
             for mm in info_map:
                 if info_map[mm].get("tipo") == "MEASURE":
-                    l_dp.append({"Medida": mm, "Dependentes": len(nx.ancestors(G_gl, mm)) if mm in G_gl else 0})
+                    l_dp.append({"Medida": mm, "Dependentes": int(downstream_count[adjacency['ids'][mm]])})
             df_dp = pd.DataFrame(l_dp).sort_values(by="Dependentes", ascending=False)
             st.dataframe(
                 df_dp, 
@@ -1322,7 +659,7 @@ if uploaded_file:
                 """)
                 
                 # Criar um dataframe para mostrar as candidatas com sua complexidade
-                score_map = {m['medida']: m['score'] for m in todas_medidas_complexas}
+                score_map = dict(zip(df_complexidade['medida'], df_complexidade['score']))
                 df_trash = pd.DataFrame([
                     {
                         "Medida": m, 
@@ -1345,24 +682,15 @@ if uploaded_file:
                 st.success("✅ **Nenhuma medida desnecessária encontrada!** Todas as suas medidas estão sendo utilizadas em fórmulas ou visuais.")
 
             # Detalhamento por Página (Tabela Solicitada)
-            if df_st is not None:
+            if page_index is not None:
                 st.markdown("---")
                 st.subheader("Detalhamento: Medidas por Página e Visual")
                 try:
-                    d_mat = []
-                    for _, r in df_st.iterrows():
-                        p = r['Página']
-                        meds_raw = str(r['Medidas'])
-                        if meds_raw and meds_raw != 'nan':
-                            for m_ctx in [x.strip() for x in meds_raw.split(',') if x.strip()]:
-                                d_mat.append({"Página": p, "Medida": m_ctx})
-                    
-                    if d_mat:
-                        df_mat = pd.DataFrame(d_mat).drop_duplicates().sort_values(['Página', 'Medida'])
-                        
+                    df_mat = page_index['pares']
+                    if not df_mat.empty:
                         f1, f2 = st.columns(2)
                         p_opts = sorted(df_mat['Página'].unique())
-                        m_opts = sorted(df_mat['Medida'].unique())
+                        m_opts = page_index['medidas']
                         
                         p_sel = f1.multiselect("Filtrar Página:", p_opts, key="g_pg")
                         m_sel = f2.multiselect("Filtrar Medida:", m_opts, key="g_md")
@@ -1380,26 +708,9 @@ if uploaded_file:
         # === 5. ANÁLISE POR MEDIDA ===
         elif menu == "Análise por Medida":
             # --- CALCULAR COMPLEXIDADE APENAS SE NECESSÁRIO (para métricas) ---
-            cache_complexity_key = 'complexity_cache'
-            if cache_complexity_key not in st.session_state:
-                global_dependentes_count = df[col_destino].value_counts().to_dict()
-                todas_medidas_complexas = []
-                for nome_medida, info in info_map.items():
-                    if info.get("tipo") == "MEASURE":
-                        exp = info.get("exp", "")
-                        n_dependentes = global_dependentes_count.get(nome_medida, 0)
-                        score, classificacao, _ = calcular_complexity_score(exp, nome_medida, n_dependentes)
-                        todas_medidas_complexas.append({
-                            'medida': nome_medida, 
-                            'score': score, 
-                            'classificacao': classificacao
-                        })
-                st.session_state[cache_complexity_key] = {
-                    'global_dependentes_count': global_dependentes_count,
-                    'todas_medidas_complexas': todas_medidas_complexas
-                }
-            
-            todas_medidas_complexas = st.session_state[cache_complexity_key]['todas_medidas_complexas']
+            df_complexidade = analysis_store.get_or_compute(
+                (model_hash, 'complexidade'), _calcular_complexidade, nodes, edges, info_map, modelo['memo']
+            )['df_complexidade']
             
             if not medidas_selecionadas:
                 st.info("👈 Selecione uma ou mais Medidas na barra lateral para detalhar dependências e impacto.")
@@ -1409,29 +720,14 @@ if uploaded_file:
                 modo_dependentes = "⬆️" in direcao_grafo
                 modo_expansivel_val = "Expansível" in modo_visualizacao
                 
-                # 2. Construção do Grafo (DFS/BFS)
-                arestas, visitados = [], set()
-                if modo_expansivel_val:
-                    for raiz in medidas_selecionadas:
-                        visitados.add(raiz)
-                        if modo_dependencias:
-                            for f in df_filtrado[df_filtrado[col_destino] == raiz][col_origem].tolist(): arestas.append((raiz, f))
-                        if modo_dependentes:
-                            for p in df_filtrado[df_filtrado[col_origem] == raiz][col_destino].tolist(): arestas.append((p, raiz))
-                else:
-                    fila = list(medidas_selecionadas)
-                    while fila:
-                        at = fila.pop(0)
-                        if at not in visitados:
-                            visitados.add(at)
-                            if modo_dependencias:
-                                for f in df_filtrado[df_filtrado[col_destino] == at][col_origem].tolist():
-                                    arestas.append((at, f))
-                                    if f not in visitados: fila.append(f)
-                            if modo_dependentes:
-                                for p in df_filtrado[df_filtrado[col_origem] == at][col_destino].tolist():
-                                    arestas.append((p, at))
-                                    if p not in visitados: fila.append(p)
+                # 2. Construção do Grafo (BFS sobre o índice de adjacência)
+                import networkx as nx
+                from pyvis.network import Network
+                arestas = traverse_dependencies(
+                    adjacency, medidas_selecionadas,
+                    dependencias=modo_dependencias, dependentes=modo_dependentes,
+                    permitidos=tipos_permitidos, max_niveis=1 if modo_expansivel_val else None
+                )
 
                 G = nx.DiGraph()
                 G.add_edges_from(arestas)
@@ -1439,316 +735,477 @@ if uploaded_file:
                     if node not in G: G.add_node(node)
 
                 # 3. Métricas de Contexto
-                scores_s = [m['score'] for m in todas_medidas_complexas if m['medida'] in medidas_selecionadas]
-                avg_s = round(sum(scores_s) / len(scores_s), 1) if scores_s else 0
+                scores_s = df_complexidade.loc[df_complexidade['medida'].isin(medidas_selecionadas), 'score']
+                avg_s = round(scores_s.mean(), 1) if not scores_s.empty else 0
                 
                 c1, c2, c3, c4 = st.columns(4)
                 c1.metric("📌 Nós no Grafo", len(G.nodes()))
                 c2.metric("🔗 Relacionamentos", len(arestas))
-                orig_f = set(df_filtrado[col_origem].unique())
-                dest_f = set(df_filtrado[col_destino].unique())
                 
                 # Calcular em quantas páginas as medidas selecionadas aparecem
-                paginas_em_uso = set()
-                if df_st is not None:
-                    for _, row in df_st.iterrows():
-                        meds_page_dirty = str(row['Medidas'])
-                        if meds_page_dirty and meds_page_dirty != 'nan':
-                            meds_in_page = [x.strip() for x in meds_page_dirty.split(',') if x.strip()]
-                            # Verifica se ALGUMA das medidas selecionadas está nesta página
-                            if any(m in meds_in_page for m in medidas_selecionadas):
-                                paginas_em_uso.add(row['Página'])
+                # (ALGUMA das medidas selecionadas presente na página)
+                paginas_em_uso = pages_using(page_index, medidas_selecionadas) if page_index is not None else []
 
                 c3.metric("📄 Páginas em Uso", len(paginas_em_uso))
                 c4.metric("📊 Score Médio DAX", f"{avg_s}/100")
 
-                # 4. Preparação PyVis
-                cores_map = {"MEASURE": "#88B995", "COLUMN": "#5E9AE9", "CALC_COLUMN": "#BBBBBB", "TABLE": "#F4A460", "CALC_TABLE": "#BBBBBB", "UNKNOWN": "#CCCCCC"}
-                icones_map = {"MEASURE": "📊", "COLUMN": "📋", "CALC_COLUMN": "🔢", "TABLE": "📁", "CALC_TABLE": "🧮", "UNKNOWN": "❓"}
+                # 4. HTML do grafo: visões já renderizadas voltam do cache (LRU por sessão)
+                cache_grafos = st.session_state.setdefault('graph_html_cache', OrderedDict())
+                chave_grafo = (
+                    st.session_state.model_hash, tuple(medidas_selecionadas), direcao_grafo, modo_visualizacao,
+                    tuple(sorted(tipos_selecionados)), niveis_pre_carregados if modo_expansivel_val else agrupar_por
+                )
+                html_final = cache_grafos.get(chave_grafo)
+                if html_final is not None:
+                    cache_grafos.move_to_end(chave_grafo)
+                else:
+                    # Preparação PyVis
+                    cores_map = {"MEASURE": "#88B995", "COLUMN": "#5E9AE9", "CALC_COLUMN": "#BBBBBB", "TABLE": "#F4A460", "CALC_TABLE": "#BBBBBB", "UNKNOWN": "#CCCCCC"}
+                    icones_map = {"MEASURE": "📊", "COLUMN": "📋", "CALC_COLUMN": "🔢", "TABLE": "📁", "CALC_TABLE": "🧮", "UNKNOWN": "❓"}
                 
-                net = Network(height="600px", width="100%", directed=True, bgcolor="#ffffff")
-                nos_exp = set()
-                if modo_expansivel_val:
-                    for node in G.nodes():
-                        targets = df_filtrado[df_filtrado[col_destino if modo_dependencias else col_origem] == node][col_origem if modo_dependencias else col_destino].tolist()
-                        if set(targets) - set(G.nodes()): nos_exp.add(node)
-
-                for node in G.nodes():
-                    t = info_map.get(node, {}).get("tipo", "UNKNOWN")
-                    ic, cr = icones_map.get(t, "❓"), cores_map.get(t, "#CCCCCC")
-                    is_e = node in nos_exp
-                    net.add_node(node, label=f"{ic} {node}{' ⊕' if is_e else ''}", color=cr, shape="box", font={"face": "Segoe UI", "size": 14, "bold": is_e}, borderWidth=3 if is_e else 1)
+                    # Mapa de expansão incremental: só o grafo atual + N níveis vão para o navegador
+                    d_js, pendentes, nos_info = {}, {}, set(G.nodes())
+                    if modo_expansivel_val:
+                        fronteira = list(G.nodes())
+                        for _ in range(niveis_pre_carregados + 1):
+                            proxima = []
+                            for n_id in fronteira:
+                                if n_id in d_js: continue
+                                targets = adjacent_nodes(adjacency, n_id, modo_dependencias, tipos_permitidos)
+                                d_js[n_id] = {'filhos': targets, 'tipos': [info_map.get(x, {}).get("tipo", "UNKNOWN") for x in targets]}
+                                nos_info.update(targets)
+                                proxima.extend(x for x in targets if x not in d_js)
+                            fronteira = proxima
+                        # Nós na borda: possuem filhos que não foram enviados
+                        for n_id in fronteira:
+                            if n_id not in d_js:
+                                n_filhos = len(adjacent_nodes(adjacency, n_id, modo_dependencias, tipos_permitidos))
+                                if n_filhos: pendentes[n_id] = n_filhos
+                    info_js = {n: info_map[n] for n in nos_info if n in info_map}
                 
-                for u_n, v_n in G.edges(): net.add_edge(u_n, v_n, color="#CCCCCC", width=1)
-                net.set_options('{"physics":{"enabled":false}, "layout":{"hierarchical":{"enabled":true, "direction":"UD", "sortMethod":"directed", "nodeSpacing":300}}}')
+                    # Layout em camadas calculado aqui: o vis.js só desenha coordenadas fixas.
+                    # No modo expansível os nós pré-carregados entram no layout e surgem no
+                    # lugar já reservado para eles.
+                    G_layout = G
+                    if modo_expansivel_val:
+                        G_layout = G.copy()
+                        for n_id, d in d_js.items():
+                            for f in d['filhos']:
+                                if modo_dependencias: G_layout.add_edge(n_id, f)
+                                else: G_layout.add_edge(f, n_id)
                 
-                # 5. Renderização Grafo
-                tmp_p = os.path.join(tempfile.gettempdir(), "graph_pbi.html")
-                net.save_graph(tmp_p)
-                with open(tmp_p, 'r', encoding='utf-8') as f: h_base = f.read()
+                    # Nível de detalhe: grafo grande abre com um nó por tabela/pasta (faixas do layout)
+                    lod_ativo = not modo_expansivel_val and len(G) > GRAFO_LOD_MIN_NOS
+                    grupos = None
+                    if lod_ativo:
+                        por_pasta = agrupar_por == "Pasta de exibição"
+                        grupos = {
+                            nome: pasta if por_pasta and pasta else tabela
+                            for nome, tabela, pasta in zip(nodes['name'].tolist(), nodes['table'].tolist(), nodes['display_folder'].tolist())
+                            if nome in G
+                        }
+                    posicoes = layered_layout(G_layout, grupos)
                 
-                all_ids = set(df_filtrado[col_destino].unique()) | set(df_filtrado[col_origem].unique())
-                d_js = {}
-                for n_id in all_ids:
-                    targets = df_filtrado[df_filtrado[col_destino if modo_dependencias else col_origem] == n_id][col_origem if modo_dependencias else col_destino].tolist()
-                    d_js[str(n_id)] = {'filhos': [str(x) for x in targets], 'tipos': [info_map.get(str(x), {}).get("tipo", "UNKNOWN") for x in targets]}
+                    net = Network(height="600px", width="100%", directed=True, bgcolor="#ffffff")
+                    nos_exp = set()
+                    if modo_expansivel_val:
+                        for node in G.nodes():
+                            if set(d_js[node]['filhos']) - set(G.nodes()): nos_exp.add(node)
+
+                    lod_js, no_cluster = None, {}
+                    if lod_ativo:
+                        clusters, no_cluster = collapse_by_group(G, posicoes, grupos)
+                        for c_id, c in clusters.items():
+                            net.add_node(c_id, label=f"🗂️ {c['grupo']} ({len(c['membros'])})", color="#E8EEF7", shape="box", x=c['x'], y=c['y'], font={"face": "Segoe UI", "size": 16, "bold": True}, borderWidth=2)
+                        lod_js = {'clusters': clusters, 'noCluster': no_cluster, 'arestas': list(G.edges()), 'escalaZoom': GRAFO_LOD_ESCALA}
 
-                # Adicionar painel e estilos ANTES do </body>
-                painel_html = """
-                <div id="dax-panel" style="position:fixed; top:20px; right:20px; width:500px; max-height:85vh; background:#ffffff; border-radius:12px; padding:20px; overflow-y:auto; z-index:99999; display:none; box-shadow:0 4px 16px rgba(0,0,0,0.15); border:1px solid #e6e9ef; font-family: sans-serif;">
-                    <button onclick="document.getElementById('dax-panel').style.display='none'" style="position:absolute; top:15px; right:15px; cursor:pointer; background:none; border:none; font-size:24px; color:#999; padding:0; width:30px; height:30px; line-height:30px; transition:color 0.2s;">&times;</button>
-                    <div id="p-title" style="font-weight:bold; color:#1f77b4; margin-bottom:12px; font-size:16px; padding-right:30px;"></div>
-                    <div id="p-exp" style="background:#282c34; padding:16px; border-radius:8px; overflow-x:auto; font-family:'Consolas', 'Monaco', 'Courier New', monospace; font-size:13px; line-height:1.3; color:#abb2bf; white-space:pre-wrap; tab-size:4;"></div>
-                </div>
-                <button id="reset-view-btn" onclick="resetGraphView()" style="position:fixed; bottom:20px; right:20px; z-index:99998; background:linear-gradient(135deg, #5E9AE9 0%, #2E5090 100%); color:white; border:none; border-radius:8px; padding:10px 20px; font-size:13px; font-weight:600; font-family:'Segoe UI', sans-serif; cursor:pointer; box-shadow:0 2px 8px rgba(0,0,0,0.2); transition:all 0.3s ease;">
-                    🔄 Resetar Zoom
-                </button>
-                """
+                    for node in G.nodes():
+                        if node in no_cluster: continue
+                        t = info_map.get(node, {}).get("tipo", "UNKNOWN")
+                        ic, cr = icones_map.get(t, "❓"), cores_map.get(t, "#CCCCCC")
+                        is_e = node in nos_exp
+                        net.add_node(node, label=f"{ic} {node}{' ⊕' if is_e else ''}", color=cr, shape="box", x=posicoes[node][0], y=posicoes[node][1], font={"face": "Segoe UI", "size": 14, "bold": is_e}, borderWidth=3 if is_e else 1)
+                
+                    # No modo agrupado as arestas (somadas entre grupos) são montadas no navegador
+                    if not lod_ativo:
+                        for u_n, v_n in G.edges(): net.add_edge(u_n, v_n, color="#CCCCCC", width=1)
+                    opcoes_grafo = {
+                        "physics": {"enabled": False},
+                        "layout": {"hierarchical": {"enabled": False}},
+                        "edges": {"smooth": {"type": "cubicBezier", "forceDirection": "vertical", "roundness": 0.4}}
+                    }
+                    if lod_ativo:
+                        opcoes_grafo["interaction"] = {"hideEdgesOnDrag": True, "hideEdgesOnZoom": True}
+                    net.set_options(json.dumps(opcoes_grafo))
                 
-                estilos_css = """
-                <style>
-                    #dax-panel button:hover { color: #ff4444 !important; }
-                    .dax-keyword { color: #c678dd; font-weight: bold; }
-                    .dax-function { color: #61afef; font-weight: bold; }
-                    .dax-string { color: #98c379; }
-                    .dax-comment { color: #5c6370; font-style: italic; }
-                    .dax-number { color: #d19a66; }
-                    .dax-operator { color: #56b6c2; }
-                    .dax-variable { color: #e5c07b; font-weight: bold; }
-                    .dax-table { color: #e06c75; }
-                    #reset-view-btn:hover { transform: translateY(-2px); box-shadow: 0 4px 12px rgba(0,0,0,0.3); }
-                    #reset-view-btn:active { transform: translateY(0px); }
-                </style>
-                """
+                    # 5. Renderização Grafo (em memória, sem arquivo temporário compartilhado)
+                    h_base = net.generate_html()
+
+                    # Adicionar painel e estilos ANTES do </body>
+                    painel_html = """
+                    <div id="dax-panel" style="position:fixed; top:20px; right:20px; width:500px; max-height:85vh; background:#ffffff; border-radius:12px; padding:20px; overflow-y:auto; z-index:99999; display:none; box-shadow:0 4px 16px rgba(0,0,0,0.15); border:1px solid #e6e9ef; font-family: sans-serif;">
+                        <button onclick="document.getElementById('dax-panel').style.display='none'" style="position:absolute; top:15px; right:15px; cursor:pointer; background:none; border:none; font-size:24px; color:#999; padding:0; width:30px; height:30px; line-height:30px; transition:color 0.2s;">&times;</button>
+                        <div id="p-title" style="font-weight:bold; color:#1f77b4; margin-bottom:12px; font-size:16px; padding-right:30px;"></div>
+                        <div id="p-exp" style="background:#282c34; padding:16px; border-radius:8px; overflow-x:auto; font-family:'Consolas', 'Monaco', 'Courier New', monospace; font-size:13px; line-height:1.3; color:#abb2bf; white-space:pre-wrap; tab-size:4;"></div>
+                        <div id="p-note" style="display:none; margin-top:12px; padding:10px; background:#fff3cd; border-radius:8px; color:#856404; font-size:13px;"></div>
+                    </div>
+                    <button id="reset-view-btn" onclick="resetGraphView()" style="position:fixed; bottom:20px; right:20px; z-index:99998; background:linear-gradient(135deg, #5E9AE9 0%, #2E5090 100%); color:white; border:none; border-radius:8px; padding:10px 20px; font-size:13px; font-weight:600; font-family:'Segoe UI', sans-serif; cursor:pointer; box-shadow:0 2px 8px rgba(0,0,0,0.2); transition:all 0.3s ease;">
+                        🔄 Resetar Zoom
+                    </button>
+                    """
                 
-                script_js = f"""
-                <script>
-                    console.log('[DAX Viewer] Inicializando...');
+                    estilos_css = """
+                    <style>
+                        #dax-panel button:hover { color: #ff4444 !important; }
+                        .dax-keyword { color: #c678dd; font-weight: bold; }
+                        .dax-function { color: #61afef; font-weight: bold; }
+                        .dax-string { color: #98c379; }
+                        .dax-comment { color: #5c6370; font-style: italic; }
+                        .dax-number { color: #d19a66; }
+                        .dax-operator { color: #56b6c2; }
+                        .dax-variable { color: #e5c07b; font-weight: bold; }
+                        .dax-table { color: #e06c75; }
+                        #reset-view-btn:hover { transform: translateY(-2px); box-shadow: 0 4px 12px rgba(0,0,0,0.3); }
+                        #reset-view-btn:active { transform: translateY(0px); }
+                    </style>
+                    """
+                
+                    script_js = f"""
+                    <script>
+                        console.log('[DAX Viewer] Inicializando...');
                     
-                    var infoData = {json.dumps(info_map)};
-                    var depsMap = {json.dumps(d_js)};
-                    var modoExp = {"true" if modo_expansivel_val else "false"};
-                    var coresMap = {json.dumps(cores_map)};
-                    var iconesMap = {json.dumps(icones_map)};
-
-                    console.log('[DAX Viewer] Dados carregados:', Object.keys(infoData).length, 'medidas');
-                    console.log('[DAX Viewer] Painel elemento:', document.getElementById('dax-panel'));
-
-                    // Função de syntax highlighting simplificada
-                    function highlightDAX(code) {{
-                        if (!code || code === 'Sem DAX') return code;
+                        var infoData = {json.dumps(info_js)};
+                        var depsMap = {json.dumps(d_js)};
+                        var pendentes = {json.dumps(pendentes)};
+                        var modoExp = {"true" if modo_expansivel_val else "false"};
+                        var coresMap = {json.dumps(cores_map)};
+                        var iconesMap = {json.dumps(icones_map)};
+                        var posicoes = {json.dumps(posicoes)};
+                        var lod = {json.dumps(lod_js)};
+                        var expandidos = {{}};
+                        var lodTimer = null;
+
+                        console.log('[DAX Viewer] Dados carregados:', Object.keys(infoData).length, 'medidas');
+                        console.log('[DAX Viewer] Painel elemento:', document.getElementById('dax-panel'));
+
+                        // Função de syntax highlighting simplificada
+                        function highlightDAX(code) {{
+                            if (!code || code === 'Sem DAX') return code;
                         
-                        var esc = code.replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;');
+                            var esc = code.replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;');
                         
-                        // Comentários (PRIMEIRO - para proteger strings e código dentro de comentários)
-                        esc = esc.replace(/(--[^\\n]*)/g, '###COMMENT_START###$1###COMMENT_END###');
-                        esc = esc.replace(/(\/\/[^\\n]*)/g, '###COMMENT_START###$1###COMMENT_END###');
+                            // Comentários (PRIMEIRO - para proteger strings e código dentro de comentários)
+                            esc = esc.replace(/(--[^\\n]*)/g, '###COMMENT_START###$1###COMMENT_END###');
+                            esc = esc.replace(/(\/\/[^\\n]*)/g, '###COMMENT_START###$1###COMMENT_END###');
                         
-                        // Strings (SEGUNDO - para proteger conteúdo de strings)
-                        esc = esc.replace(/"([^"]*)"/g, '###STRING_START###"$1"###STRING_END###');
+                            // Strings (SEGUNDO - para proteger conteúdo de strings)
+                            esc = esc.replace(/"([^"]*)"/g, '###STRING_START###"$1"###STRING_END###');
                         
-                        // Números
-                        esc = esc.replace(/\\b(\\d+(?:\\.\\d+)?)\\b/g, '###NUMBER_START###$1###NUMBER_END###');
+                            // Números
+                            esc = esc.replace(/\\b(\\d+(?:\\.\\d+)?)\\b/g, '###NUMBER_START###$1###NUMBER_END###');
                         
-                        // Operadores (ANTES de keywords para não interferir com atributos HTML)
-                        esc = esc.replace(/(&&)/g, '###OPERATOR_START###$1###OPERATOR_END###');
-                        esc = esc.replace(/(\\|\\|)/g, '###OPERATOR_START###$1###OPERATOR_END###');
-                        esc = esc.replace(/(&lt;=)/g, '###OPERATOR_START###$1###OPERATOR_END###');
-                        esc = esc.replace(/(&gt;=)/g, '###OPERATOR_START###$1###OPERATOR_END###');
-                        esc = esc.replace(/(&lt;&gt;)/g, '###OPERATOR_START###$1###OPERATOR_END###');
-                        esc = esc.replace(/(&lt;)/g, '###OPERATOR_START###$1###OPERATOR_END###');
-                        esc = esc.replace(/(&gt;)/g, '###OPERATOR_START###$1###OPERATOR_END###');
-                        esc = esc.replace(/(\\+)/g, '###OPERATOR_START###$1###OPERATOR_END###');
-                        esc = esc.replace(/(-)/g, '###OPERATOR_START###$1###OPERATOR_END###');
-                        esc = esc.replace(/(\\*)/g, '###OPERATOR_START###$1###OPERATOR_END###');
-                        esc = esc.replace(/(\\/)/g, '###OPERATOR_START###$1###OPERATOR_END###');
-                        esc = esc.replace(/(=)/g, '###OPERATOR_START###$1###OPERATOR_END###');
+                            // Operadores (ANTES de keywords para não interferir com atributos HTML)
+                            esc = esc.replace(/(&&)/g, '###OPERATOR_START###$1###OPERATOR_END###');
+                            esc = esc.replace(/(\\|\\|)/g, '###OPERATOR_START###$1###OPERATOR_END###');
+                            esc = esc.replace(/(&lt;=)/g, '###OPERATOR_START###$1###OPERATOR_END###');
+                            esc = esc.replace(/(&gt;=)/g, '###OPERATOR_START###$1###OPERATOR_END###');
+                            esc = esc.replace(/(&lt;&gt;)/g, '###OPERATOR_START###$1###OPERATOR_END###');
+                            esc = esc.replace(/(&lt;)/g, '###OPERATOR_START###$1###OPERATOR_END###');
+                            esc = esc.replace(/(&gt;)/g, '###OPERATOR_START###$1###OPERATOR_END###');
+                            esc = esc.replace(/(\\+)/g, '###OPERATOR_START###$1###OPERATOR_END###');
+                            esc = esc.replace(/(-)/g, '###OPERATOR_START###$1###OPERATOR_END###');
+                            esc = esc.replace(/(\\*)/g, '###OPERATOR_START###$1###OPERATOR_END###');
+                            esc = esc.replace(/(\\/)/g, '###OPERATOR_START###$1###OPERATOR_END###');
+                            esc = esc.replace(/(=)/g, '###OPERATOR_START###$1###OPERATOR_END###');
                         
-                        // Keywords
-                        var kw = ['VAR', 'RETURN', 'IF', 'THEN', 'ELSE', 'SWITCH', 'TRUE', 'FALSE', 'IN', 'NOT', 'AND', 'OR', 'BLANK'];
-                        kw.forEach(function(k) {{
-                            var re = new RegExp('\\\\b(' + k + ')\\\\b', 'gi');
-                            esc = esc.replace(re, '###KEYWORD_START###$1###KEYWORD_END###');
-                        }});
+                            // Keywords
+                            var kw = ['VAR', 'RETURN', 'IF', 'THEN', 'ELSE', 'SWITCH', 'TRUE', 'FALSE', 'IN', 'NOT', 'AND', 'OR', 'BLANK'];
+                            kw.forEach(function(k) {{
+                                var re = new RegExp('\\\\b(' + k + ')\\\\b', 'gi');
+                                esc = esc.replace(re, '###KEYWORD_START###$1###KEYWORD_END###');
+                            }});
                         
-                        // Funções
-                        var fn = ['CALCULATE', 'CALCULATETABLE', 'FILTER', 'ALL', 'ALLEXCEPT', 'ALLSELECTED',
-                            'SUM', 'SUMX', 'AVERAGE', 'AVERAGEX', 'COUNT', 'COUNTROWS', 'COUNTA', 'COUNTX',
-                            'MIN', 'MINX', 'MAX', 'MAXX', 'DISTINCTCOUNT', 'DIVIDE',
-                            'RELATED', 'RELATEDTABLE', 'USERELATIONSHIP', 'VALUES', 'DISTINCT',
-                            'ADDCOLUMNS', 'SUMMARIZE', 'GROUPBY', 'EARLIER', 'EARLIEST', 'RANKX', 'TOPN',
-                            'CALENDAR', 'CALENDARAUTO', 'DATE', 'TODAY', 'NOW', 'YEAR', 'MONTH', 'DAY',
-                            'DATESYTD', 'DATEADD', 'SAMEPERIODLASTYEAR', 'TOTALYTD', 'PARALLELPERIOD',
-                            'ISBLANK', 'IFERROR', 'HASONEVALUE', 'SELECTEDVALUE',
-                            'FORMAT', 'CONCATENATE', 'CONCATENATEX', 'LEFT', 'RIGHT', 'MID', 'LEN',
-                            'KEEPFILTERS', 'REMOVEFILTERS', 'TREATAS', 'CROSSFILTER',
-                            'GENERATE', 'GENERATEALL', 'ROW', 'UNION', 'INTERSECT', 'EXCEPT',
-                            'LOOKUPVALUE', 'SEARCH', 'FIND', 'CONTAINS'];
-                        fn.forEach(function(f) {{
-                            var re = new RegExp('\\\\b(' + f + ')\\\\s*\\\\(', 'gi');
-                            esc = esc.replace(re, '###FUNCTION_START###$1###FUNCTION_END###(');
-                        }});
+                            // Funções
+                            var fn = ['CALCULATE', 'CALCULATETABLE', 'FILTER', 'ALL', 'ALLEXCEPT', 'ALLSELECTED',
+                                'SUM', 'SUMX', 'AVERAGE', 'AVERAGEX', 'COUNT', 'COUNTROWS', 'COUNTA', 'COUNTX',
+                                'MIN', 'MINX', 'MAX', 'MAXX', 'DISTINCTCOUNT', 'DIVIDE',
+                                'RELATED', 'RELATEDTABLE', 'USERELATIONSHIP', 'VALUES', 'DISTINCT',
+                                'ADDCOLUMNS', 'SUMMARIZE', 'GROUPBY', 'EARLIER', 'EARLIEST', 'RANKX', 'TOPN',
+                                'CALENDAR', 'CALENDARAUTO', 'DATE', 'TODAY', 'NOW', 'YEAR', 'MONTH', 'DAY',
+                                'DATESYTD', 'DATEADD', 'SAMEPERIODLASTYEAR', 'TOTALYTD', 'PARALLELPERIOD',
+                                'ISBLANK', 'IFERROR', 'HASONEVALUE', 'SELECTEDVALUE',
+                                'FORMAT', 'CONCATENATE', 'CONCATENATEX', 'LEFT', 'RIGHT', 'MID', 'LEN',
+                                'KEEPFILTERS', 'REMOVEFILTERS', 'TREATAS', 'CROSSFILTER',
+                                'GENERATE', 'GENERATEALL', 'ROW', 'UNION', 'INTERSECT', 'EXCEPT',
+                                'LOOKUPVALUE', 'SEARCH', 'FIND', 'CONTAINS'];
+                            fn.forEach(function(f) {{
+                                var re = new RegExp('\\\\b(' + f + ')\\\\s*\\\\(', 'gi');
+                                esc = esc.replace(re, '###FUNCTION_START###$1###FUNCTION_END###(');
+                            }});
                         
-                        // Variáveis (após VAR)
-                        esc = esc.replace(/(###KEYWORD_START###VAR###KEYWORD_END###)\\s+(\\w+)/gi, 
-                            '$1 ###VARIABLE_START###$2###VARIABLE_END###');
+                            // Variáveis (após VAR)
+                            esc = esc.replace(/(###KEYWORD_START###VAR###KEYWORD_END###)\\s+(\\w+)/gi, 
+                                '$1 ###VARIABLE_START###$2###VARIABLE_END###');
                         
-                        // Tabelas e Colunas
-                        esc = esc.replace(/(\\w+)\\[([^\\]]+)\\]/g, 
-                            '###TABLE_START###$1###TABLE_END###[###VARIABLE_START###$2###VARIABLE_END###]');
+                            // Tabelas e Colunas
+                            esc = esc.replace(/(\\w+)\\[([^\\]]+)\\]/g, 
+                                '###TABLE_START###$1###TABLE_END###[###VARIABLE_START###$2###VARIABLE_END###]');
                         
-                        // Converter marcadores para HTML (ÚLTIMO PASSO)
-                        esc = esc.replace(/###COMMENT_START###/g, '<span class="dax-comment">');
-                        esc = esc.replace(/###COMMENT_END###/g, '</span>');
-                        esc = esc.replace(/###STRING_START###/g, '<span class="dax-string">');
-                        esc = esc.replace(/###STRING_END###/g, '</span>');
-                        esc = esc.replace(/###NUMBER_START###/g, '<span class="dax-number">');
-                        esc = esc.replace(/###NUMBER_END###/g, '</span>');
-                        esc = esc.replace(/###KEYWORD_START###/g, '<span class="dax-keyword">');
-                        esc = esc.replace(/###KEYWORD_END###/g, '</span>');
-                        esc = esc.replace(/###FUNCTION_START###/g, '<span class="dax-function">');
-                        esc = esc.replace(/###FUNCTION_END###/g, '</span>');
-                        esc = esc.replace(/###VARIABLE_START###/g, '<span class="dax-variable">');
-                        esc = esc.replace(/###VARIABLE_END###/g, '</span>');
-                        esc = esc.replace(/###TABLE_START###/g, '<span class="dax-table">');
-                        esc = esc.replace(/###TABLE_END###/g, '</span>');
-                        esc = esc.replace(/###OPERATOR_START###/g, '<span class="dax-operator">');
-                        esc = esc.replace(/###OPERATOR_END###/g, '</span>');
+                            // Converter marcadores para HTML (ÚLTIMO PASSO)
+                            esc = esc.replace(/###COMMENT_START###/g, '<span class="dax-comment">');
+                            esc = esc.replace(/###COMMENT_END###/g, '</span>');
+                            esc = esc.replace(/###STRING_START###/g, '<span class="dax-string">');
+                            esc = esc.replace(/###STRING_END###/g, '</span>');
+                            esc = esc.replace(/###NUMBER_START###/g, '<span class="dax-number">');
+                            esc = esc.replace(/###NUMBER_END###/g, '</span>');
+                            esc = esc.replace(/###KEYWORD_START###/g, '<span class="dax-keyword">');
+                            esc = esc.replace(/###KEYWORD_END###/g, '</span>');
+                            esc = esc.replace(/###FUNCTION_START###/g, '<span class="dax-function">');
+                            esc = esc.replace(/###FUNCTION_END###/g, '</span>');
+                            esc = esc.replace(/###VARIABLE_START###/g, '<span class="dax-variable">');
+                            esc = esc.replace(/###VARIABLE_END###/g, '</span>');
+                            esc = esc.replace(/###TABLE_START###/g, '<span class="dax-table">');
+                            esc = esc.replace(/###TABLE_END###/g, '</span>');
+                            esc = esc.replace(/###OPERATOR_START###/g, '<span class="dax-operator">');
+                            esc = esc.replace(/###OPERATOR_END###/g, '</span>');
                         
-                        return esc;
-                    }}
+                            return esc;
+                        }}
+
+                        // Nó com a posição calculada no servidor (layout em camadas)
+                        function comPosicao(no) {{
+                            var p = posicoes[no.id];
+                            if (p) {{ no.x = p[0]; no.y = p[1]; }}
+                            return no;
+                        }}
+
+                        // --- Nível de detalhe: grupos por tabela/pasta que abrem com clique ou zoom ---
+                        function representante(noId) {{
+                            var c = lod.noCluster[noId];
+                            return (c && !expandidos[c]) ? c : noId;
+                        }}
+
+                        function redesenharArestas() {{
+                            // Arestas entre grupos fechados são somadas em uma só (espessura pela contagem)
+                            var vistas = {{}}, lista = [];
+                            lod.arestas.forEach(function(a) {{
+                                var u = representante(a[0]), v = representante(a[1]);
+                                if (u === v) return;
+                                var chave = JSON.stringify([u, v]);
+                                if (vistas[chave]) {{ vistas[chave].n += 1; return; }}
+                                vistas[chave] = {{from: u, to: v, n: 1}};
+                                lista.push(vistas[chave]);
+                            }});
+                            edges.clear();
+                            edges.add(lista.map(function(e) {{
+                                var aresta = {{from: e.from, to: e.to, arrows: "to", color: "#CCCCCC", width: Math.min(1 + Math.log2(e.n), 6)}};
+                                if (e.n > 1) aresta.title = e.n + ' ligações';
+                                return aresta;
+                            }}));
+                        }}
+
+                        function noGrupo(c) {{
+                            var g = lod.clusters[c];
+                            return {{id: c, label: "🗂️ " + g.grupo + " (" + g.membros.length + ")", color: "#E8EEF7", shape: "box", x: g.x, y: g.y, font: {{face: "Segoe UI", size: 16, bold: true}}, borderWidth: 2}};
+                        }}
 
-                    function resetGraphView() {{
-                        try {{
-                            if (typeof network !== 'undefined' && network) {{
-                                network.fit({{animation: {{duration: 500, easingFunction: 'easeInOutQuad'}}}});
+                        function expandirGrupo(c) {{
+                            if (expandidos[c]) return false;
+                            expandidos[c] = true;
+                            nodes.remove(c);
+                            nodes.add(lod.clusters[c].membros.map(function(m) {{
+                                var t = (infoData[m] && infoData[m].tipo) ? infoData[m].tipo : "UNKNOWN";
+                                return comPosicao({{id: m, label: (iconesMap[t] || "❓") + " " + m, color: coresMap[t] || "#CCCCCC", shape: "box", font: {{face: "Segoe UI", size: 14}}, borderWidth: 1}});
+                            }}));
+                            return true;
+                        }}
+
+                        function recolherGrupo(c) {{
+                            if (!expandidos[c]) return false;
+                            delete expandidos[c];
+                            nodes.remove(lod.clusters[c].membros);
+                            nodes.add(noGrupo(c));
+                            return true;
+                        }}
+
+                        function aplicarZoomLOD() {{
+                            // Zoom afastado: tudo agrupado; aproximado: abre os grupos dentro da área visível
+                            var escala = network.getScale(), alterou = false;
+                            if (escala < lod.escalaZoom) {{
+                                Object.keys(expandidos).forEach(function(c) {{ alterou = recolherGrupo(c) || alterou; }});
                             }} else {{
-                                setTimeout(resetGraphView, 100);
+                                var centro = network.getViewPosition();
+                                var meiaLargura = network.body.container.clientWidth / escala / 2;
+                                var meiaAltura = network.body.container.clientHeight / escala / 2;
+                                Object.keys(lod.clusters).forEach(function(c) {{
+                                    var cx = lod.clusters[c].caixa;
+                                    if (cx[2] >= centro.x - meiaLargura && cx[0] <= centro.x + meiaLargura &&
+                                        cx[3] >= centro.y - meiaAltura && cx[1] <= centro.y + meiaAltura) {{
+                                        alterou = expandirGrupo(c) || alterou;
+                                    }}
+                                }});
                             }}
-                        }} catch(e) {{
-                            console.error('[DAX Viewer] Erro ao resetar:', e);
+                            if (alterou) redesenharArestas();
                         }}
-                    }}
 
-                    function colapsarRecursivo(noId) {{
-                        var d = depsMap[noId];
-                        if (d && d.filhos) {{
-                            d.filhos.forEach(filhoId => {{
-                                try {{
-                                    var arestasConectadas = network.getConnectedEdges(filhoId);
-                                    if (arestasConectadas.length <= 1) {{
-                                        colapsarRecursivo(filhoId);
-                                        nodes.remove(filhoId);
-                                    }} else {{
-                                        var arestaId = arestasConectadas.find(eId => {{
-                                            var e = edges.get(eId);
-                                            return (e.from == noId && e.to == filhoId) || (e.to == noId && e.from == filhoId);
-                                        }});
-                                        if (arestaId) edges.remove(arestaId);
-                                    }}
-                                }} catch(e) {{}}
-                            }});
+                        function resetGraphView() {{
+                            try {{
+                                if (typeof network !== 'undefined' && network) {{
+                                    if (lod) network.once('animationFinished', aplicarZoomLOD);
+                                    network.fit({{animation: {{duration: 500, easingFunction: 'easeInOutQuad'}}}});
+                                }} else {{
+                                    setTimeout(resetGraphView, 100);
+                                }}
+                            }} catch(e) {{
+                                console.error('[DAX Viewer] Erro ao resetar:', e);
+                            }}
                         }}
-                        var t = (infoData[noId] && infoData[noId].tipo) ? infoData[noId].tipo : "UNKNOWN";
-                        var ic = iconesMap[t] || "❓";
-                        var cr = coresMap[t] || "#CCCCCC";
-                        nodes.update({{id: noId, label: ic + " " + noId + " ⊕", color: {{border: cr, background: cr}}, borderWidth: 3}});
-                    }}
 
-                    // Aguardar network estar pronto
-                    function setupClickHandler() {{
-                        if (typeof network === 'undefined') {{
-                            console.log('[DAX Viewer] Aguardando network...');
-                            setTimeout(setupClickHandler, 100);
-                            return;
+                        function colapsarRecursivo(noId) {{
+                            var d = depsMap[noId];
+                            if (d && d.filhos) {{
+                                d.filhos.forEach(filhoId => {{
+                                    try {{
+                                        var arestasConectadas = network.getConnectedEdges(filhoId);
+                                        if (arestasConectadas.length <= 1) {{
+                                            colapsarRecursivo(filhoId);
+                                            nodes.remove(filhoId);
+                                        }} else {{
+                                            var arestaId = arestasConectadas.find(eId => {{
+                                                var e = edges.get(eId);
+                                                return (e.from == noId && e.to == filhoId) || (e.to == noId && e.from == filhoId);
+                                            }});
+                                            if (arestaId) edges.remove(arestaId);
+                                        }}
+                                    }} catch(e) {{}}
+                                }});
+                            }}
+                            var t = (infoData[noId] && infoData[noId].tipo) ? infoData[noId].tipo : "UNKNOWN";
+                            var ic = iconesMap[t] || "❓";
+                            var cr = coresMap[t] || "#CCCCCC";
+                            nodes.update({{id: noId, label: ic + " " + noId + " ⊕", color: {{border: cr, background: cr}}, borderWidth: 3}});
                         }}
+
+                        // Aguardar network estar pronto
+                        function setupClickHandler() {{
+                            if (typeof network === 'undefined') {{
+                                console.log('[DAX Viewer] Aguardando network...');
+                                setTimeout(setupClickHandler, 100);
+                                return;
+                            }}
+                        
+                            console.log('[DAX Viewer] Network pronto! Registrando evento de clique...');
                         
-                        console.log('[DAX Viewer] Network pronto! Registrando evento de clique...');
+                            if (lod) {{
+                                redesenharArestas();
+                                network.on("zoom", function() {{
+                                    clearTimeout(lodTimer);
+                                    lodTimer = setTimeout(aplicarZoomLOD, 150);
+                                }});
+                            }}
                         
-                        network.on("click", function(params) {{
-                            console.log('[DAX Viewer] Click detectado!', params);
+                            network.on("click", function(params) {{
+                                console.log('[DAX Viewer] Click detectado!', params);
                             
-                            if(params.nodes && params.nodes.length > 0) {{
-                                var nodeId = params.nodes[0];
-                                console.log('[DAX Viewer] Nó clicado:', nodeId);
+                                if(params.nodes && params.nodes.length > 0) {{
+                                    var nodeId = params.nodes[0];
+                                    console.log('[DAX Viewer] Nó clicado:', nodeId);
                                 
-                                var nodeInfo = infoData[nodeId] || {{exp: 'Sem informação disponível', tipo: 'UNKNOWN'}};
-                                console.log('[DAX Viewer] Info do nó:', nodeInfo);
+                                    // Grupo do nível de detalhe: o clique abre o grupo
+                                    if (lod && lod.clusters[nodeId]) {{
+                                        if (expandirGrupo(nodeId)) redesenharArestas();
+                                        return;
+                                    }}
                                 
-                                // Atualizar título
-                                var titleEl = document.getElementById('p-title');
-                                if (titleEl) {{
-                                    titleEl.textContent = nodeId;
-                                    console.log('[DAX Viewer] Título atualizado');
-                                }} else {{
-                                    console.error('[DAX Viewer] Elemento p-title não encontrado!');
-                                }}
+                                    var nodeInfo = infoData[nodeId] || {{exp: 'Sem informação disponível', tipo: 'UNKNOWN'}};
+                                    console.log('[DAX Viewer] Info do nó:', nodeInfo);
                                 
-                                // Atualizar código com highlighting
-                                var expEl = document.getElementById('p-exp');
-                                if (expEl) {{
-                                    var highlighted = highlightDAX(nodeInfo.exp || 'Sem DAX');
-                                    console.log('[DAX Viewer] HTML gerado:', highlighted.substring(0, 200));
-                                    expEl.innerHTML = highlighted;
-                                    console.log('[DAX Viewer] Código atualizado');
-                                }} else {{
-                                    console.error('[DAX Viewer] Elemento p-exp não encontrado!');
-                                }}
+                                    // Atualizar título
+                                    var titleEl = document.getElementById('p-title');
+                                    if (titleEl) {{
+                                        titleEl.textContent = nodeId;
+                                        console.log('[DAX Viewer] Título atualizado');
+                                    }} else {{
+                                        console.error('[DAX Viewer] Elemento p-title não encontrado!');
+                                    }}
                                 
-                                // Mostrar painel
-                                var panel = document.getElementById('dax-panel');
-                                if (panel) {{
-                                    panel.style.display = 'block';
-                                    console.log('[DAX Viewer] Painel exibido!');
-                                }} else {{
-                                    console.error('[DAX Viewer] Elemento dax-panel não encontrado!');
-                                }}
-
-                                // Lógica de expansão
-                                if (modoExp) {{
-                                    var d = depsMap[nodeId];
-                                    if (d && d.filhos && d.filhos.length) {{
-                                        var jaExpandido = false;
-                                        try {{
-                                            var connectedNodes = network.getConnectedNodes(nodeId);
-                                            jaExpandido = d.filhos.some(fId => connectedNodes.includes(fId));
-                                        }} catch(e) {{}}
+                                    // Atualizar código com highlighting
+                                    var expEl = document.getElementById('p-exp');
+                                    if (expEl) {{
+                                        var highlighted = highlightDAX(nodeInfo.exp || 'Sem DAX');
+                                        console.log('[DAX Viewer] HTML gerado:', highlighted.substring(0, 200));
+                                        expEl.innerHTML = highlighted;
+                                        console.log('[DAX Viewer] Código atualizado');
+                                    }} else {{
+                                        console.error('[DAX Viewer] Elemento p-exp não encontrado!');
+                                    }}
+                                
+                                    // Mostrar painel
+                                    var panel = document.getElementById('dax-panel');
+                                    if (panel) {{
+                                        panel.style.display = 'block';
+                                        console.log('[DAX Viewer] Painel exibido!');
+                                    }} else {{
+                                        console.error('[DAX Viewer] Elemento dax-panel não encontrado!');
+                                    }}
 
-                                        if (jaExpandido) {{
-                                            colapsarRecursivo(nodeId);
+                                    // Nó na borda do que foi pré-carregado
+                                    var noteEl = document.getElementById('p-note');
+                                    if (noteEl) {{
+                                        if (modoExp && !depsMap[nodeId] && pendentes[nodeId]) {{
+                                            noteEl.textContent = 'ℹ️ ' + pendentes[nodeId] + ' ligações além dos níveis pré-carregados. Selecione esta medida na barra lateral (ou aumente os níveis pré-carregados) para continuar a expansão.';
+                                            noteEl.style.display = 'block';
                                         }} else {{
-                                            var icPrincipal = iconesMap[nodeInfo.tipo] || "❓";
-                                            nodes.update({{id: nodeId, label: icPrincipal + " " + nodeId + " ⊖", color: {{border: "#FF4B4B"}}, borderWidth: 4}});
-                                            d.filhos.forEach((f, idx) => {{
-                                                var t_f = d.tipos[idx];
-                                                var ic_f = iconesMap[t_f] || "❓";
-                                                var cr_f = coresMap[t_f] || "#CCCCCC";
-                                                try {{
-                                                    if (!nodes.get(f)) {{
-                                                        var temFilhos = (depsMap[f] && depsMap[f].filhos && depsMap[f].filhos.length > 0);
-                                                        nodes.add({{id: f, label: ic_f + " " + f + (temFilhos ? " ⊕" : ""), color: cr_f, shape: "box", font: {{face: "Segoe UI", size: 14, bold: temFilhos}}, borderWidth: temFilhos ? 3 : 1}});
-                                                    }}
-                                                    edges.add({{from: nodeId, to: f, color: "#CCCCCC", width: 1}});
-                                                }} catch(e) {{}}
-                                            }});
+                                            noteEl.style.display = 'none';
                                         }}
                                     }}
+
+                                    // Lógica de expansão
+                                    if (modoExp) {{
+                                        var d = depsMap[nodeId];
+                                        if (d && d.filhos && d.filhos.length) {{
+                                            var jaExpandido = false;
+                                            try {{
+                                                var connectedNodes = network.getConnectedNodes(nodeId);
+                                                jaExpandido = d.filhos.some(fId => connectedNodes.includes(fId));
+                                            }} catch(e) {{}}
+
+                                            if (jaExpandido) {{
+                                                colapsarRecursivo(nodeId);
+                                            }} else {{
+                                                var icPrincipal = iconesMap[nodeInfo.tipo] || "❓";
+                                                nodes.update({{id: nodeId, label: icPrincipal + " " + nodeId + " ⊖", color: {{border: "#FF4B4B"}}, borderWidth: 4}});
+                                                d.filhos.forEach((f, idx) => {{
+                                                    var t_f = d.tipos[idx];
+                                                    var ic_f = iconesMap[t_f] || "❓";
+                                                    var cr_f = coresMap[t_f] || "#CCCCCC";
+                                                    try {{
+                                                        if (!nodes.get(f)) {{
+                                                            var temFilhos = (depsMap[f] && depsMap[f].filhos && depsMap[f].filhos.length > 0) || !!pendentes[f];
+                                                            nodes.add(comPosicao({{id: f, label: ic_f + " " + f + (temFilhos ? " ⊕" : ""), color: cr_f, shape: "box", font: {{face: "Segoe UI", size: 14, bold: temFilhos}}, borderWidth: temFilhos ? 3 : 1}}));
+                                                        }}
+                                                        edges.add({{from: nodeId, to: f, color: "#CCCCCC", width: 1}});
+                                                    }} catch(e) {{}}
+                                                }});
+                                            }}
+                                        }}
+                                    }}
+                                }} else {{
+                                    console.log('[DAX Viewer] Nenhum nó selecionado');
                                 }}
-                            }} else {{
-                                console.log('[DAX Viewer] Nenhum nó selecionado');
-                            }}
-                        }});
+                            }});
                         
-                        console.log('[DAX Viewer] Evento registrado com sucesso!');
-                    }}
+                            console.log('[DAX Viewer] Evento registrado com sucesso!');
+                        }}
                     
-                    // Iniciar configuração
-                    setupClickHandler();
-                </script>
-                """
+                        // Iniciar configuração
+                        setupClickHandler();
+                    </script>
+                    """
                 
-                # Injetar HTML no corpo do grafo
-                html_final = h_base.replace("</body>", f"{estilos_css}{painel_html}{script_js}</body>")
+                    # Injetar HTML no corpo do grafo
+                    html_final = h_base.replace("</body>", f"{estilos_css}{painel_html}{script_js}</body>")
+                    _guardar_html_grafo(cache_grafos, chave_grafo, html_final)
                 
                 st.subheader("Visualização do Grafo")
                 components.html(html_final, height=650)
@@ -1767,21 +1224,18 @@ if uploaded_file:
                         if m_name in G:
                             with st.container(border=True):
                                 st.markdown(f"**{m_name}**")
-                                desc = nx.descendants(G, m_name)
+                                # Fecho transitivo pelo índice de alcançabilidade (mesmo das métricas de impacto),
+                                # restrito aos tipos selecionados
+                                desc = {n for n in upstream_of(adjacency, reachability, m_name) if tipos_permitidos[adjacency['ids'][n]]}
                                 if desc:
-                                    with st.expander(f"Dependências ({len(desc)})"): st.write(sorted(list(desc)))
+                                    with st.expander(f"Dependências ({len(desc)})"): st.write(sorted(desc))
+                                dependentes_m = {n for n in downstream_of(adjacency, reachability, m_name) if tipos_permitidos[adjacency['ids'][n]]}
+                                if dependentes_m:
+                                    with st.expander(f"Dependentes ({len(dependentes_m)})"): st.write(sorted(dependentes_m))
                                 
                                 # USO EM PÁGINAS (corrigido para usar mesma lógica da métrica)
-                                if df_st is not None:
-                                    paginas_uso = []
-                                    for _, row_pg in df_st.iterrows():
-                                        meds_raw_pg = str(row_pg['Medidas'])
-                                        if meds_raw_pg and meds_raw_pg != 'nan' and meds_raw_pg != 'None':
-                                            meds_in_pg = [x.strip() for x in meds_raw_pg.split(',') if x.strip()]
-                                            if m_name in meds_in_pg:
-                                                paginas_uso.append(row_pg['Página'])
-                                    
-                                    paginas_uso = sorted(list(set(paginas_uso)))  # Remove duplicatas e ordena
+                                if page_index is not None:
+                                    paginas_uso = pages_using(page_index, [m_name])
                                     st.markdown(f"📄 **Uso em Páginas:** {len(paginas_uso)}")
                                     if len(paginas_uso) > 0:
                                         with st.expander("Ver lista de páginas"):
@@ -1790,6 +1244,57 @@ if uploaded_file:
                                     else:
                                         st.caption("Esta medida não foi encontrada em nenhum visual de página.")
 
+        # === 6. COMPARAÇÃO ENTRE VERSÕES ===
+        elif menu == "Comparar Versões":
+            st.subheader("🔀 Comparação entre Versões")
+            st.caption("O projeto enviado acima é a versão atual. Envie o ZIP da versão anterior para ver as medidas adicionadas, removidas e alteradas, e o impacto nas medidas dependentes e nas páginas do relatório.")
+            arquivo_anterior = st.file_uploader("📁 ZIP da versão anterior (.pbip)", type=["zip"], key="zip_versao_anterior")
+            
+            if arquivo_anterior:
+                # --- DIFF (armazenamento do processo, pelo par de hashes) ---
+                # A sessão guarda só o hash do ZIP anterior, para não recalculá-lo a cada interação
+                hashes_anteriores = st.session_state.setdefault('diff_hashes', {})
+                if arquivo_anterior.file_id not in hashes_anteriores:
+                    hashes_anteriores.clear()
+                    hashes_anteriores[arquivo_anterior.file_id] = hashlib.sha256(arquivo_anterior.getvalue()).hexdigest()
+                with st.spinner("🔄 Comparando versões..."):
+                    diff = analysis_store.get_or_compute(
+                        (model_hash, hashes_anteriores[arquivo_anterior.file_id], 'diff'),
+                        _comparar_versoes, arquivo_anterior, nodes, edges, page_index
+                    )
+                
+                if diff is None:
+                    st.error("❌ Nenhuma medida ou dependência encontrada na versão anterior.")
+                else:
+                    df_diff, df_paginas_diff = diff['medidas'], diff['paginas']
+                    contagem = df_diff['Status'].value_counts()
+                    c1, c2, c3, c4, c5 = st.columns(5)
+                    c1.metric("Adicionadas", int(contagem['Adicionada']), help="Medidas que só existem na versão atual.")
+                    c2.metric("Removidas", int(contagem['Removida']), help="Medidas que só existem na versão anterior.")
+                    c3.metric("Alteradas", int(contagem['Alterada']), help="Medidas cuja expressão DAX mudou.")
+                    c4.metric("Afetadas", int(contagem['Afetada']), help="Medidas não alteradas que dependem, direta ou transitivamente, de uma medida adicionada, removida ou alterada.")
+                    c5.metric("Páginas Afetadas", len(df_paginas_diff), help="Páginas com visuais que usam alguma medida adicionada, alterada ou afetada (ou removida, pelo relatório anterior).")
+                    
+                    if df_diff.empty:
+                        st.success("✅ Nenhuma diferença nas medidas entre as duas versões.")
+                    else:
+                        st.markdown("##### 📋 Medidas com Diferença")
+                        st.dataframe(df_diff, hide_index=True, use_container_width=True, height=400)
+                        
+                        if not df_paginas_diff.empty:
+                            st.markdown("##### 📄 Páginas Afetadas")
+                            st.dataframe(df_paginas_diff, hide_index=True, use_container_width=True)
+                        
+                        st.sidebar.download_button(
+                            "📄 Baixar Diferenças (CSV)",
+                            df_diff.to_csv(index=False),
+                            "diferencas_medidas.csv",
+                            "text/csv",
+                            use_container_width=True
+                        )
+            else:
+                st.info("Aguardando o ZIP da versão anterior para comparar.")
+
     else:
         st.error("Colunas [Origem] ou [Destino] não encontradas no arquivo.")
 else:
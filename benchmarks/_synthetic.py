@@ -0,0 +1,96 @@
+"""
+Gerador de projetos PBIP sintéticos para os benchmarks.
+Cria tabelas TMDL com medidas encadeadas e uma estrutura de relatório
+(páginas/visuais) no mesmo formato lido pelo app.
+"""
+import json
+import random
+from pathlib import Path
+
+_FUNCOES = ["SUMX", "CALCULATE", "FILTER", "ALL", "RANKX", "DIVIDE", "SUMMARIZECOLUMNS", "ALLEXCEPT", "DATEADD"]
+
+
+def _measure_block(rng, name, measures, columns):
+    refs = rng.sample(measures, min(len(measures), rng.randint(0, 4)))
+    cols = rng.sample(columns, min(len(columns), rng.randint(1, 2)))
+    parts = [f"[{r}]" for r in refs] + [f"'{t}'[{c}]" for t, c in cols]
+    func = rng.choice(_FUNCOES)
+    if rng.random() < 0.4:
+        block = f"\tmeasure '{name}' = {func}({' + '.join(parts)})\n"
+    else:
+        block = (
+            f"\tmeasure '{name}' =\n"
+            f"\t\t\tVAR x = {' + '.join(parts)}\n"
+            f"\t\t\t// comentário\n"
+            f"\t\t\tRETURN {func}(x)\n"
+        )
+    return block + f"\t\tformatString: 0.00\n\t\tlineageTag: {rng.randint(0, 10**9)}\n\n"
+
+
+def write_tmdl_tables(folder, n_tables, measures_per_table=25, seed=0):
+    """Escreve n_tables arquivos .tmdl em folder e retorna a lista de medidas."""
+    rng = random.Random(seed)
+    folder = Path(folder)
+    folder.mkdir(parents=True, exist_ok=True)
+    measures = []
+    columns = [(f"Tabela {t}", c) for t in range(n_tables) for c in ("Valor", "Qtd", "Data")]
+    for t in range(n_tables):
+        text = f"table 'Tabela {t}'\n\tlineageTag: {t}\n\n"
+        for k in range(measures_per_table):
+            name = f"Medida {t}_{k}"
+            text += _measure_block(rng, name, measures, columns)
+            measures.append(name)
+        for c in ("Valor", "Qtd", "Data"):
+            text += f"\tcolumn {c}\n\t\tdataType: decimal\n\t\tsourceColumn: {c}\n\n"
+        text += f"\tpartition 'Tabela {t}' = m\n\t\tmode: import\n\t\tsource =\n\t\t\t\tlet\n\t\t\t\t\tFonte = 1\n\t\t\t\tin\n\t\t\t\t\tFonte\n"
+        (folder / f"Tabela {t}.tmdl").write_text(text, encoding="utf-8")
+    return measures
+
+
+def _formatting_objects(rng, n_objects):
+    # Volume típico de formatação de um visual real (sem referências a medidas)
+    return {
+        f"prop{i}": [{"properties": {
+            "fontSize": {"expr": {"Literal": {"Value": f"{rng.randint(8, 14)}D"}}},
+            "color": {"solid": {"color": {"expr": {"ThemeDataColor": {"ColorId": rng.randint(0, 9), "Percent": 0}}}}},
+            "show": {"expr": {"Literal": {"Value": "true"}}},
+        }}]
+        for i in range(n_objects)
+    }
+
+
+def write_report(folder, measures, n_pages, visuals_per_page=20, seed=0, formatting=0):
+    """
+    Escreve a estrutura definition/pages/*/visuals/*/visual.json em folder.
+    formatting: nº de blocos de formatação extras por visual (aumenta o JSON
+    como em relatórios reais, sem novas medidas).
+    """
+    rng = random.Random(seed)
+    pages = Path(folder) / "definition" / "pages"
+    for p in range(n_pages):
+        page_dir = pages / f"pagina{p:03d}"
+        (page_dir / "visuals").mkdir(parents=True, exist_ok=True)
+        (page_dir / "page.json").write_text(json.dumps({"name": f"pagina{p}", "displayName": f"Página {p}"}), encoding="utf-8")
+        for v in range(visuals_per_page):
+            used = rng.sample(measures, min(len(measures), rng.randint(0, 4)))
+            projections = [
+                {"field": {"Measure": {"Expression": {"SourceRef": {"Entity": "Tabela 0"}}, "Property": m}}}
+                for m in used
+            ]
+            visual = {
+                "name": f"visual{p}_{v}",
+                "position": {"x": v, "y": p, "width": 100, "height": 100},
+                "visual": {
+                    "visualType": "tableEx",
+                    "query": {"queryState": {"Values": {"projections": projections}}},
+                    "objects": {"labels": [{"properties": {"fontSize": {"expr": {"Literal": {"Value": "10D"}}}}}]},
+                    "visualContainerObjects": _formatting_objects(rng, formatting),
+                },
+                "filterConfig": {"filters": [
+                    {"name": f"filtro{i}", "field": {"Column": {"Expression": {"SourceRef": {"Entity": "Tabela 0"}}, "Property": f"Coluna {i}"}}}
+                    for i in range(formatting)
+                ]},
+            }
+            visual_dir = page_dir / "visuals" / f"visual{v:03d}"
+            visual_dir.mkdir(exist_ok=True)
+            (visual_dir / "visual.json").write_text(json.dumps(visual), encoding="utf-8")
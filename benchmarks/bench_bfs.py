@@ -0,0 +1,70 @@
+"""
+Benchmark: travessia do grafo da "Análise por Medida".
+Compara a BFS original (filtro booleano no DataFrame por nó + list.pop(0))
+com a BFS sobre o índice de adjacência CSR, partindo da medida mais
+reutilizada (hub) de um modelo sintético com ~20k arestas.
+
+Uso: python benchmarks/bench_bfs.py
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import engine  # noqa: E402
+from _synthetic import write_tmdl_tables  # noqa: E402
+
+COL_ORIGEM, COL_DESTINO = "[Origem]", "[Destino]"
+
+
+def bfs_dataframe(df_filtrado, raizes, modo_dependencias, modo_dependentes):
+    """Implementação anterior, mantida aqui como referência."""
+    arestas, visitados = [], set()
+    fila = list(raizes)
+    while fila:
+        at = fila.pop(0)
+        if at not in visitados:
+            visitados.add(at)
+            if modo_dependencias:
+                for f in df_filtrado[df_filtrado[COL_DESTINO] == at][COL_ORIGEM].tolist():
+                    arestas.append((at, f))
+                    if f not in visitados: fila.append(f)
+            if modo_dependentes:
+                for p in df_filtrado[df_filtrado[COL_ORIGEM] == at][COL_DESTINO].tolist():
+                    arestas.append((p, at))
+                    if p not in visitados: fila.append(p)
+    return arestas
+
+
+def _timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main():
+    with tempfile.TemporaryDirectory() as temp_dir, tempfile.TemporaryDirectory() as cache_dir:
+        engine.PARSE_CACHE_DIR = Path(cache_dir)
+        write_tmdl_tables(temp_dir, n_tables=200, measures_per_table=30)
+        nodes, edges = engine.build_dependency_store(temp_dir, max_workers=1)
+        df = engine.dependency_edges_frame(nodes, edges)
+
+    index, t_index = _timed(engine.build_adjacency_index, nodes, edges)
+    hub = df.loc[df["[Tipo Origem]"] == "MEASURE", COL_ORIGEM].value_counts().index[0]
+    print(f"{len(nodes)} nós, {len(edges)} arestas; índice construído em {t_index * 1000:.1f} ms; hub = {hub}")
+    print(f"{'direção':<14} {'arestas':>8} {'DataFrame (s)':>14} {'índice (s)':>11} {'speedup':>8}")
+
+    for label, deps, dependentes, raiz in (
+        ("dependências", True, False, df[COL_DESTINO].value_counts().index[0]),
+        ("dependentes", False, True, hub),
+    ):
+        old, t_old = _timed(bfs_dataframe, df, [raiz], deps, dependentes)
+        new, t_new = _timed(engine.traverse_dependencies, index, [raiz], dependencias=deps, dependentes=dependentes)
+        assert old == new, "BFS sobre o índice difere da BFS original"
+        print(f"{label:<14} {len(new):>8} {t_old:>14.3f} {t_new:>11.4f} {t_old / t_new:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
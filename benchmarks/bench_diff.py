@@ -0,0 +1,39 @@
+"""
+Benchmark: diff_models entre duas versões de um modelo sintético
+(1% das medidas com a expressão alterada), confirmando que o tempo cresce
+de forma linear com o número de medidas.
+
+Uso: python benchmarks/bench_diff.py
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import engine  # noqa: E402
+from _synthetic import write_tmdl_tables  # noqa: E402
+
+
+def main():
+    print(f"{'medidas':>8} {'alteradas':>10} {'afetadas':>9} {'diff (s)':>9}")
+    for n_tables in (100, 400, 800):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            engine.PARSE_CACHE_DIR = Path(temp_dir) / "cache"
+            write_tmdl_tables(Path(temp_dir) / "tables", n_tables)
+            anterior = engine.build_dependency_store(Path(temp_dir) / "tables", max_workers=1)
+            nodes, edges = anterior
+            # Nova versão: 1% das medidas com outra expressão, mesmo grafo
+            nodes = nodes.copy()
+            alteradas = nodes.index[(nodes['type'] == 'MEASURE').to_numpy()][::100]
+            nodes.loc[alteradas, 'expression'] = nodes.loc[alteradas, 'expression'] + " + 0"
+            start = time.perf_counter()
+            diff = engine.diff_models(anterior, (nodes, edges))
+            elapsed = time.perf_counter() - start
+            contagem = diff['medidas']['Status'].value_counts()
+            print(f"{n_tables * 25:>8} {contagem['Alterada']:>10} {contagem['Afetada']:>9} {elapsed:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
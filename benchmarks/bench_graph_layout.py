@@ -0,0 +1,83 @@
+"""
+Benchmark: layout em camadas do grafo "Grafo Completo (todos os níveis)"
+calculado em Python (layered_layout) sobre modelos sintéticos crescentes.
+Mede o tempo do layout, os cruzamentos de arestas entre camadas vizinhas sem
+e com a redução por baricentro, e quantos nós o navegador recebe no modo
+nível de detalhe (agrupado por tabela) em vez do grafo inteiro.
+
+Uso: python benchmarks/bench_graph_layout.py
+"""
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import networkx as nx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import engine  # noqa: E402
+from _synthetic import write_tmdl_tables  # noqa: E402
+
+
+def _inversions(values):
+    # Merge sort contando inversões: O(n log n)
+    if len(values) < 2:
+        return values, 0
+    meio = len(values) // 2
+    esquerda, inv_e = _inversions(values[:meio])
+    direita, inv_d = _inversions(values[meio:])
+    merged, i, j, inv = [], 0, 0, inv_e + inv_d
+    while i < len(esquerda) and j < len(direita):
+        if direita[j] < esquerda[i]:
+            merged.append(direita[j])
+            inv += len(esquerda) - i
+            j += 1
+        else:
+            merged.append(esquerda[i])
+            i += 1
+    return merged + esquerda[i:] + direita[j:], inv
+
+
+def count_crossings(G, posicoes):
+    """Cruzamentos entre arestas que ligam camadas vizinhas (ordem de leitura na camada)."""
+    ordem = list(G.nodes())
+    sucessores = {n: list(G.successors(n)) for n in ordem}
+    predecessores = {n: list(G.predecessors(n)) for n in ordem}
+    camada = engine._layer_assignment(ordem, sucessores, predecessores)
+    rank = {n: i for i, n in enumerate(sorted(ordem, key=lambda n: (posicoes[n][1], posicoes[n][0])))}
+    por_par = {}
+    for u, v in G.edges():
+        if camada[v] == camada[u] + 1:
+            por_par.setdefault(camada[u], []).append((rank[u], rank[v]))
+    return sum(_inversions([b for _, b in sorted(pares)])[1] for pares in por_par.values())
+
+
+def main():
+    print(f"{'nós':>6} {'arestas':>8} {'layout (s)':>11} {'cruz. sem red.':>15} {'cruz. com red.':>15} {'nós LOD':>8}")
+    for n_tables in (20, 80, 200):
+        with tempfile.TemporaryDirectory() as temp_dir, tempfile.TemporaryDirectory() as cache_dir:
+            engine.PARSE_CACHE_DIR = Path(cache_dir)
+            measures = write_tmdl_tables(temp_dir, n_tables)
+            nodes, edges = engine.build_dependency_store(temp_dir, max_workers=1)
+            adjacency = engine.build_adjacency_index(nodes, edges)
+            # Grafo completo das dependências das medidas da última tabela, como no app
+            G = nx.DiGraph(engine.traverse_dependencies(adjacency, measures[-25:]))
+
+            sem_reducao = engine.layered_layout(G, iteracoes=0)
+            start = time.perf_counter()
+            posicoes = engine.layered_layout(G)
+            t_layout = time.perf_counter() - start
+
+            grupos = dict(zip(nodes['name'].tolist(), nodes['table'].tolist()))
+            pos_grupos = engine.layered_layout(G, grupos)
+            clusters, no_cluster = engine.collapse_by_group(G, pos_grupos, grupos)
+            n_lod = len(clusters) + len(G) - len(no_cluster)
+            print(
+                f"{len(G):>6} {G.number_of_edges():>8} {t_layout:>11.3f} "
+                f"{count_crossings(G, sem_reducao):>15} {count_crossings(G, posicoes):>15} {n_lod:>8}"
+            )
+
+
+if __name__ == "__main__":
+    main()
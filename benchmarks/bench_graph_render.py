@@ -0,0 +1,82 @@
+"""
+Benchmark: geração do HTML do grafo (pyvis) como era antes (save_graph em um
+arquivo temporário fixo + leitura de volta) x em memória (generate_html), e o
+custo de voltar a uma visão já renderizada (cache LRU do app), sobre grafos
+sintéticos crescentes com o layout em camadas já aplicado.
+
+Uso: python benchmarks/bench_graph_render.py [repetições]
+"""
+import os
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import networkx as nx
+from pyvis.network import Network
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import engine  # noqa: E402
+from _synthetic import write_tmdl_tables  # noqa: E402
+
+
+def _network(G):
+    posicoes = engine.layered_layout(G)
+    net = Network(height="600px", width="100%", directed=True, bgcolor="#ffffff")
+    for node in G.nodes():
+        net.add_node(node, label=node, shape="box", x=posicoes[node][0], y=posicoes[node][1])
+    for u, v in G.edges():
+        net.add_edge(u, v, color="#CCCCCC", width=1)
+    net.set_options('{"physics": {"enabled": false}}')
+    return net
+
+
+def _via_arquivo(net, temp_dir):
+    tmp_p = os.path.join(temp_dir, "graph_pbi.html")
+    net.save_graph(tmp_p)
+    with open(tmp_p, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def _median_time(func, runs):
+    tempos = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = func()
+        tempos.append(time.perf_counter() - start)
+    return result, sorted(tempos)[len(tempos) // 2]
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print(f"{'nós':>6} {'arquivo (s)':>12} {'memória (s)':>12} {'layout+html (s)':>16} {'cache (ms)':>11}")
+    for n_tables in (20, 80, 200):
+        with tempfile.TemporaryDirectory() as temp_dir, tempfile.TemporaryDirectory() as cache_dir:
+            engine.PARSE_CACHE_DIR = Path(cache_dir)
+            measures = write_tmdl_tables(Path(temp_dir) / "tables", n_tables)
+            nodes, edges = engine.build_dependency_store(Path(temp_dir) / "tables", max_workers=1)
+            adjacency = engine.build_adjacency_index(nodes, edges)
+            G = nx.DiGraph(engine.traverse_dependencies(adjacency, measures[-25:]))
+            net = _network(G)
+
+            # save_graph com cdn local copia a pasta lib/ para o diretório atual
+            cwd = os.getcwd()
+            os.chdir(temp_dir)
+            try:
+                html_arquivo, t_arquivo = _median_time(lambda: _via_arquivo(net, temp_dir), runs)
+            finally:
+                os.chdir(cwd)
+            html_memoria, t_memoria = _median_time(net.generate_html, runs)
+            assert html_arquivo == html_memoria, "HTML em memória difere do arquivo"
+
+            _, t_total = _median_time(lambda: _network(G).generate_html(), runs)
+            cache = OrderedDict(((n, 'medidas'), html_memoria) for n in range(16))
+            chave = (8, 'medidas')
+            _, t_cache = _median_time(lambda: (cache.move_to_end(chave), cache[chave]), runs)
+            print(f"{len(G):>6} {t_arquivo:>12.4f} {t_memoria:>12.4f} {t_total:>16.4f} {t_cache * 1000:>11.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+Benchmark: tempo de importação a frio (processo Python novo a cada medição)
+do motor, dos relatórios e do app Streamlit (em modo bare), e quais
+dependências pesadas cada import carrega.
+
+Uso: python benchmarks/bench_import_time.py [repetições]
+"""
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+HEAVY = ("streamlit", "plotly", "pyvis", "openpyxl", "networkx")
+
+_PROBE = """
+import sys, time
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(f"{{elapsed}}|{{','.join(m for m in {heavy!r} if m in sys.modules)}}")
+"""
+
+
+def _cold_import(module):
+    code = _PROBE.format(root=str(ROOT), module=module, heavy=HEAVY)
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, cwd=ROOT).stdout
+    # Última linha: o app em modo bare pode imprimir avisos antes
+    elapsed, loaded = out.strip().splitlines()[-1].split("|")
+    return float(elapsed), loaded
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print(f"{'módulo':>8} {'mediana (s)':>12}  dependências pesadas carregadas")
+    for module in ("engine", "reports", "app"):
+        results = [_cold_import(module) for _ in range(runs)]
+        print(f"{module:>8} {statistics.median(t for t, _ in results):>12.3f}  {results[-1][1] or '-'}")
+
+
+if __name__ == "__main__":
+    main()
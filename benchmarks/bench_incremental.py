@@ -0,0 +1,71 @@
+"""
+Benchmark: reanálise de uma nova versão do mesmo projeto (uma tabela e um
+visual alterados) do zero x incremental (memo da versão anterior).
+Mede parse do TMDL, referências, estrutura do relatório e scores, com o
+cache de parsing em disco vazio, e confere que os dois modos dão o mesmo
+resultado.
+
+Uso: python benchmarks/bench_incremental.py
+"""
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import engine  # noqa: E402
+from _synthetic import write_report, write_tmdl_tables  # noqa: E402
+
+
+def _analyze(tables, report, memo):
+    nodes, edges = engine.build_dependency_store(tables, max_workers=1, memo=memo)
+    info_map = engine.build_info_map(nodes, edges)
+    dependentes = engine.count_measure_dependents(nodes, edges)
+    scores = engine.calcular_complexity_scores(
+        ((m, info['exp']) for m, info in info_map.items() if info['tipo'] == 'MEASURE'), dependentes, max_workers=1, memo=memo
+    )
+    return nodes, edges, scores, engine.build_structure_dataframe(report, memo=memo)
+
+
+def _timed(tables, report, memo):
+    # Cache de parsing vazio a cada medição (mede o trabalho, não o cache em disco)
+    with tempfile.TemporaryDirectory() as cache_dir:
+        engine.PARSE_CACHE_DIR = Path(cache_dir)
+        start = time.perf_counter()
+        result = _analyze(tables, report, memo)
+        return result, time.perf_counter() - start
+
+
+def _new_version(tables, report, n_tables):
+    # Uma tabela com uma medida a mais e um visual com outra medida
+    table = Path(tables) / f"Tabela {n_tables // 2}.tmdl"
+    table.write_text(table.read_text(encoding="utf-8") + "\tmeasure 'Nova' = SUMX('Tabela 0'[Valor], [Medida 0_0])\n", encoding="utf-8")
+    visual = sorted(Path(report).rglob("visual.json"))[0]
+    data = json.loads(visual.read_text(encoding="utf-8"))
+    data["visual"]["query"]["queryState"]["Values"]["projections"].append(
+        {"field": {"Measure": {"Expression": {"SourceRef": {"Entity": "Tabela 0"}}, "Property": "Nova"}}}
+    )
+    visual.write_text(json.dumps(data), encoding="utf-8")
+
+
+def main():
+    print(f"{'tabelas':>8} {'medidas':>8} {'do zero (s)':>12} {'incremental (s)':>16} {'speedup':>8}")
+    for n_tables in (40, 160, 320):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            tables, report = Path(temp_dir) / "tables", Path(temp_dir) / "report"
+            measures = write_tmdl_tables(tables, n_tables)
+            write_report(report, measures, n_pages=n_tables // 4, visuals_per_page=20)
+            memo = {}
+            _timed(tables, report, memo)  # Versão anterior, já analisada
+            _new_version(tables, report, n_tables)
+            full, t_full = _timed(tables, report, None)
+            incremental, t_incremental = _timed(tables, report, memo)
+            assert all(a.equals(b) for a, b in zip(full, incremental)), "incremental difere da análise do zero"
+            print(f"{n_tables:>8} {len(measures) + 1:>8} {t_full:>12.3f} {t_incremental:>16.3f} {t_full / t_incremental:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Micro-benchmark: construção do info_map em um modelo sintético com 50k arestas.
+Compara o laço df.iterrows() sobre o DataFrame com expressões por aresta
+(formato anterior) com build_info_map sobre a tabela de nós.
+
+Uso: python benchmarks/bench_info_map.py
+"""
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import engine  # noqa: E402
+
+N_MEDIDAS, N_COLUNAS, N_ARESTAS = 12_000, 3_000, 50_000
+
+
+def synthetic_store(seed=0):
+    rng = np.random.default_rng(seed)
+    linhas = "VAR x = CALCULATE([Base], ALL('Tabela'))_x000D_\n"
+    names = [f"Medida {i}" for i in range(N_MEDIDAS)] + [f"Tabela {i % 50}[Coluna {i}]" for i in range(N_COLUNAS)]
+    expressions = [linhas * int(rng.integers(1, 30)) + "RETURN x" for _ in range(N_MEDIDAS)] + [""] * N_COLUNAS
+    nodes = pd.DataFrame({
+        "name": names,
+        "type": pd.Categorical(["MEASURE"] * N_MEDIDAS + ["COLUMN"] * N_COLUNAS),
+        "expression": expressions,
+    })
+    edges = pd.DataFrame({
+        "src": rng.integers(0, len(names), N_ARESTAS).astype(np.int32),
+        "dst": rng.integers(0, N_MEDIDAS, N_ARESTAS).astype(np.int32),
+    })
+    return nodes, edges
+
+
+def info_map_iterrows(df):
+    """Implementação anterior (uma iteração por aresta), mantida como referência."""
+    info_map = {}
+    for _, row in df.iterrows():
+        dest = str(row["[Destino]"])
+        orig = str(row["[Origem]"])
+        info_map[dest] = {"exp": engine.limpar_dax(row["[Expressão Destino]"]), "tipo": "MEASURE"}
+        if orig not in info_map or not info_map[orig]["exp"]:
+            info_map[orig] = {"exp": engine.limpar_dax(row["[Expressão Origem]"]), "tipo": str(row["[Tipo Origem]"])}
+    return info_map
+
+
+def main():
+    nodes, edges = synthetic_store()
+    df = engine.dependency_edges_frame(nodes, edges)
+    expr = nodes["expression"].to_numpy()
+    df["[Expressão Origem]"] = expr[edges["src"].to_numpy()]
+    df["[Expressão Destino]"] = expr[edges["dst"].to_numpy()]
+
+    start = time.perf_counter()
+    old = info_map_iterrows(df)
+    t_old = time.perf_counter() - start
+    start = time.perf_counter()
+    new = engine.build_info_map(nodes, edges)
+    t_new = time.perf_counter() - start
+
+    assert old == new, "build_info_map difere da implementação com iterrows"
+    print(f"{len(edges)} arestas, {len(new)} nós únicos")
+    print(f"iterrows:       {t_old:.3f} s")
+    print(f"build_info_map: {t_new:.3f} s ({t_old / t_new:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
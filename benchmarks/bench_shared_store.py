@@ -0,0 +1,77 @@
+"""
+Benchmark: várias sessões analisando o mesmo projeto ao mesmo tempo, cada
+uma com sua análise x pelo armazenamento compartilhado (analysis_store, com
+cálculo único por chave). Mede o tempo até todas terem o resultado, quantas
+análises rodaram e a memória estimada ocupada, e confere o descarte por LRU
+com um limite menor que dois modelos.
+
+Uso: python benchmarks/bench_shared_store.py [sessões]
+"""
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import analysis_store  # noqa: E402
+import engine  # noqa: E402
+from _synthetic import write_report, write_tmdl_tables  # noqa: E402
+
+_execucoes = []
+
+
+def _analyze(tables, report):
+    _execucoes.append(1)
+    nodes, edges = engine.build_dependency_store(tables, max_workers=1)
+    adjacency = engine.build_adjacency_index(nodes, edges)
+    df_st = engine.build_structure_dataframe(report, max_workers=1)
+    return {
+        'nodes': nodes,
+        'edges': edges,
+        'info_map': engine.build_info_map(nodes, edges),
+        'reachability': engine.build_reachability_index(adjacency),
+        'page_index': engine.build_page_index(df_st),
+    }
+
+
+def _sessions(n_sessions, task):
+    _execucoes.clear()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(n_sessions) as pool:
+        results = list(pool.map(lambda _: task(), range(n_sessions)))
+    return results, time.perf_counter() - start, len(_execucoes)
+
+
+def main():
+    n_sessions = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    print(f"{'medidas':>8} {'modo':>14} {'tempo (s)':>10} {'análises':>9} {'memória (MB)':>13}")
+    for n_tables in (40, 160):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            tables, report = Path(temp_dir) / "tables", Path(temp_dir) / "report"
+            measures = write_tmdl_tables(tables, n_tables)
+            write_report(report, measures, n_pages=n_tables // 4, visuals_per_page=20)
+            engine.PARSE_CACHE_DIR = Path(temp_dir) / "cache"
+            _analyze(tables, report)  # Cache de parsing em disco já populado nos dois modos
+
+            results, elapsed, runs = _sessions(n_sessions, lambda: _analyze(tables, report))
+            mb = sum(map(analysis_store.estimate_size, results)) / 2**20
+            print(f"{len(measures):>8} {'por sessão':>14} {elapsed:>10.3f} {runs:>9} {mb:>13.1f}")
+
+            chave = (f"modelo-{n_tables}", 'analise')
+            results, elapsed, runs = _sessions(n_sessions, lambda: analysis_store.get_or_compute(chave, _analyze, tables, report))
+            assert all(r is results[0] for r in results), "sessões receberam resultados diferentes"
+            mb = analysis_store.store_stats()['bytes'] / 2**20
+            print(f"{len(measures):>8} {'compartilhado':>14} {elapsed:>10.3f} {runs:>9} {mb:>13.1f}")
+
+    # Limite menor que dois modelos: o usado há mais tempo (aqui o de 160 tabelas) é descartado
+    estatisticas = analysis_store.store_stats()
+    recente = analysis_store.get(("modelo-40", 'analise'))
+    analysis_store.evict(analysis_store.estimate_size(recente))
+    restantes = [n for n in (40, 160) if analysis_store.get((f"modelo-{n}", 'analise')) is not None]
+    print(f"LRU: {estatisticas['entradas']} entradas -> modelos restantes após o limite: {restantes}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Benchmark: build_structure_dataframe com leitura serial (padrão) x pool
+de threads (max_workers > 1) sobre um relatório sintético (páginas x
+visuais), com o cache de parsing vazio a cada medição. Confere que os
+dois modos produzem exatamente a mesma tabela (Página, Visual, Medida).
+
+Uso: python benchmarks/bench_visual_scan.py [workers]
+"""
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import engine  # noqa: E402
+from _synthetic import write_report  # noqa: E402
+
+
+def _timed(func, *args):
+    # Cache de parsing vazio a cada medição (mede leitura + parse, não o cache)
+    with tempfile.TemporaryDirectory() as cache_dir:
+        engine.PARSE_CACHE_DIR = Path(cache_dir)
+        start = time.perf_counter()
+        result = func(*args)
+        return result, time.perf_counter() - start
+
+
+def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else min(32, (os.cpu_count() or 1) + 4)
+    measures = [f"Medida {i}" for i in range(500)]
+    print(f"{'páginas':>8} {'visuais':>8} {'serial (s)':>11} {'threads (s)':>12} {'speedup':>8}")
+    for n_pages in (10, 40, 80):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            write_report(temp_dir, measures, n_pages, visuals_per_page=40, formatting=30)
+            df_serial, t_serial = _timed(engine.build_structure_dataframe, temp_dir, 1)
+            df_threads, t_threads = _timed(engine.build_structure_dataframe, temp_dir, workers)
+            assert df_serial.equals(df_threads), "resultado com threads difere do serial"
+            print(f"{n_pages:>8} {n_pages * 40:>8} {t_serial:>11.3f} {t_threads:>12.3f} {t_serial / t_threads:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Análise em lote (sem interface) de vários projetos PBIP.
+
+Procura todos os modelos semânticos (*.SemanticModel/definition/tables) sob
+um diretório, analisa um modelo por processo usando o mesmo motor do app
+(engine.py, sem Streamlit) e grava um resumo por modelo em JSON, CSV ou Parquet.
+
+Uso:
+    python cli.py <diretorio> [-o resumo.json] [--formato json|csv|parquet] [--workers N]
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+import engine
+
+SUMMARY_COLUMNS = [
+    'modelo', 'caminho', 'medidas', 'colunas_referenciadas', 'tabelas_referenciadas', 'relacionamentos', 'paginas', 'visuais',
+    'medidas_em_visuais', 'medidas_orfas', 'complexidade_media', 'medidas_criticas',
+    'top_impacto', 'top_impacto_dependentes', 'segundos', 'erro'
+]
+OUTPUT_FORMATS = ('json', 'csv', 'parquet')
+
+def find_projects(root):
+    """
+    (modelo, pasta definition/tables, pasta do .Report ou None) de cada modelo
+    semântico encontrado sob root. O relatório é a pasta irmã <nome>.Report.
+    """
+    projetos = []
+    for tables in sorted(Path(root).rglob('definition/tables')):
+        model_dir = tables.parent.parent
+        if not tables.is_dir() or not model_dir.name.endswith('.SemanticModel'):
+            continue
+        nome = model_dir.name[:-len('.SemanticModel')]
+        report_dir = model_dir.with_name(f"{nome}.Report")
+        projetos.append((nome, str(tables), str(report_dir) if report_dir.is_dir() else None))
+    return projetos
+
+def analyze_project(projeto):
+    """
+    Summary record of one model (same numbers as the Global dashboard).
+    Runs serially inside its worker: the batch parallelism is across models.
+    Errors are recorded in the 'erro' field instead of aborting the batch.
+    """
+    nome, tables, report = projeto
+    inicio = time.perf_counter()
+    resumo = dict.fromkeys(SUMMARY_COLUMNS)
+    resumo.update(modelo=nome, caminho=str(Path(tables).parent.parent))
+    try:
+        store = engine.build_dependency_store(tables, max_workers=1)
+        if store is None:
+            resumo['erro'] = "Nenhuma medida ou dependência encontrada"
+            return resumo
+        nodes, edges = store
+        tipos = nodes['type']
+        is_measure = (tipos == 'MEASURE').to_numpy()
+
+        page_index = None
+        resumo['visuais'] = 0
+        if report is not None:
+            df_st = engine.build_structure_dataframe(report, max_workers=1)
+            if df_st is not None:
+                page_index = engine.build_page_index(df_st)
+                resumo['visuais'] = int(df_st[['Página', 'Visual']].drop_duplicates().shape[0])
+        medidas_em_visuais = set(page_index['medidas']) if page_index is not None else set()
+
+        # Score de complexidade das medidas do grafo, como no dashboard
+        info_map = engine.build_info_map(nodes, edges)
+        df_complexidade = engine.calcular_complexity_scores(
+            ((m, info['exp']) for m, info in info_map.items() if info['tipo'] == 'MEASURE'),
+            engine.count_measure_dependents(nodes, edges), max_workers=1
+        )
+
+        adjacency = engine.build_adjacency_index(nodes, edges)
+        reachability = engine.build_reachability_index(adjacency)
+        top = engine.top_impact_measures(nodes, edges, reachability, n=1)
+
+        resumo.update(
+            medidas=int(is_measure.sum()),
+            colunas_referenciadas=int(tipos.isin(['COLUMN', 'CALC_COLUMN']).sum()),
+            tabelas_referenciadas=int(tipos.isin(['TABLE', 'CALC_TABLE']).sum()),
+            relacionamentos=len(edges),
+            paginas=len(page_index['paginas']) if page_index is not None else 0,
+            medidas_em_visuais=len(medidas_em_visuais),
+            medidas_orfas=len(engine.find_orphan_measures(nodes, edges, medidas_em_visuais)),
+            complexidade_media=round(float(df_complexidade['score'].mean()), 1) if len(df_complexidade) else 0.0,
+            medidas_criticas=int((df_complexidade['score'] > 80).sum()),
+            top_impacto=top[0]['medida'] if top else None,
+            top_impacto_dependentes=top[0]['impacto'] if top else None,
+        )
+    except Exception as e:
+        resumo['erro'] = f"{type(e).__name__}: {e}"
+    finally:
+        resumo['segundos'] = round(time.perf_counter() - inicio, 3)
+    return resumo
+
+def write_summary(registros, saida, formato):
+    """Grava os registros no formato pedido (parquet exige pyarrow)."""
+    if formato == 'json':
+        with open(saida, 'w', encoding='utf-8') as f:
+            json.dump(registros, f, ensure_ascii=False, indent=2)
+        return
+    # Tipos anuláveis: contagens continuam inteiras nos modelos que falharam
+    df = pd.DataFrame(registros, columns=SUMMARY_COLUMNS).convert_dtypes()
+    if formato == 'csv':
+        df.to_csv(saida, index=False, encoding='utf-8')
+    else:
+        df.to_parquet(saida, index=False)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Análise em lote de projetos PBIP (Semantic Model Insights).")
+    parser.add_argument('diretorio', help="Diretório com um ou mais projetos PBIP (busca recursiva)")
+    parser.add_argument('-o', '--saida', default='resumo_modelos.json', help="Arquivo de saída (padrão: resumo_modelos.json)")
+    parser.add_argument('--formato', choices=OUTPUT_FORMATS, help="Formato da saída (padrão: extensão do arquivo, ou json)")
+    parser.add_argument('--workers', type=int, default=None, help="Processos em paralelo (padrão: todos os núcleos)")
+    args = parser.parse_args(argv)
+
+    formato = args.formato or Path(args.saida).suffix.lstrip('.').lower()
+    if formato not in OUTPUT_FORMATS:
+        formato = 'json'
+
+    projetos = find_projects(args.diretorio)
+    if not projetos:
+        print(f"Nenhum modelo semântico encontrado em {args.diretorio}", file=sys.stderr)
+        return 1
+
+    inicio = time.perf_counter()
+    # Um modelo por processo; cada worker roda o motor em série
+    registros = engine.parallel_map(analyze_project, projetos, max_workers=args.workers, min_tasks=2)
+    write_summary(registros, args.saida, formato)
+
+    falhas = sum(1 for r in registros if r['erro'])
+    print(
+        f"{len(registros)} modelos analisados em {time.perf_counter() - inicio:.1f}s "
+        f"({falhas} com erro) -> {args.saida}",
+        file=sys.stderr
+    )
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,1590 @@
+"""
+Motor de análise do Semantic Model Insights, independente da interface.
+
+Parsing de TMDL e visual.json, grafo de dependências (nós/arestas, CSR,
+alcançabilidade), score de complexidade DAX e estrutura do relatório
+(índice página x medida e estatísticas por página). Não importa Streamlit:
+pode ser usado por processos worker, pela CLI (cli.py) e por benchmarks.
+"""
+import pandas as pd
+import numpy as np
+import tempfile
+import os
+import json
+import io
+import re
+import pickle
+import hashlib
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from collections import Counter, OrderedDict, deque
+from pathlib import Path
+
+# --- FUNÇÕES AUXILIARES ---
+def limpar_dax(texto):
+    if pd.isnull(texto) or texto == "None":
+        return ""
+    return str(texto).replace("_x000D_", "").strip()
+
+# --- FUNÇÕES DE PARSING TMDL OTIMIZADAS ---
+# Compilar regex patterns uma vez (muito mais rápido)
+# Lexer DAX único (referências do grafo e score de complexidade), uma passada:
+# comentários (//, --, /* */) e strings são consumidos inteiros; [nome] pode vir
+# qualificado por 'tabela' (aspas, '' escapado) ou por um identificador, com ou sem
+# espaço antes do colchete; ]] dentro do colchete é um ] escapado. 'tabela' e
+# identificadores soltos também são capturados (possíveis referências a tabelas,
+# ex. FILTER(Vendas, ...)); um identificador seguido de ( é chamada de função.
+# Identificador: letra Unicode ou _, depois letras, dígitos, _ ou . (PERCENTILE.INC);
+# números (1e5, 2.5) são consumidos inteiros.
+# O grupo que fechou por último (lastgroup) diz qual dos casos casou.
+_DAX_IDENTIFIER = r"[^\W\d]\w*(?:\.\w+)*"
+_DAX_TOKEN_PATTERN = re.compile(
+    r"(?P<comment>//[^\n]*|--[^\n]*|/\*.*?(?:\*/|\Z))"
+    r"|(?P<string>\"(?:[^\"]|\"\")*\"?)"
+    r"|(?P<number>\d[\w.]*)"
+    r"|'(?P<quoted>(?:[^']|'')*)'?(?:\s*\[(?P<qname>(?:[^\]]|\]\])*)\])?"
+    r"|(?P<ident>" + _DAX_IDENTIFIER + r")(?:(?P<call>\s*\()|\s*\[(?P<iname>(?:[^\]]|\]\])*)\])?"
+    r"|\[(?P<name>(?:[^\]]|\]\])*)\]"
+    r"|(?P<open>\()|(?P<close>\))|(?P<comma>,)",
+    re.S
+)
+# Palavras-chave (RETURN[Medida], VAR x) não são nomes de tabela
+_DAX_KEYWORDS = frozenset({'VAR', 'RETURN', 'IN', 'NOT', 'AND', 'OR', 'DEFINE', 'MEASURE', 'EVALUATE', 'ORDER', 'BY', 'ASC', 'DESC'})
+# Declarações TMDL reconhecidas pelo tokenizador: "<tipo> <nome> [= expressão]" ou "source = ..."
+_DECLARATION_PATTERN = re.compile(
+    r"(?:(measure|column|partition|annotation|table)\s+('(?:[^']|'')*'|\"[^\"]*\"|[^=]+?)|(source))"
+    r"\s*(?:=\s*(.*))?$"
+)
+# Pasta de exibição de uma medida ou coluna (propriedade, não declaração)
+_DISPLAY_FOLDER_PATTERN = re.compile(r"displayFolder\s*:\s*(.*)$")
+# Todas as propriedades que encerram uma expressão em UMA alternação pré-compilada
+_PROPERTY_PATTERN = re.compile(
+    r"(?:(?:formatString|displayFolder|lineageTag|sourceLineageTag|dataCategory|dataType|"
+    r"sourceColumn|summarizeBy|sortByColumn|mode|queryGroup|description)\s*:"
+    r"|(?:annotation|extendedProperty)\s"
+    r"|(?:changedProperty|formatStringDefinition|source)\s*="
+    r"|(?:isHidden|isKey|isNameInferred|isDataTypeInferred|isAvailableInMdx)\b)"
+)
+
+def _indent_width(line):
+    return len(line) - len(line.lstrip(' \t'))
+
+def _unquote_tmdl_name(raw_name):
+    raw_name = raw_name.strip()
+    if len(raw_name) >= 2 and raw_name[0] == raw_name[-1] and raw_name[0] in "'\"":
+        return raw_name[1:-1].replace("''", "'")
+    return raw_name
+
+def iter_tmdl_tokens(lines):
+    """
+    Streaming TMDL tokenizer (single pass, bounded memory).
+    Accepts any iterable of lines (e.g. an open file) and yields tuples
+    (kind, name, expression) with kind in: 'table', 'measure', 'column',
+    'calc_column', 'partition', 'source', 'annotation' and 'display_folder'
+    (name is the folder of the preceding measure or column).
+    Only the expression currently being read is kept in memory.
+    """
+    lines = iter(lines)
+    pending = None
+
+    while True:
+        if pending is not None:
+            line, pending = pending, None
+        else:
+            line = next(lines, None)
+            if line is None:
+                return
+
+        stripped = line.strip()
+        decl = _DECLARATION_PATTERN.match(stripped)
+        if not decl:
+            folder = _DISPLAY_FOLDER_PATTERN.match(stripped)
+            if folder:
+                yield ('display_folder', _unquote_tmdl_name(folder.group(1)), '')
+            continue
+
+        kind, raw_name, source_kw, rest = decl.groups()
+        kind = kind or source_kw
+        name = _unquote_tmdl_name(raw_name) if raw_name else ''
+
+        if rest is None:
+            # Declaração sem expressão (table, column de dados)
+            yield (kind, name, '')
+            continue
+
+        if kind == 'column':
+            kind = 'calc_column'
+        rest = rest.strip()
+
+        if rest.startswith('```'):
+            # Expressão delimitada por crases: lê até o fechamento
+            expression_lines = []
+            for next_line in lines:
+                if next_line.strip() == '```':
+                    break
+                expression_lines.append(next_line)
+        else:
+            # Continuação: linhas mais indentadas que a declaração e que não sejam propriedades
+            decl_indent = _indent_width(line)
+            expression_lines = [rest + '\n'] if rest else []
+            for next_line in lines:
+                stripped = next_line.strip()
+                if stripped and (_indent_width(next_line) <= decl_indent or _PROPERTY_PATTERN.match(stripped)):
+                    pending = next_line  # Reprocessar como possível nova declaração
+                    break
+                expression_lines.append(next_line)
+
+        yield (kind, name, ''.join(expression_lines).strip())
+
+# --- CACHE PERSISTENTE DE PARSING (chaveado pelo hash do conteúdo) ---
+# Sobrevive a reruns e a novos uploads: o caminho temporário muda, o conteúdo não.
+# Guarda DAX do modelo: fica no diretório do usuário (0700), configurável pela
+# variável de ambiente SMI_PARSE_CACHE_DIR; vazia desativa o cache (None).
+_PARSE_CACHE_DIR_ENV = os.environ.get("SMI_PARSE_CACHE_DIR")
+PARSE_CACHE_DIR = None if _PARSE_CACHE_DIR_ENV == "" else Path(_PARSE_CACHE_DIR_ENV or Path.home() / ".cache" / "pbi_parse_cache")
+PARSE_CACHE_MAX_BYTES = 256 * 1024 * 1024  # Excedente é removido por LRU
+_parse_cache_bytes = None  # Tamanho do cache estimado por este processo (medido na primeira escrita)
+_PARSE_CACHE_VERSION = "4"  # Incrementar quando o formato de saída dos parsers mudar
+
+def _bytes_key(data, kind):
+    return f"{kind}-{_PARSE_CACHE_VERSION}-{hashlib.sha256(data).hexdigest()}"
+
+def _read_source(source):
+    # Fonte = caminho no disco ou bytes já em memória (membro do ZIP)
+    if isinstance(source, bytes):
+        return source
+    with open(source, 'rb') as f:
+        return f.read()
+
+def _parse_cache_get(key):
+    if PARSE_CACHE_DIR is None:
+        return None
+    path = PARSE_CACHE_DIR / f"{key}.json"
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            value = json.load(f)
+        os.utime(path)  # Marca como usado recentemente (LRU por mtime)
+        return value
+    except (OSError, ValueError):
+        return None
+
+def _parse_cache_put(key, value):
+    global _parse_cache_bytes
+    if PARSE_CACHE_DIR is None:
+        return
+    data = json.dumps(value, ensure_ascii=False).encode('utf-8')
+    try:
+        PARSE_CACHE_DIR.mkdir(mode=0o700, parents=True, exist_ok=True)
+        # Escrita atômica: processos paralelos nunca leem um arquivo pela metade (mkstemp cria com 0600)
+        fd, tmp_path = tempfile.mkstemp(dir=PARSE_CACHE_DIR, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, PARSE_CACHE_DIR / f"{key}.json")
+    except OSError:
+        return  # O cache é apenas uma otimização
+    # O diretório só é varrido na primeira escrita do processo e quando a estimativa passa do limite
+    if _parse_cache_bytes is None:
+        _parse_cache_bytes = sum(size for _, size, _ in _parse_cache_entries())
+    else:
+        _parse_cache_bytes += len(data)
+    if _parse_cache_bytes > PARSE_CACHE_MAX_BYTES:
+        # Desce a 3/4 do limite: as próximas escritas não varrem o diretório de novo
+        evict_parse_cache(PARSE_CACHE_MAX_BYTES * 3 // 4)
+
+def _parse_cache_entries():
+    # (mtime, tamanho, caminho) de cada arquivo do cache
+    entries = []
+    try:
+        for entry in os.scandir(PARSE_CACHE_DIR):
+            if entry.is_file():
+                st_entry = entry.stat()
+                entries.append((st_entry.st_mtime, st_entry.st_size, entry.path))
+    except (OSError, TypeError):
+        pass
+    return entries
+
+def evict_parse_cache(max_bytes=None):
+    """
+    Remove the least recently used entries until the on-disk parse cache
+    fits in max_bytes (default PARSE_CACHE_MAX_BYTES). Called by the cache
+    writes themselves, only when the size this process estimates (measured
+    on its first write, plus what it wrote since) goes past the limit.
+    """
+    global _parse_cache_bytes
+    if PARSE_CACHE_DIR is None:
+        return
+    max_bytes = PARSE_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    entries = _parse_cache_entries()
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+    _parse_cache_bytes = total
+
+def _tmdl_symbols(tokens):
+    """
+    Symbols of one TMDL file from its token stream (single pass):
+    (kind, table, name, expression, display_folder) tuples, kind being TABLE,
+    CALC_TABLE, COLUMN, CALC_COLUMN or MEASURE (the node types of the
+    dependency graph). table is the host table (the table itself for
+    TABLE/CALC_TABLE); a table whose partition is "calculated" becomes
+    CALC_TABLE with the DAX of the partition source as expression.
+    """
+    symbols = []
+    table = table_pos = last_pos = None
+    calculated = False
+    for kind, name, expression in tokens:
+        if kind == 'table':
+            table, table_pos, last_pos, calculated = name, len(symbols), None, False
+            symbols.append(('TABLE', name, name, '', ''))
+        elif kind in ('measure', 'column', 'calc_column'):
+            last_pos = len(symbols)
+            symbols.append((kind.upper(), table, name, expression, ''))
+        elif kind == 'display_folder':
+            if last_pos is not None:
+                symbols[last_pos] = symbols[last_pos][:4] + (name,)
+        elif kind == 'partition':
+            calculated, last_pos = expression.lower() == 'calculated', None
+        elif kind == 'source' and calculated and table_pos is not None:
+            # Tabela calculada: a expressão DAX vem no source da partição
+            symbols[table_pos] = ('CALC_TABLE', table, table, expression, '')
+            calculated = False
+    return symbols
+
+def parse_tmdl_file_cached(source):
+    """
+    Parse a TMDL file (CACHED on disk by content hash, safe in worker processes).
+    source: path of the .tmdl file or its raw bytes (in-memory ZIP member).
+    Returns the file's symbols as (kind, table, name, expression,
+    display_folder) tuples: tables, columns, calculated columns/tables and
+    measures, in file order.
+    """
+    raw = _read_source(source)
+    key = _bytes_key(raw, 'tmdl')
+    cached = _parse_cache_get(key)
+    if cached is not None:
+        return [tuple(m) for m in cached]
+    
+    with io.TextIOWrapper(io.BytesIO(raw), encoding='utf-8') as f:
+        # O conteúdo é consumido linha a linha pelo tokenizador (sem readlines)
+        symbols = _tmdl_symbols(iter_tmdl_tokens(f))
+    _parse_cache_put(key, symbols)
+    return symbols
+
+# --- PROCESSAMENTO PARALELO ---
+_PARALLEL_MIN_TASKS = 16  # Abaixo disso o custo de subir processos supera o ganho
+
+def parallel_map(func, tasks, max_workers=None, min_tasks=_PARALLEL_MIN_TASKS):
+    """
+    Apply func to every task with a ProcessPoolExecutor, preserving input order
+    so the result is identical to the serial path.
+    max_workers=None uses all cores; max_workers=1 (or few tasks) runs serially.
+    Falls back to serial if the platform cannot start worker processes.
+    """
+    workers = max(1, min(max_workers or os.cpu_count() or 1, len(tasks)))
+    if workers > 1 and len(tasks) >= min_tasks:
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                # Lotes grandes reduzem o overhead de IPC por tarefa
+                chunksize = max(1, len(tasks) // (workers * 4))
+                return list(executor.map(func, tasks, chunksize=chunksize))
+        except (OSError, BrokenProcessPool, pickle.PicklingError):
+            pass  # Ambiente sem suporte a processos: segue em série
+    return [func(task) for task in tasks]
+
+# --- REANÁLISE INCREMENTAL ---
+# memo: dict mantido pelo chamador entre análises (ex.: session_state), com uma
+# seção por etapa: 'tmdl' e 'visual' (hash do arquivo -> resultado do parse),
+# 'references' (expressão -> referências) e 'score' ((expressão, dependentes) -> linha).
+# Cada seção guarda só o que a análise atual usa, então o tamanho é o de um modelo.
+
+def _memoized_map(memo, kind, sources, func, mapper):
+    """
+    Results of func for every source, computing only the sources whose content
+    hash is not in memo[kind] yet. mapper(func, tasks) runs the misses (process
+    or thread pool) and must preserve order. memo[kind] is replaced by the
+    entries of the current sources.
+    """
+    raws = [_read_source(source) for source in sources]
+    keys = [_bytes_key(raw, kind) for raw in raws]
+    anterior = memo.get(kind, {})
+    faltando = {key: raw for key, raw in zip(keys, raws) if key not in anterior}
+    novos = dict(zip(faltando, mapper(func, list(faltando.values()))))
+    memo[kind] = {key: anterior[key] if key in anterior else novos[key] for key in keys}
+    return [memo[kind][key] for key in keys]
+
+def parse_tmdl_symbols(tmdl_source, max_workers=None, memo=None):
+    """
+    Parse every .tmdl file of a folder, in parallel when worth it.
+    tmdl_source: the definition/tables folder, or a list of file contents
+    (bytes) already read from an in-memory ZIP, in sorted member order.
+    Unchanged files are served from the content-hash cache (or from memo,
+    without touching the disk, on an incremental re-analysis). Files are
+    processed in sorted order, so the merged list of (kind, table, name,
+    expression, display_folder) symbols is deterministic.
+    """
+    if isinstance(tmdl_source, (str, os.PathLike)):
+        tmdl_files = sorted(str(p) for p in Path(tmdl_source).glob('*.tmdl'))
+    else:
+        tmdl_files = list(tmdl_source)
+    if memo is None:
+        parsed = parallel_map(parse_tmdl_file_cached, tmdl_files, max_workers)
+    else:
+        parsed = _memoized_map(memo, 'tmdl', tmdl_files, parse_tmdl_file_cached,
+                               lambda func, tasks: parallel_map(func, tasks, max_workers))
+    symbols = []
+    for file_symbols in parsed:
+        symbols.extend(file_symbols)
+    return symbols
+
+def build_symbol_catalog(symbols):
+    """
+    Hashed indexes of the model symbols (see parse_tmdl_symbols), so any DAX
+    reference resolves in constant time:
+    - 'tables': {table: (kind, expression)}, kind TABLE or CALC_TABLE
+    - 'columns': {(table, column): (kind, expression, display_folder)},
+      kind COLUMN or CALC_COLUMN
+    - 'columns_by_name': {column: tuple of tables that have it}
+    - 'measures': {measure: (host table, display_folder)}
+    """
+    tables, columns, columns_by_name, measures = {}, {}, {}, {}
+    for kind, table, name, expression, folder in symbols:
+        if kind == 'MEASURE':
+            measures[name] = (table, folder)
+        elif kind in ('COLUMN', 'CALC_COLUMN'):
+            columns[(table, name)] = (kind, expression, folder)
+            columns_by_name.setdefault(name, []).append(table)
+        else:
+            tables[name] = (kind, expression)
+    return {
+        'tables': tables,
+        'columns': columns,
+        'columns_by_name': {name: tuple(dict.fromkeys(owners)) for name, owners in columns_by_name.items()},
+        'measures': measures
+    }
+
+def _dax_table_name(ident):
+    # Identificador solto: palavra-chave não é tabela
+    if ident.upper() in _DAX_KEYWORDS:
+        return None
+    return ident
+
+def _lex_dax(expression):
+    """
+    Single pass of the DAX lexer over one expression: (refs, features).
+    refs: tuple of (table, name) references, see scan_dax_references.
+    features: (chamadas, n_var, n_comentarios, filtros_calculate, filter_all,
+    usa_date) for the complexity score: function call counts by upper-case
+    name, VAR keywords, comments, number of filter arguments of each
+    CALCULATE, whether FILTER(ALL(...)) occurs and whether any code token
+    (not strings/comments) mentions DATE.
+    """
+    refs = []
+    chamadas = Counter()
+    n_var = n_comentarios = 0
+    filtros_calculate = []
+    filter_all = usa_date = False
+    pilha = []  # [função, vírgulas] por parêntese aberto
+    anterior = None  # Chamada cujo "(" é o token imediatamente anterior
+    
+    for m in _DAX_TOKEN_PATTERN.finditer(expression):
+        kind = m.lastgroup
+        if kind == 'comment':
+            n_comentarios += 1
+            continue
+        if kind == 'call':
+            nome = m.group('ident').upper()
+            chamadas[nome] += 1
+            if nome == 'ALL' and anterior == 'FILTER':
+                filter_all = True
+            if 'DATE' in nome:
+                usa_date = True
+            pilha.append([nome, 0])
+            anterior = nome
+            continue
+        anterior = None
+        if kind in ('string', 'number'):
+            continue
+        if kind == 'open':
+            pilha.append([None, 0])
+        elif kind == 'comma':
+            if pilha:
+                pilha[-1][1] += 1
+        elif kind == 'close':
+            if pilha:
+                nome, virgulas = pilha.pop()
+                if nome == 'CALCULATE':
+                    filtros_calculate.append(virgulas)  # Argumentos após a expressão
+        else:
+            # Referência: [nome], 'tabela'[nome], tabela[nome], 'tabela' ou identificador solto
+            if kind == 'ident':
+                table, name = m.group('ident'), None
+                if table.upper() == 'VAR':
+                    n_var += 1
+                table = _dax_table_name(table)
+            elif kind == 'iname':
+                table, name = _dax_table_name(m.group('ident')), m.group('iname')
+            elif kind in ('quoted', 'qname'):
+                table, name = m.group('quoted').replace("''", "'").strip(), m.group('qname')
+            else:
+                table, name = None, m.group('name')
+            if 'DATE' in m.group(0).upper():
+                usa_date = True
+            if name is not None:
+                name = name.replace(']]', ']').strip()
+            if table is not None or name is not None:
+                refs.append((table, name))
+    
+    return tuple(refs), (chamadas, n_var, n_comentarios, filtros_calculate, filter_all, usa_date)
+
+# Resultado do lexer por expressão, por processo: o grafo e o score de uma mesma
+# expressão usam uma única passada (LRU limitado, seguro entre threads)
+_LEX_CACHE_MAX = 20000
+_lex_cache = OrderedDict()
+_lex_lock = threading.Lock()
+
+def _remember_lex(expression, lexed):
+    with _lex_lock:
+        _lex_cache[expression] = lexed
+        _lex_cache.move_to_end(expression)
+        while len(_lex_cache) > _LEX_CACHE_MAX:
+            _lex_cache.popitem(last=False)
+
+def _cached_lex(expression):
+    # Passada já feita para a expressão neste processo, ou None
+    with _lex_lock:
+        lexed = _lex_cache.get(expression)
+        if lexed is not None:
+            _lex_cache.move_to_end(expression)
+        return lexed
+
+def _lexed(expression):
+    # _lex_dax(expression), reaproveitando a passada anterior da mesma expressão
+    lexed = _cached_lex(expression)
+    if lexed is not None:
+        return lexed
+    lexed = _lex_dax(expression)
+    _remember_lex(expression, lexed)
+    return lexed
+
+def scan_dax_references(expression):
+    """
+    Single-pass DAX reference lexer.
+    Returns the (table, name) pairs of every reference outside comments and
+    strings, in order:
+    - [name]: table is the table name for 'Table'[Col] or Table[Col] (also
+      with whitespace before the bracket), None for a bare [name];
+    - possible table references ('Table' or an identifier that is not a
+      function call nor a keyword): (table, None).
+    Escapes ('' and ]]) are resolved.
+    """
+    return list(_lexed(expression)[0])
+
+def build_dependency_store(tmdl_source, max_workers=None, memo=None):
+    """
+    Build the normalized dependency store (OPTIMIZED, files CACHED by content hash).
+    Parsing and reference extraction are spread over max_workers processes
+    (None = all cores, 1 = serial); the result is the same in both modes.
+    memo (optional, kept between calls): incremental mode, only tables and
+    expressions that changed since the previous call are parsed again.
+    References are resolved against the symbol catalog of the same parse
+    (build_symbol_catalog): columns, calculated columns and tables become
+    typed nodes; a bare [Column] resolves to the only table that has it, or
+    to the measure's own table.
+    
+    Returns (nodes, edges) or None:
+    - nodes: one row per object, index 'id', columns name/type/expression
+      (type MEASURE, COLUMN, CALC_COLUMN, TABLE or CALC_TABLE; each DAX
+      expression is stored once, no matter how many edges use it) and
+      table/display_folder (host table and display folder, '' if none)
+    - edges: int32 columns 'src' (object used) and 'dst' (measure that uses it)
+    """
+    symbols = parse_tmdl_symbols(tmdl_source, max_workers, memo)
+    
+    # Criar dict uma vez
+    all_measures = {name: expression for kind, _, name, expression, _ in symbols if kind == 'MEASURE'}
+    if not all_measures:
+        return None
+    all_measure_names = frozenset(all_measures.keys())  # frozenset é mais rápido para lookup
+    catalog = build_symbol_catalog(symbols)
+    tables, columns = catalog['tables'], catalog['columns']
+    columns_by_name, measures = catalog['columns_by_name'], catalog['measures']
+    
+    # Extrair referências em lote, uma vez por expressão distinta (ordem preservada pelo parallel_map);
+    # numa reanálise incremental só as expressões novas ou alteradas passam pelo lexer.
+    # O lexer não depende do catálogo: ele decide depois o que é medida, coluna ou tabela
+    items = list(all_measures.items())
+    anteriores = memo.get('references', {}) if memo is not None else {}
+    novas = list(dict.fromkeys(expression for _, expression in items if expression not in anteriores))
+    # A mesma passada já deixa pronto, no cache do lexer, o que o score de complexidade usa
+    lexadas = parallel_map(_lex_dax, novas, max_workers)
+    extraidas = {}
+    for expression, lexed in zip(novas, lexadas):
+        _remember_lex(expression, lexed)
+        extraidas[expression] = list(lexed[0])
+    by_expression = {expression: anteriores[expression] if expression in anteriores else extraidas[expression] for _, expression in items}
+    if memo is not None:
+        memo['references'] = by_expression
+    
+    # Tabela de nós internada: medidas primeiro (id = posição em items), colunas e tabelas depois
+    names = [name for name, _ in items]
+    types = ['MEASURE'] * len(names)
+    expressions = [expression for _, expression in items]
+    node_tables = [measures[name][0] or '' for name in names]
+    folders = [measures[name][1] for name in names]
+    node_ids = {name: node_id for node_id, name in enumerate(names)}
+    
+    src, dst = [], []
+    for measure_id, (measure, expression) in enumerate(items):
+        refs = by_expression[expression]
+        # 1. Dependências de MEASURE para MEASURE (Tabela[Medida] também é medida)
+        for _, ref in refs:
+            if ref in all_measure_names:
+                src.append(node_ids[ref])
+                dst.append(measure_id)
+        
+        # 2. Colunas e tabelas, tipadas pelo catálogo (colunas fora do catálogo seguem COLUMN)
+        for table_name, ref in refs:
+            if ref is None:
+                symbol = tables.get(table_name)
+                if symbol is None:
+                    continue  # Identificador que não é tabela (variável, constante)
+                symbol += ('',)
+                full_name = "'" + table_name.replace("'", "''") + "'"
+            elif ref in all_measure_names:
+                continue
+            else:
+                if table_name is None:
+                    # [Coluna] sem tabela: nome único no modelo ou coluna da tabela da medida
+                    owners = columns_by_name.get(ref, ())
+                    if len(owners) == 1:
+                        table_name = owners[0]
+                    elif measures[measure][0] in owners:
+                        table_name = measures[measure][0]
+                    else:
+                        continue
+                symbol = columns.get((table_name, ref), ('COLUMN', '', ''))
+                full_name = f"{table_name}[{ref}]"
+            node_id = node_ids.get(full_name)
+            if node_id is None:
+                node_id = node_ids[full_name] = len(names)
+                names.append(full_name)
+                types.append(symbol[0])
+                expressions.append(symbol[1])
+                node_tables.append(table_name)
+                folders.append(symbol[2])
+            src.append(node_id)
+            dst.append(measure_id)
+    
+    if not src:
+        return None
+    
+    nodes = pd.DataFrame({
+        'name': names,
+        'type': pd.Categorical(types),
+        'expression': expressions,
+        'table': node_tables,
+        'display_folder': folders
+    })
+    nodes.index.name = 'id'
+    edges = pd.DataFrame({
+        'src': np.array(src, dtype=np.int32),
+        'dst': np.array(dst, dtype=np.int32)
+    })
+    return nodes, edges
+
+def dependency_edges_frame(nodes, edges):
+    """
+    Edge view of the normalized store with the classic column names
+    ([Tipo Origem], [Origem], [Tipo Destino], [Destino]).
+    Names and types are categoricals sharing the node table's categories, so
+    each edge costs two small integer codes; expressions are looked up in
+    the node table instead of being copied per edge.
+    """
+    name_dtype = pd.CategoricalDtype(pd.Index(nodes['name']))
+    type_dtype = nodes['type'].dtype
+    type_codes = nodes['type'].cat.codes.to_numpy()
+    src = edges['src'].to_numpy()
+    dst = edges['dst'].to_numpy()
+    return pd.DataFrame({
+        '[Tipo Origem]': pd.Categorical.from_codes(type_codes[src], dtype=type_dtype),
+        '[Origem]': pd.Categorical.from_codes(src, dtype=name_dtype),
+        '[Tipo Destino]': pd.Categorical.from_codes(type_codes[dst], dtype=type_dtype),
+        '[Destino]': pd.Categorical.from_codes(dst, dtype=name_dtype)
+    })
+
+def build_dependency_dataframe(tmdl_source, max_workers=None):
+    """
+    Build dependency DataFrame (edge view of build_dependency_store).
+    """
+    store = build_dependency_store(tmdl_source, max_workers)
+    if store is None:
+        return None
+    return dependency_edges_frame(*store)
+
+def build_info_map(nodes, edges):
+    """
+    Node metadata {name: {"exp": ..., "tipo": ...}} for every node present in
+    the graph, built from the node table: one entry per unique node, with the
+    limpar_dax cleaning done by vectorized string operations.
+    """
+    no_grafo = np.zeros(len(nodes), dtype=bool)
+    no_grafo[edges['src'].to_numpy()] = True
+    no_grafo[edges['dst'].to_numpy()] = True
+    subset = nodes[no_grafo]
+    
+    # Mesmo resultado de limpar_dax, aplicado à coluna inteira
+    raw = subset['expression']
+    exps = raw.astype(str).str.replace("_x000D_", "", regex=False).str.strip()
+    exps = exps.where(raw.notna() & (raw != "None"), "")
+    
+    return {
+        nome: {"exp": exp, "tipo": tipo}
+        for nome, exp, tipo in zip(subset['name'].tolist(), exps.tolist(), subset['type'].astype(str).tolist())
+    }
+
+# --- ÍNDICE DE ADJACÊNCIA (CSR) ---
+def _csr(keys, values, n_nodes):
+    # Ordenação estável: vizinhos ficam na mesma ordem das arestas no DataFrame
+    order = np.argsort(keys, kind='stable')
+    indptr = np.zeros(n_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys, minlength=n_nodes), out=indptr[1:])
+    return indptr, values[order]
+
+def build_adjacency_index(nodes, edges):
+    """
+    Forward/reverse CSR adjacency index over the normalized store.
+    Built once per upload and reused by every traversal:
+    - 'dependencias': node -> objects it uses (dst -> src)
+    - 'dependentes': node -> measures that use it (src -> dst)
+    Each direction is an (indptr, indices) pair of numpy arrays.
+    """
+    n_nodes = len(nodes)
+    src = edges['src'].to_numpy()
+    dst = edges['dst'].to_numpy()
+    names = nodes['name'].tolist()
+    return {
+        'names': names,
+        'ids': {name: node_id for node_id, name in enumerate(names)},
+        'types': nodes['type'].astype(str).to_numpy(),
+        'dependencias': _csr(dst, src, n_nodes),
+        'dependentes': _csr(src, dst, n_nodes)
+    }
+
+def adjacent_nodes(index, name, dependencias=True, permitidos=None):
+    """
+    Direct neighbours of a node, in edge order.
+    permitidos: optional boolean array by node id with the allowed origin
+    types (same semantics as filtering the DataFrame by [Tipo Origem]).
+    """
+    node_id = index['ids'].get(name)
+    if node_id is None:
+        return []
+    if dependencias:
+        indptr, indices = index['dependencias']
+        vizinhos = indices[indptr[node_id]:indptr[node_id + 1]].tolist()
+        if permitidos is not None:
+            vizinhos = [v for v in vizinhos if permitidos[v]]
+    else:
+        if permitidos is not None and not permitidos[node_id]:
+            return []
+        indptr, indices = index['dependentes']
+        vizinhos = indices[indptr[node_id]:indptr[node_id + 1]].tolist()
+    names = index['names']
+    return [names[v] for v in vizinhos]
+
+def traverse_dependencies(index, raizes, dependencias=True, dependentes=False, permitidos=None, max_niveis=None):
+    """
+    BFS (deque, O(V+E)) from the root nodes over the adjacency index.
+    Returns the list of (u, v) edges found, in the same order as scanning
+    the filtered DataFrame. max_niveis=1 only expands the roots.
+    """
+    names, ids = index['names'], index['ids']
+    dep_ptr, dep_idx = index['dependencias']
+    rev_ptr, rev_idx = index['dependentes']
+    
+    arestas, visitados = [], set()
+    fila = deque((ids[r], 0) for r in raizes if r in ids)
+    while fila:
+        at, nivel = fila.popleft()
+        if at in visitados:
+            continue
+        visitados.add(at)
+        if max_niveis is not None and nivel >= max_niveis:
+            continue
+        if dependencias:
+            for f in dep_idx[dep_ptr[at]:dep_ptr[at + 1]].tolist():
+                if permitidos is None or permitidos[f]:
+                    arestas.append((names[at], names[f]))
+                    if f not in visitados: fila.append((f, nivel + 1))
+        if dependentes and (permitidos is None or permitidos[at]):
+            for p in rev_idx[rev_ptr[at]:rev_ptr[at + 1]].tolist():
+                arestas.append((names[p], names[at]))
+                if p not in visitados: fila.append((p, nivel + 1))
+    return arestas
+
+# --- ÍNDICE DE ALCANÇABILIDADE (FECHO TRANSITIVO) ---
+def _strongly_connected_components(indptr, indices, n_nodes):
+    """
+    Iterative Tarjan over a CSR graph. Returns (comp, n_comp): the SCC id of
+    each node, with ids in reverse topological order (sinks first).
+    """
+    indptr, indices = indptr.tolist(), indices.tolist()
+    index, low = [-1] * n_nodes, [0] * n_nodes
+    on_stack, comp = [False] * n_nodes, [-1] * n_nodes
+    stack, counter, n_comp = [], 0, 0
+    
+    for root in range(n_nodes):
+        if index[root] != -1:
+            continue
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        work = [[root, indptr[root]]]
+        while work:
+            frame = work[-1]
+            v, pos = frame
+            if pos < indptr[v + 1]:
+                frame[1] += 1
+                w = indices[pos]
+                if index[w] == -1:
+                    index[w] = low[w] = counter
+                    counter += 1
+                    stack.append(w)
+                    on_stack[w] = True
+                    work.append([w, indptr[w]])
+                elif on_stack[w] and index[w] < low[v]:
+                    low[v] = index[w]
+                continue
+            work.pop()
+            if work and low[v] < low[work[-1][0]]:
+                low[work[-1][0]] = low[v]
+            if low[v] == index[v]:
+                # v é raiz de um componente: desempilha seus membros
+                while True:
+                    w = stack.pop()
+                    on_stack[w] = False
+                    comp[w] = n_comp
+                    if w == v:
+                        break
+                n_comp += 1
+    return comp, n_comp
+
+def build_reachability_index(adjacency):
+    """
+    Transitive closure of the dependency graph, computed once per upload.
+    Strongly connected components are condensed and every component gets a
+    bitset (Python int, one bit per node) of everything reachable from it,
+    built by OR-ing its neighbours' bitsets in topological order - one pass
+    downstream and one upstream.
+    
+    'downstream_count': per node, how many objects use it transitively
+    (same as len(nx.descendants) on the [Origem] -> [Destino] graph).
+    'upstream_count': per node, how many objects it uses transitively.
+    """
+    n_nodes = len(adjacency['names'])
+    indptr, indices = adjacency['dependentes']  # origem -> destino
+    comp, n_comp = _strongly_connected_components(indptr, indices, n_nodes)
+    
+    membros = [0] * n_comp
+    for node_id, c in enumerate(comp):
+        membros[c] |= 1 << node_id
+    
+    # Arestas do grafo condensado (DAG)
+    sucessores = [set() for _ in range(n_comp)]
+    predecessores = [set() for _ in range(n_comp)]
+    origem = np.repeat(np.arange(n_nodes), np.diff(indptr))
+    for u, v in zip(origem.tolist(), indices.tolist()):
+        cu, cv = comp[u], comp[v]
+        if cu != cv:
+            sucessores[cu].add(cv)
+            predecessores[cv].add(cu)
+    
+    # ids de componentes já estão em ordem topológica reversa (sumidouros primeiro)
+    down = list(membros)
+    for c in range(n_comp):
+        for s in sucessores[c]:
+            down[c] |= down[s]
+    up = list(membros)
+    for c in range(n_comp - 1, -1, -1):
+        for p in predecessores[c]:
+            up[c] |= up[p]
+    
+    # O próprio nó não conta (mesma semântica de nx.descendants / nx.ancestors)
+    down_count = [b.bit_count() - 1 for b in down]
+    up_count = [b.bit_count() - 1 for b in up]
+    return {
+        'comp': comp,
+        'down': down,
+        'up': up,
+        'downstream_count': np.array([down_count[c] for c in comp], dtype=np.int32),
+        'upstream_count': np.array([up_count[c] for c in comp], dtype=np.int32)
+    }
+
+def _bitset_names(adjacency, bits, exclude_id):
+    n_nodes = len(adjacency['names'])
+    raw = np.frombuffer(bits.to_bytes((n_nodes + 7) // 8, 'little'), dtype=np.uint8)
+    names = adjacency['names']
+    return {names[i] for i in np.flatnonzero(np.unpackbits(raw, bitorder='little')[:n_nodes]) if i != exclude_id}
+
+def downstream_of(adjacency, reachability, name):
+    """All objects that depend on name, directly or transitively."""
+    node_id = adjacency['ids'].get(name)
+    if node_id is None:
+        return set()
+    return _bitset_names(adjacency, reachability['down'][reachability['comp'][node_id]], node_id)
+
+def upstream_of(adjacency, reachability, name):
+    """All objects name depends on, directly or transitively."""
+    node_id = adjacency['ids'].get(name)
+    if node_id is None:
+        return set()
+    return _bitset_names(adjacency, reachability['up'][reachability['comp'][node_id]], node_id)
+
+# --- DESCARTE SEGURO E IMPACTO ---
+def find_orphan_measures(nodes, edges, medidas_em_visuais=()):
+    """
+    Safe-to-delete candidates: every measure of the model (isolated ones
+    included) that no other measure references, i.e. is not the [Origem] of
+    any MEASURE -> MEASURE edge, and is not used by any visual.
+    """
+    is_measure = (nodes['type'] == 'MEASURE').to_numpy()
+    src, dst = edges['src'].to_numpy(), edges['dst'].to_numpy()
+    candidatas = is_measure.copy()
+    candidatas[np.unique(src[is_measure[src] & is_measure[dst]])] = False
+    return set(nodes['name'].to_numpy()[candidatas]) - set(medidas_em_visuais)
+
+def top_impact_measures(nodes, edges, reachability, n=10):
+    """
+    The n measures with the most transitive dependents, as [{'medida', 'impacto'}]
+    in descending order. Ties keep the order in which nodes first appear in
+    the edge list (the node order of the networkx graph built from it).
+    """
+    ordem = pd.unique(np.column_stack([edges['src'].to_numpy(), edges['dst'].to_numpy()]).ravel())
+    ordem = ordem[(nodes['type'] == 'MEASURE').to_numpy()[ordem]]
+    impacto = reachability['downstream_count'][ordem]
+    top = np.argsort(-impacto, kind='stable')[:n]
+    names = nodes['name'].to_numpy()
+    return [{'medida': names[ordem[i]], 'impacto': int(impacto[i])} for i in top]
+
+
+# --- LAYOUT EM CAMADAS (COORDENADAS FIXAS PARA O VIS.JS) ---
+# O navegador só desenha: camadas, ordem e coordenadas saem daqui, então o
+# vis.js não roda o layout hierárquico nem a física em grafos grandes.
+LAYOUT_NODE_SPACING = 300   # px entre nós vizinhos de uma linha
+LAYOUT_ROW_SPACING = 90     # px entre as linhas de uma camada larga quebrada
+LAYOUT_LEVEL_SPACING = 180  # px entre o fim de uma camada e a próxima
+LAYOUT_MAX_ROW = 40         # nós por linha antes de quebrar a camada
+
+def _layer_assignment(ordem, sucessores, predecessores):
+    """
+    Longest-path layering in topological order (Kahn): sources on layer 0,
+    every node one layer below its deepest predecessor. A cycle is broken by
+    releasing the pending node with the fewest unplaced predecessors.
+    """
+    faltam = {n: len(predecessores[n]) for n in ordem}
+    camada = dict.fromkeys(ordem, 0)
+    fila = deque(n for n in ordem if not faltam[n])
+    colocados = set()
+    while len(colocados) < len(ordem):
+        if not fila:
+            # Ciclo: as arestas restantes até o nó liberado são ignoradas
+            fila.append(min((n for n in ordem if n not in colocados), key=faltam.get))
+        at = fila.popleft()
+        if at in colocados:
+            continue
+        colocados.add(at)
+        for s in sucessores[at]:
+            if s not in colocados:
+                camada[s] = max(camada[s], camada[at] + 1)
+                faltam[s] -= 1
+                if not faltam[s]:
+                    fila.append(s)
+    return camada
+
+def _count_crossings(camadas, sucessores, camada, pos):
+    """
+    Crossings between edges that join adjacent layers, for the current order:
+    inversions of the target positions (Fenwick tree, O(E log V)).
+    """
+    total = 0
+    for nivel, nos in enumerate(camadas[:-1]):
+        abaixo = len(camadas[nivel + 1])
+        arvore = [0] * (abaixo + 1)
+        k = 0
+        for u in nos:
+            for j in sorted(round(pos[v] * abaixo - 0.5) for v in sucessores[u] if camada[v] == nivel + 1):
+                # Arestas anteriores com destino à direita deste cruzam esta
+                i, antes = j + 1, 0
+                while i:
+                    antes += arvore[i]
+                    i -= i & -i
+                total += k - antes
+                k += 1
+                i = j + 1
+                while i <= abaixo:
+                    arvore[i] += 1
+                    i += i & -i
+    return total
+
+def _reduce_crossings(camadas, sucessores, predecessores, camada, iteracoes):
+    """
+    Barycenter heuristic: alternate downward (by predecessors) and upward
+    (by successors) sweeps, sorting each layer by the mean normalized position
+    of its neighbours in the adjacent layer (any layer for nodes reached only
+    by long edges). The order with the fewest crossings seen is kept; layers
+    are reordered in place and the final positions returned.
+    """
+    pos = {}
+    def _normalizar(camada_nos):
+        for i, n in enumerate(camada_nos):
+            pos[n] = (i + 0.5) / len(camada_nos)
+    for camada_nos in camadas:
+        _normalizar(camada_nos)
+    
+    melhor = [list(c) for c in camadas]
+    menos_cruzamentos = _count_crossings(camadas, sucessores, camada, pos)
+    for _ in range(iteracoes):
+        for vizinhos, sequencia, lado in ((predecessores, camadas[1:], -1), (sucessores, camadas[-2::-1], 1)):
+            if not menos_cruzamentos:
+                break
+            for camada_nos in sequencia:
+                bary = {}
+                for n in camada_nos:
+                    viz = [v for v in vizinhos[n] if camada[v] == camada[n] + lado] or vizinhos[n]
+                    bary[n] = sum(pos[v] for v in viz) / len(viz) if viz else pos[n]
+                camada_nos.sort(key=bary.__getitem__)
+                _normalizar(camada_nos)
+            cruzamentos = _count_crossings(camadas, sucessores, camada, pos)
+            if cruzamentos < menos_cruzamentos:
+                melhor, menos_cruzamentos = [list(c) for c in camadas], cruzamentos
+    
+    for camada_nos, ordem in zip(camadas, melhor):
+        camada_nos[:] = ordem
+        _normalizar(camada_nos)
+    return pos
+
+def layered_layout(graph, grupos=None, iteracoes=8, max_por_linha=LAYOUT_MAX_ROW):
+    """
+    Layered (Sugiyama-style) layout of a directed graph, computed once in
+    Python so the browser only draws fixed coordinates.
+    graph: any graph with nodes() and edges() (e.g. the nx.DiGraph of the
+    view); edge sources are drawn above their targets.
+    grupos: optional {node: group} (table or display folder); each group gets
+    its own vertical band, ordered by the mean barycenter of its members, so
+    a group collapses into one node without overlapping the others
+    (collapse_by_group).
+    Layers wider than max_por_linha nodes (per band) wrap into staggered rows.
+    Returns {node: (x, y)}; the result depends only on the node and edge
+    order of graph, so the same view always gets the same coordinates.
+    """
+    ordem = list(graph.nodes())
+    sucessores = {n: [] for n in ordem}
+    predecessores = {n: [] for n in ordem}
+    for u, v in graph.edges():
+        if u != v:
+            sucessores[u].append(v)
+            predecessores[v].append(u)
+    
+    camada = _layer_assignment(ordem, sucessores, predecessores)
+    camadas = [[] for _ in range(max(camada.values(), default=-1) + 1)]
+    for n in ordem:
+        camadas[camada[n]].append(n)
+    pos = _reduce_crossings(camadas, sucessores, predecessores, camada, iteracoes)
+    
+    # Faixas verticais: uma só sem grupos, uma por grupo com grupos
+    if grupos is None:
+        faixas = [camadas]
+    else:
+        soma, total = Counter(), Counter()
+        for n in ordem:
+            soma[grupos.get(n, '')] += pos[n]
+            total[grupos.get(n, '')] += 1
+        ordem_grupos = sorted(total, key=lambda g: (soma[g] / total[g], str(g)))
+        indice = {g: i for i, g in enumerate(ordem_grupos)}
+        faixas = [[[] for _ in camadas] for _ in ordem_grupos]
+        for nivel, nos_camada in enumerate(camadas):
+            for n in nos_camada:
+                faixas[indice[grupos.get(n, '')]][nivel].append(n)
+    
+    # Largura das faixas em posições (com uma de folga entre elas) e altura das camadas em linhas
+    larguras = [max(min(len(nos), max_por_linha) for nos in faixa) for faixa in faixas]
+    y_camadas, y = [], 0
+    for nivel in range(len(camadas)):
+        y_camadas.append(y)
+        n_linhas = max(-(-len(faixa[nivel]) // max_por_linha) for faixa in faixas)
+        y += (max(n_linhas, 1) - 1) * LAYOUT_ROW_SPACING + LAYOUT_LEVEL_SPACING
+    
+    posicoes = {}
+    inicio = -(sum(larguras) + len(larguras) - 2) / 2
+    for faixa, largura in zip(faixas, larguras):
+        centro = inicio + (largura - 1) / 2
+        for nivel, nos in enumerate(faixa):
+            for i, n in enumerate(nos):
+                linha, coluna = divmod(i, max_por_linha)
+                na_linha = min(max_por_linha, len(nos) - linha * max_por_linha)
+                # Linhas ímpares deslocadas meio espaço: arestas passam entre as caixas
+                x = (centro + coluna - (na_linha - 1) / 2 + (linha % 2) / 2) * LAYOUT_NODE_SPACING
+                posicoes[n] = (round(x), y_camadas[nivel] + linha * LAYOUT_ROW_SPACING)
+        inicio += largura + 1
+    return posicoes
+
+def collapse_by_group(graph, posicoes, grupos):
+    """
+    Level-of-detail view of a graph laid out with the same grupos (see
+    layered_layout): one cluster per group with two or more members, placed
+    at the centre of its band. Singleton groups are left as plain nodes.
+    Returns (clusters, no_cluster): clusters {id: {'grupo', 'x', 'y',
+    'caixa': [x0, y0, x1, y1], 'membros'}} in node order and no_cluster
+    {node: cluster id}.
+    """
+    membros = {}
+    for n in graph.nodes():
+        membros.setdefault(grupos.get(n, ''), []).append(n)
+    
+    clusters, no_cluster = {}, {}
+    for grupo, nos in membros.items():
+        if len(nos) < 2:
+            continue
+        cluster_id = f"__grupo_{len(clusters)}__"
+        xs = [posicoes[n][0] for n in nos]
+        ys = [posicoes[n][1] for n in nos]
+        clusters[cluster_id] = {
+            'grupo': grupo,
+            'x': (min(xs) + max(xs)) // 2,
+            'y': (min(ys) + max(ys)) // 2,
+            'caixa': [min(xs), min(ys), max(xs), max(ys)],
+            'membros': nos
+        }
+        no_cluster.update(dict.fromkeys(nos, cluster_id))
+    return clusters, no_cluster
+
+# --- SCORE DE COMPLEXIDADE ---
+# As expressões passam pelo mesmo lexer das referências (_lex_dax): chamadas de
+# função casam o nome completo, então SUMMARIZE não conta dentro de
+# SUMMARIZECOLUMNS nem ALL em ALLEXCEPT, e comentários/strings não contam.
+
+# === D1: FUNÇÕES (Peso Alto) ===
+_FUNCOES_PESO = {
+    'SUMX': 8, 'AVERAGEX': 8, 'MINX': 8, 'MAXX': 8,
+    'RANKX': 12,
+    'FILTER': 10,
+    'ADDCOLUMNS': 10,
+    'SUMMARIZE': 12, 'SUMMARIZECOLUMNS': 12,
+    'GENERATE': 15,
+    'EARLIER': 20,
+    'PATH': 8, 'CONTAINSROW': 8
+}
+# === D2: ALL, ALLEXCEPT, REMOVEFILTERS ===
+_CONTEXT_FUNCS = {'ALL': 6, 'ALLEXCEPT': 6, 'REMOVEFILTERS': 6, 'KEEPFILTERS': 3}
+_TIME_INTELLIGENCE_FUNCS = ('SAMEPERIODLASTYEAR', 'DATESYTD', 'TOTALYTD', 'DATEADD')
+
+def _complexity_dimensions(expressao, medidas_dependentes=0, features=None):
+    """
+    Raw (unclamped) D1-D5 subtotals of the complexity score.
+    features: the lexer features of expressao (_lex_dax), when already known.
+    Returns dims, a 5-item list.
+    """
+    dims = [0, 0, 0, 0, 0]
+    if not expressao:
+        return dims
+    
+    chamadas, var_count, comentarios, filtros_calculate, filter_all, usa_date = features or _lexed(expressao)[1]
+    
+    # === D1: FUNÇÕES (Peso Alto) ===
+    for func, penalty in _FUNCOES_PESO.items():
+        count = chamadas[func]
+        if count > 0:
+            dims[0] += count * penalty
+    
+    # === D2: CALCULATE E CONTEXTO ===
+    calculate_count = chamadas['CALCULATE']
+    if calculate_count > 0:
+        dims[1] += calculate_count * 5
+    
+    # Múltiplos filtros em CALCULATE
+    for filters in filtros_calculate:
+        if filters > 1:
+            penalty = (filters - 1) * 3
+            dims[1] += penalty
+    
+    # ALL, ALLEXCEPT, REMOVEFILTERS
+    for func, penalty in _CONTEXT_FUNCS.items():
+        count = chamadas[func]
+        if count > 0:
+            dims[1] += count * penalty
+    
+    # === D3: ESTRUTURA ===
+    linhas = expressao.count('\n') + 1
+    if linhas > 20:
+        # +10 para passar de 20, +5 a cada 20 linhas adicionais
+        linhas_extras = linhas - 20
+        blocos_extras = linhas_extras // 20
+        penalty = 10 + (blocos_extras * 5)
+        dims[2] += penalty
+    elif linhas > 10:
+        dims[2] += 5
+    
+    # Bônus: VAR
+    if var_count > 0:
+        bonus = var_count * 5
+        dims[2] -= bonus
+    
+    # Bônus: Comentários
+    if comentarios > 0:
+        bonus = min(comentarios * 2, 10)
+        dims[2] -= bonus
+    
+    # === D4: DEPENDÊNCIAS ===
+    if medidas_dependentes > 0:
+        penalty = medidas_dependentes * 4
+        dims[3] += penalty
+    
+    # === D5: ANTI-PATTERNS ===
+    if filter_all:
+        dims[4] += 20
+    
+    if usa_date and not any(chamadas[f] for f in _TIME_INTELLIGENCE_FUNCS):
+        dims[4] += 8
+    
+    return dims
+
+def _classificar_score(final_score):
+    if final_score <= 20:
+        return "🟢 Simples"
+    elif final_score <= 40:
+        return "🟡 Moderada"
+    elif final_score <= 60:
+        return "🟠 Complexa"
+    elif final_score <= 80:
+        return "🔴 Muito Complexa"
+    return "⚫ Crítica"
+
+_SCORE_PARALLEL_MIN_TASKS = 2000  # Pontuar uma medida custa microssegundos: só modelos grandes compensam o pool
+COMPLEXITY_COLUMNS = ['medida', 'score', 'classificacao', 'd1_funcoes', 'd2_contexto', 'd3_estrutura', 'd4_dependencias', 'd5_antipatterns']
+
+def _score_measure(item):
+    # Worker do pool: (nome, expressão, nº dependentes, features ou None) -> linha de COMPLEXITY_COLUMNS
+    nome_medida, expressao, medidas_dependentes, features = item
+    dims = _complexity_dimensions(expressao, medidas_dependentes, features)
+    final_score = min(100, max(0, sum(dims)))
+    return (nome_medida, final_score, _classificar_score(final_score), *dims)
+
+def _with_features(tasks):
+    # Processos do pool não veem o cache do lexer deste processo: as features já conhecidas vão na tarefa
+    return [(*task, (_cached_lex(task[1]) or (None, None))[1]) for task in tasks]
+
+def count_measure_dependents(nodes, edges):
+    """
+    D4 dependent count of each measure: how many MEASURE -> measure edges
+    point to it ([Destino] of edges whose [Origem] is a measure; table and
+    column references do not count). Returns {name: n} for n > 0.
+    """
+    is_measure = (nodes['type'] == 'MEASURE').to_numpy()
+    src, dst = edges['src'].to_numpy(), edges['dst'].to_numpy()
+    contagem = np.bincount(dst[is_measure[src]], minlength=len(nodes))
+    indices = np.flatnonzero(contagem)
+    return dict(zip(nodes['name'].to_numpy()[indices].tolist(), contagem[indices].tolist()))
+
+def calcular_complexity_scores(medidas, dependentes_count=None, max_workers=None, memo=None):
+    """
+    Complexity score (0-100) of every measure at once, in 5 dimensions
+    (SQLBI + Microsoft Learn): D1 iterator functions (SUMX, RANKX, FILTER...),
+    D2 CALCULATE and filter context, D3 structure (lines, VAR, comments),
+    D4 dependents and D5 anti-patterns. Expressions go through the same
+    lexer pass as the dependency graph (_lex_dax), reused when
+    build_dependency_store already lexed them; functions only count as
+    calls, outside strings and comments.
+    medidas: iterable of (name, expression); dependentes_count: {name: n}.
+    Large batches are spread over a process pool (serial below
+    _SCORE_PARALLEL_MIN_TASKS). Returns a DataFrame with COMPLEXITY_COLUMNS: score is
+    clamped to 0-100, the d1..d5 subtotals are the raw dimension points.
+    With memo, only measures whose expression or dependent count changed
+    since the previous call are scored again.
+    """
+    dependentes_count = dependentes_count or {}
+    tasks = [(nome_medida, expressao or "", int(dependentes_count.get(nome_medida, 0))) for nome_medida, expressao in medidas]
+    if memo is None:
+        linhas = parallel_map(_score_measure, _with_features(tasks), max_workers=max_workers, min_tasks=_SCORE_PARALLEL_MIN_TASKS)
+    else:
+        # O score depende só de (expressão, nº de dependentes), não do nome
+        anterior = memo.get('score', {})
+        chaves = [(expressao, dependentes) for _, expressao, dependentes in tasks]
+        faltando = list(dict.fromkeys(chave for chave in chaves if chave not in anterior))
+        novas = parallel_map(_score_measure, _with_features([(None, *chave) for chave in faltando]), max_workers=max_workers, min_tasks=_SCORE_PARALLEL_MIN_TASKS)
+        novas = dict(zip(faltando, (linha[1:] for linha in novas)))
+        memo['score'] = {chave: anterior[chave] if chave in anterior else novas[chave] for chave in chaves}
+        linhas = [(task[0], *memo['score'][chave]) for task, chave in zip(tasks, chaves)]
+    df_scores = pd.DataFrame(linhas, columns=COMPLEXITY_COLUMNS)
+    df_scores['classificacao'] = df_scores['classificacao'].astype('category')
+    return df_scores
+
+# --- FUNÇÕES DE ESTRUTURA (REPORT) ---
+def _source_entity(measure_node):
+    # Measure.Expression.SourceRef.Entity (tabela de origem); None se ausente
+    expression = measure_node.get("Expression")
+    source_ref = expression.get("SourceRef") if isinstance(expression, dict) else None
+    return source_ref.get("Entity") if isinstance(source_ref, dict) else None
+
+def extract_measures_from_query(*query_objs):
+    """
+    Explicit-stack walk over one or more visual subtrees: every dict/list is
+    visited exactly once and deep JSON cannot hit the recursion limit.
+    Returns the set of table-qualified references (entity, measure) found in
+    "Measure" nodes; entity is the SourceRef Entity, or None when absent.
+    """
+    refs = set()
+    stack = [obj for obj in query_objs if obj]
+    while stack:
+        obj = stack.pop()
+        if type(obj) is dict:
+            m = obj.get("Measure")
+            if type(m) is dict and "Property" in m:
+                refs.add((_source_entity(m), m["Property"]))
+            values = obj.values()
+        else:
+            values = obj
+        # Só contêineres vão para a pilha: escalares nunca são visitados
+        for value in values:
+            if type(value) is dict or type(value) is list:
+                stack.append(value)
+    return refs
+
+# Únicos subtrees de visual.json que podem referenciar medidas do visual
+_VISUAL_SUBTREES = ("query", "objects", "visualContainerObjects", "singleVisual")
+# Padrão serial: json.loads + percurso da árvore seguram o GIL e, com o ZIP em memória,
+# não há I/O a sobrepor (bench_visual_scan.py: threads a 0.9-1.0x do serial)
+_VISUAL_SCAN_WORKERS = 1
+
+def extract_visual_info(visual_source):
+    try:
+        # Lido uma única vez: os mesmos bytes servem para a chave do cache e para o parse
+        raw = _read_source(visual_source)
+        key = _bytes_key(raw, 'visual')
+        cached = _parse_cache_get(key)
+        if cached is not None: return cached
+        visual_data = json.loads(raw)
+        v_name = visual_data.get("name", "Unknown")
+        visual = visual_data.get("visual")
+        if not isinstance(visual, dict): visual = {}
+        v_type = visual.get("visualType", "Unknown")
+        refs = set()
+        # Sem nenhuma referência "Measure" no arquivo não há árvore a percorrer
+        if b'"Measure"' in raw:
+            # Apenas query/objects, formatação condicional e singleVisual (ignora position, filterConfig etc.)
+            refs = extract_measures_from_query(*(visual[subtree] for subtree in _VISUAL_SUBTREES if subtree in visual))
+        v_info = {
+            "visual_name": v_name, 
+            "visual_type": v_type, 
+            "measures": sorted({measure for _, measure in refs}),
+            # [tabela, medida] ordenado por medida (tabela None vem primeiro)
+            "measure_refs": sorted(([entity, measure] for entity, measure in refs), key=lambda r: (r[1], r[0] or ""))
+        }
+        _parse_cache_put(key, v_info)
+        return v_info
+    except: return None
+
+def _report_pages_from_folder(report_folder):
+    """
+    [(page.json, [visual.json, ...] or None)] of a .Report folder, sorted by
+    page and visual folder name; None when the page has no visuals folder.
+    """
+    pages_path = Path(report_folder) / "definition" / "pages"
+    if not pages_path.exists(): return None
+    paginas = []
+    for page_dir in sorted(pages_path.iterdir()):
+        if page_dir.is_dir():
+            p_json = page_dir / "page.json"
+            if p_json.exists():
+                v_dir = page_dir / "visuals"
+                if v_dir.exists() and v_dir.is_dir():
+                    v_jsons = [v_path / "visual.json" for v_path in sorted(v_dir.iterdir()) if v_path.is_dir()]
+                    paginas.append((p_json, [v_json for v_json in v_jsons if v_json.exists()]))
+                else:
+                    paginas.append((p_json, None))
+    return paginas
+
+def build_structure_dataframe(report_source, max_workers=None, memo=None):
+    """
+    Long (Página, Visual, Tabela, Medida) table of the report: one row per
+    table-qualified measure reference of each visual.
+    report_source: the .Report folder, or the page list of read_pbip_zip
+    (same shape as _report_pages_from_folder, with bytes instead of paths).
+    Pages are listed serially (page.json is tiny); visual.json files are
+    parsed serially too unless max_workers > 1 asks for a thread pool (same
+    order and result as the serial scan).
+    With memo, visuals whose content did not change since the previous call
+    are not parsed again.
+    """
+    if isinstance(report_source, (str, os.PathLike)):
+        report_source = _report_pages_from_folder(report_source)
+    if report_source is None: return None
+    paginas = []  # (nome de exibição, visuais ou None se a página não tem pasta visuals)
+    for p_json, v_jsons in report_source:
+        try:
+            p_data = json.loads(_read_source(p_json))
+            paginas.append((p_data.get("displayName", "Unknown"), v_jsons))
+        except: pass
+    
+    todos_visuais = [v_json for _, v_jsons in paginas for v_json in v_jsons or []]
+    workers = max_workers or _VISUAL_SCAN_WORKERS
+    
+    def scan(func, visuais):
+        if workers > 1 and len(visuais) > 1:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                return list(executor.map(func, visuais))
+        return [func(v_json) for v_json in visuais]
+    
+    if memo is None:
+        infos = scan(extract_visual_info, todos_visuais)
+    else:
+        infos = _memoized_map(memo, 'visual', todos_visuais, extract_visual_info, scan)
+    infos = iter(infos)  # Consumido na mesma ordem em que os caminhos foram listados
+    
+    results = []
+    for p_display, v_jsons in paginas:
+        if v_jsons is None:
+            results.append((p_display, "Nenhum visual", None, None))
+            continue
+        for _ in v_jsons:
+            v_info = next(infos)
+            if v_info:
+                # Uma linha por (página, visual, tabela, medida); visual sem medidas fica com Medida nula
+                for tabela, medida in v_info["measure_refs"] or [(None, None)]:
+                    results.append((p_display, v_info["visual_name"], tabela, medida))
+    return pd.DataFrame(results, columns=['Página', 'Visual', 'Tabela', 'Medida']) if results else None
+
+# --- INGESTÃO DO ZIP EM MEMÓRIA ---
+def read_pbip_zip(zip_ref):
+    """
+    Index the ZIP central directory once and read only what the parsers use,
+    straight from the archive (nothing is extracted to disk):
+    - 'tmdl': contents of the .tmdl files of definition/tables, sorted by member
+      name (None if the ZIP has no such folder)
+    - 'report': pages of the .Report folder in the shape expected by
+      build_structure_dataframe (None if there is no report)
+    Static resources, cache.abf and every other member are never decompressed.
+    """
+    tabelas = {}  # pasta .../definition/tables -> [membros .tmdl]
+    report_roots = set()
+    entradas = []
+    for info in zip_ref.infolist():
+        name = info.filename.replace('\\', '/').rstrip('/')
+        if name.lower().endswith('cache.abf'):
+            continue
+        entradas.append((name, info))
+        partes = name.split('/')
+        if not info.is_dir() and partes[-1].endswith('.tmdl') and partes[-3:-1] == ['definition', 'tables']:
+            tabelas.setdefault('/'.join(partes[:-1]), []).append(info)
+        # Raiz do relatório: pasta cujo nome termina em .Report / .report
+        for i, parte in enumerate(partes if info.is_dir() else partes[:-1]):
+            if parte.endswith('.Report') or parte.endswith('.report'):
+                report_roots.add('/'.join(partes[:i + 1]))
+                break
+    
+    tmdl = None
+    if tabelas:
+        pasta = sorted(tabelas)[0]  # Um modelo semântico por projeto
+        tmdl = [zip_ref.read(info) for info in sorted(tabelas[pasta], key=lambda i: i.filename)]
+    
+    report = None
+    if report_roots:
+        prefixo = sorted(report_roots)[0] + '/definition/pages/'
+        paginas = {}  # pasta da página -> [page.json, tem pasta visuals, {pasta do visual: visual.json}]
+        for name, info in entradas:
+            if not name.startswith(prefixo):
+                continue
+            partes = name[len(prefixo):].split('/')
+            pagina = paginas.setdefault(partes[0], [None, False, {}])
+            if info.is_dir():
+                if len(partes) > 1 and partes[1] == 'visuals':
+                    pagina[1] = True
+            elif partes[1:] == ['page.json']:
+                pagina[0] = info
+            elif len(partes) > 1 and partes[1] == 'visuals':
+                pagina[1] = True
+                if len(partes) == 4 and partes[3] == 'visual.json':
+                    pagina[2][partes[2]] = info
+        
+        report = []
+        for pasta in sorted(paginas):
+            page_info, tem_visuals, visuais = paginas[pasta]
+            if page_info is None:
+                continue
+            report.append((
+                zip_ref.read(page_info),
+                [zip_ref.read(visuais[v]) for v in sorted(visuais)] if tem_visuals else None
+            ))
+    
+    return {'tmdl': tmdl, 'report': report}
+
+def build_page_index(df_st):
+    """
+    Sparse page x measure incidence index over the (Página, Visual, Tabela, Medida)
+    long table, built once per upload:
+    - 'paginas' / 'medidas': sorted names; 'page_ids' / 'measure_ids': name -> id
+    - 'pares': distinct (Página, Medida) rows, sorted
+    - 'medidas_por_pagina' / 'paginas_por_medida': CSR (indptr, indices) pairs
+    """
+    paginas = sorted(df_st['Página'].unique())
+    pares = (df_st.loc[df_st['Medida'].notna(), ['Página', 'Medida']]
+             .drop_duplicates().sort_values(['Página', 'Medida'], ignore_index=True))
+    medidas = sorted(pares['Medida'].unique())
+    page_ids = {pagina: i for i, pagina in enumerate(paginas)}
+    measure_ids = {medida: i for i, medida in enumerate(medidas)}
+    p = pares['Página'].map(page_ids).to_numpy(np.int32)
+    m = pares['Medida'].map(measure_ids).to_numpy(np.int32)
+    return {
+        'paginas': paginas,
+        'medidas': medidas,
+        'page_ids': page_ids,
+        'measure_ids': measure_ids,
+        'pares': pares,
+        'medidas_por_pagina': _csr(p, m, len(paginas)),
+        'paginas_por_medida': _csr(m, p, len(medidas))
+    }
+
+def measures_on_page(page_index, pagina):
+    """Distinct measures used on a page, sorted (O(k) slice of the CSR)."""
+    page_id = page_index['page_ids'].get(pagina)
+    if page_id is None:
+        return []
+    indptr, indices = page_index['medidas_por_pagina']
+    medidas = page_index['medidas']
+    return [medidas[i] for i in indices[indptr[page_id]:indptr[page_id + 1]].tolist()]
+
+def build_page_stats(page_index, df_complexidade, dependentes_count):
+    """
+    Per-page analytics in one vectorized pass over the (Página, Medida) pairs:
+    distinct measures, mean complexity score, most complex measure and most
+    reused measure (ties -> first measure name in alphabetical order, whatever
+    the visual order). Shared by the dashboard and both reports. Measures
+    without a score / dependents count as 0.
+    """
+    pares = page_index['pares']
+    score_por_medida = pd.Series(df_complexidade['score'].to_numpy(), index=df_complexidade['medida'].to_numpy())
+    pares = pares.assign(
+        score=pares['Medida'].map(score_por_medida).fillna(0).astype(np.int64),
+        dependentes=pares['Medida'].map(dependentes_count).fillna(0).astype(np.int64)
+    )
+    
+    agregado = pares.groupby('Página', sort=True).agg(total=('Medida', 'size'), media=('score', 'mean'))
+    
+    def _topo(coluna):
+        # Maior valor por página; empate -> primeira medida em ordem alfabética
+        ordenado = pares.sort_values(['Página', coluna, 'Medida'], ascending=[True, False, True], kind='stable')
+        return ordenado.drop_duplicates('Página').set_index('Página').reindex(agregado.index)
+    
+    top_c = _topo('score')
+    top_d = _topo('dependentes')
+    return pd.DataFrame({
+        'Página': agregado.index,
+        'Total de Medidas': agregado['total'].to_numpy(),
+        'Complexidade Média': agregado['media'].round(1).to_numpy(),
+        'Medida Mais Complexa': top_c['Medida'].to_numpy(),
+        'Score Máximo': top_c['score'].to_numpy(),
+        'Medida Mais Reutilizada': top_d['Medida'].to_numpy(),
+        'Dependentes': top_d['dependentes'].to_numpy(),
+        'Top Complexidade': (top_c['Medida'] + " (Score: " + top_c['score'].astype(str) + ")").to_numpy(),
+        'Top Dependências': (top_d['Medida'] + " (" + top_d['dependentes'].astype(str) + " dependentes)").to_numpy()
+    })
+
+def pages_using(page_index, medidas_consulta):
+    """Sorted pages where ANY of the given measures appears in a visual."""
+    indptr, indices = page_index['paginas_por_medida']
+    page_ids = set()
+    for medida in medidas_consulta:
+        measure_id = page_index['measure_ids'].get(medida)
+        if measure_id is not None:
+            page_ids.update(indices[indptr[measure_id]:indptr[measure_id + 1]].tolist())
+    paginas = page_index['paginas']
+    return [paginas[i] for i in sorted(page_ids)]
+
+# --- COMPARAÇÃO ENTRE VERSÕES (DIFF) ---
+DIFF_STATUS = ['Adicionada', 'Removida', 'Alterada', 'Afetada']
+
+def _measure_hashes(nodes):
+    # Hash de 64 bits da expressão de cada medida, indexado pelo nome
+    medidas = nodes[(nodes['type'] == 'MEASURE').to_numpy()]
+    hashes = pd.util.hash_pandas_object(medidas['expression'].fillna(''), index=False).to_numpy()
+    return pd.Series(hashes, index=pd.Index(medidas['name'].to_numpy()))
+
+def _csr_neighbors(indptr, indices, frontier):
+    # Vizinhos de todos os nós da fronteira de uma vez (fatias CSR concatenadas)
+    inicio = indptr[frontier]
+    tamanhos = indptr[frontier + 1] - inicio
+    total = int(tamanhos.sum())
+    if not total:
+        return indices[:0]
+    return indices[np.repeat(inicio - (np.cumsum(tamanhos) - tamanhos), tamanhos) + np.arange(total)]
+
+def _union_adjacency(anterior, atual):
+    """Adjacency index over the union of the nodes and edges of two stores."""
+    (nodes_a, edges_a), (nodes_b, edges_b) = anterior, atual
+    nodes = pd.concat([nodes_b[['name', 'type']], nodes_a[['name', 'type']]], ignore_index=True)
+    nodes = nodes.drop_duplicates('name', ignore_index=True)  # A versão atual prevalece
+    ids = pd.Index(nodes['name'])
+    map_a = ids.get_indexer(nodes_a['name'])
+    map_b = ids.get_indexer(nodes_b['name'])
+    src = np.concatenate([map_b[edges_b['src'].to_numpy()], map_a[edges_a['src'].to_numpy()]])
+    dst = np.concatenate([map_b[edges_b['dst'].to_numpy()], map_a[edges_a['dst'].to_numpy()]])
+    pares = np.unique(np.column_stack([src, dst]), axis=0)
+    edges = pd.DataFrame({'src': pares[:, 0].astype(np.int32), 'dst': pares[:, 1].astype(np.int32)})
+    return build_adjacency_index(nodes, edges)
+
+def diff_models(anterior, atual, paginas_anterior=None, paginas_atual=None):
+    """
+    Compare two versions of a model.
+    anterior/atual: (nodes, edges) from build_dependency_store;
+    paginas_*: build_page_index of each version's report, or None.
+    Measures are matched by name and compared by a hash of their expression
+    (linear in the number of measures). Changes are propagated to their
+    transitive dependents with one multi-source BFS over an adjacency index
+    shared by both versions, so dependents of removed measures are found too.
+    Returns {'medidas': DataFrame [Medida, Status], 'paginas': DataFrame
+    [Página, Medidas Afetadas, Medidas]} with Status in DIFF_STATUS.
+    """
+    hash_a, hash_b = _measure_hashes(anterior[0]), _measure_hashes(atual[0])
+    comuns = hash_b.index.intersection(hash_a.index)
+    status = {}
+    status.update(dict.fromkeys(hash_b.index.difference(hash_a.index), 'Adicionada'))
+    status.update(dict.fromkeys(hash_a.index.difference(hash_b.index), 'Removida'))
+    status.update(dict.fromkeys(comuns[hash_a[comuns].to_numpy() != hash_b[comuns].to_numpy()], 'Alterada'))
+    
+    # Dependentes transitivos das mudanças (BFS por camadas sobre o grafo unido)
+    adjacency = _union_adjacency(anterior, atual)
+    indptr, indices = adjacency['dependentes']
+    visitados = np.zeros(len(adjacency['names']), dtype=bool)
+    fronteira = np.array([adjacency['ids'][m] for m in status], dtype=np.int64)
+    visitados[fronteira] = True
+    while len(fronteira):
+        vizinhos = np.unique(_csr_neighbors(indptr, indices, fronteira))
+        fronteira = vizinhos[~visitados[vizinhos]]
+        visitados[fronteira] = True
+    names = adjacency['names']
+    for node_id in np.flatnonzero(visitados & (adjacency['types'] == 'MEASURE')).tolist():
+        status.setdefault(names[node_id], 'Afetada')
+    
+    df_medidas = pd.DataFrame({'Medida': list(status), 'Status': pd.Categorical(list(status.values()), categories=DIFF_STATUS, ordered=True)})
+    df_medidas = df_medidas.sort_values(['Status', 'Medida'], ignore_index=True)
+    
+    # Páginas: removidas pelo relatório anterior, as demais pelo atual
+    removidas = set(df_medidas.loc[df_medidas['Status'] == 'Removida', 'Medida'])
+    pares = []
+    if paginas_atual is not None:
+        pares.append(paginas_atual['pares'][paginas_atual['pares']['Medida'].isin(status.keys() - removidas)])
+    if paginas_anterior is not None:
+        pares.append(paginas_anterior['pares'][paginas_anterior['pares']['Medida'].isin(removidas)])
+    pares = pd.concat(pares, ignore_index=True).drop_duplicates() if pares else pd.DataFrame(columns=['Página', 'Medida'])
+    df_paginas = (pares.sort_values(['Página', 'Medida'])
+                  .groupby('Página', sort=True)['Medida']
+                  .agg(**{'Medidas Afetadas': 'size', 'Medidas': ', '.join})
+                  .reset_index())
+    return {'medidas': df_medidas, 'paginas': df_paginas}
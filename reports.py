@@ -0,0 +1,248 @@
+"""
+Relatórios para download (TXT e Excel) da Análise Global.
+
+Não depende de Streamlit; o openpyxl só é importado quando um Excel é gerado.
+"""
+import numpy as np
+from io import BytesIO
+
+from engine import COMPLEXITY_COLUMNS, measures_on_page
+
+def gerar_relatorio_texto(metricas, medidas_orfas, medidas_impacto, top_complexas=None, page_index=None, page_stats=None):
+    """
+    Gera relatório em texto para download (MELHORIA 24).
+    top_complexas: DataFrame de calcular_complexity_scores; page_stats: DataFrame de build_page_stats.
+    """
+    
+    # Formatar lista de medidas complexas
+    secao_complexidade = ""
+    if top_complexas is not None and not top_complexas.empty:
+        top10 = top_complexas.sort_values('score', ascending=False, kind='stable').head(10)
+        lista_formatada = chr(10).join(
+            f"  • {m.medida} (Score: {m.score} - {m.classificacao}) "
+            f"[D1 {m.d1_funcoes} | D2 {m.d2_contexto} | D3 {m.d3_estrutura} | D4 {m.d4_dependencias} | D5 {m.d5_antipatterns}]"
+            for m in top10.itertuples(index=False)
+        )
+        secao_complexidade = f"""
+🔥 TOP 10 MEDIDAS MAIS COMPLEXAS (CRÍTICAS)
+────────────────────────────────────────────────────────────
+{lista_formatada}
+"""
+
+    # Formatar lista de medidas por página
+    secao_paginas = ""
+    if page_index is not None and page_stats is not None:
+        paginas_info = []
+        for pagina, total, media, top_c, top_d in zip(page_stats['Página'], page_stats['Total de Medidas'].tolist(), page_stats['Complexidade Média'].tolist(),
+                                                      page_stats['Top Complexidade'], page_stats['Top Dependências']):
+            lista_medidas = chr(10).join(f"    - {m}" for m in measures_on_page(page_index, pagina))
+            resumo = f"   {total} medidas | Complexidade média: {media} | Mais complexa: {top_c} | Mais reutilizada: {top_d}"
+            paginas_info.append(f"📄 Página: {pagina}\n{resumo}\n{lista_medidas}")
+        
+        if paginas_info:
+            secao_paginas = f"""
+📑 MEDIDAS POR PÁGINA
+────────────────────────────────────────────────────────────
+{chr(10).join(paginas_info)}
+"""
+
+    relatorio = f"""═══════════════════════════════════════════════════════════
+            RELATÓRIO DE DEPENDÊNCIAS DAX - POWER BI
+═══════════════════════════════════════════════════════════
+
+📊 MÉTRICAS GERAIS
+────────────────────────────────────────────────────────────
+Objetos no Modelo: {metricas.get('objetos', 0)}
+Nós no Grafo: {metricas.get('nos', 0)}
+Relacionamentos: {metricas.get('relacionamentos', 0)}
+Medidas para Descarte: {metricas.get('orfas', 0)}
+Impacto Total: {metricas.get('impacto', 0)}
+{secao_complexidade}{secao_paginas}
+⚠️ SUGESTÃO DE DESCARTE SEGURO ({len(medidas_orfas)})
+────────────────────────────────────────────────────────────
+O que são estas Medidas?
+Estas medidas foram identificadas como candidatas a descarte pois:
+1. NÃO são referenciadas por nenhuma outra medida (DAX).
+2. NÃO foram encontradas em nenhum visual ou página do relatório.
+
+Lista de Medidas para Descarte:
+{chr(10).join(f"  • {m}" for m in sorted(list(medidas_orfas))) if medidas_orfas else "  Nenhuma medida desnecessária encontrada!"}
+
+📊 ANÁLISE DE IMPACTO
+────────────────────────────────────────────────────────────
+{chr(10).join(f"  • {m['medida']}: {m['impacto']} objetos dependentes" for m in medidas_impacto) if medidas_impacto else "  Nenhuma medida selecionada"}
+
+═══════════════════════════════════════════════════════════
+Relatório gerado automaticamente
+═══════════════════════════════════════════════════════════
+"""
+    return relatorio
+
+_EXCEL_FAIXAS = {'vermelho': "FF4444", 'laranja': "FF9800", 'amarelo': "FFC107", 'verde': "4CAF50"}
+
+def _excel_named_styles():
+    """
+    Named styles shared by every cell of the Excel report: one style object per
+    look, referenced by name, instead of new Font/PatternFill objects per row.
+    """
+    from openpyxl.styles import Font, PatternFill, Alignment, Border, NamedStyle, Side
+
+    border = Border(
+        left=Side(style='thin', color='D0D0D0'),
+        right=Side(style='thin', color='D0D0D0'),
+        top=Side(style='thin', color='D0D0D0'),
+        bottom=Side(style='thin', color='D0D0D0')
+    )
+    center_align = Alignment(horizontal='center', vertical='center')
+    estilos = [
+        NamedStyle(name='pbi_titulo', font=Font(bold=True, size=16, color="2E5090", name='Segoe UI'), alignment=center_align),
+        NamedStyle(name='pbi_secao', font=Font(bold=True, size=12, color="2E5090", name='Segoe UI')),
+        NamedStyle(name='pbi_header', font=Font(bold=True, color="FFFFFF", size=12, name='Segoe UI'),
+                   fill=PatternFill(start_color="2E5090", end_color="2E5090", fill_type="solid"), border=border, alignment=center_align),
+        NamedStyle(name='pbi_cell', font=Font(size=10, name='Segoe UI'), border=border, alignment=Alignment(vertical='center')),
+        NamedStyle(name='pbi_cell_center', font=Font(size=10, name='Segoe UI'), border=border, alignment=center_align),
+    ]
+    # Destaques por faixa (score / impacto): vermelho, laranja, amarelo, verde
+    for nome, cor in _EXCEL_FAIXAS.items():
+        estilos.append(NamedStyle(
+            name=f'pbi_{nome}', font=Font(bold=True, color="FFFFFF", size=10, name='Segoe UI'),
+            fill=PatternFill(start_color=cor, end_color=cor, fill_type="solid"), border=border, alignment=center_align
+        ))
+    return estilos
+
+def _faixa_score(score_val):
+    if score_val >= 80:
+        return 'pbi_vermelho'
+    elif score_val >= 60:
+        return 'pbi_laranja'
+    elif score_val >= 40:
+        return 'pbi_amarelo'
+    return 'pbi_verde'
+
+def _faixa_impacto(deps_count):
+    if deps_count >= 20:
+        return "🔴 Crítico", 'pbi_vermelho'
+    elif deps_count >= 10:
+        return "🟠 Alto", 'pbi_laranja'
+    elif deps_count >= 5:
+        return "🟡 Médio", 'pbi_amarelo'
+    return "🟢 Baixo", 'pbi_verde'
+
+def _xl_row(ws, valores_estilos):
+    """Build a write-only row from (value, named style) pairs."""
+    from openpyxl.cell import WriteOnlyCell
+    linha = []
+    for valor, estilo in valores_estilos:
+        cell = WriteOnlyCell(ws, value=valor)
+        cell.style = estilo
+        linha.append(cell)
+    return linha
+
+def _xl_sheet(wb, titulo, larguras):
+    # Em modo write-only, larguras e grade precisam ser definidas antes das linhas
+    ws = wb.create_sheet(titulo)
+    for col_letter, largura in larguras.items():
+        ws.column_dimensions[col_letter].width = largura
+    ws.sheet_view.showGridLines = False
+    return ws
+
+def gerar_relatorio_excel(metricas, df_complexidade, candidatas_descarte, page_stats, global_dependentes_count, info_map):
+    """
+    Gera relatório Excel profissional com múltiplas abas formatadas.
+    
+    Uses a write-only (streaming) workbook: rows are flushed to disk as they
+    are appended, so memory does not grow with the number of measures.
+    Rows come straight from the columns of df_complexidade.
+    """
+    from openpyxl import Workbook
+
+    output = BytesIO()
+    wb = Workbook(write_only=True)
+    for estilo in _excel_named_styles():
+        wb.add_named_style(estilo)
+    
+    scores = df_complexidade['score'].to_numpy()
+    
+    # === ABA 1: RESUMO EXECUTIVO ===
+    ws_resumo = _xl_sheet(wb, "📊 Resumo Executivo", {'A': 30, 'B': 20, 'C': 50})
+    
+    # Título principal
+    ws_resumo.merged_cells.add('A1:D1')
+    ws_resumo.row_dimensions[1].height = 30
+    ws_resumo.append(_xl_row(ws_resumo, [("ANÁLISE DE DEPENDÊNCIAS DAX - POWER BI", 'pbi_titulo')]))
+    ws_resumo.append([])
+    
+    # Métricas principais
+    ws_resumo.merged_cells.add('A3:D3')
+    ws_resumo.append(_xl_row(ws_resumo, [("MÉTRICAS GERAIS", 'pbi_secao')]))
+    
+    ws_resumo.append(_xl_row(ws_resumo, [(h, 'pbi_header') for h in ['Métrica', 'Valor', 'Descrição']]))
+    metrics_data = [
+        ['Objetos no Modelo', metricas.get('objetos', 0), 'Total de medidas, colunas e tabelas'],
+        ['Relacionamentos', metricas.get('relacionamentos', 0), 'Dependências DAX mapeadas'],
+        ['Medidas para Descarte', metricas.get('orfas', 0), 'Não usadas em fórmulas ou visuais'],
+        ['Complexidade Média', f"{round(float(scores.mean()), 1) if len(scores) else 0}/100", 'Score médio de todas as medidas']
+    ]
+    for metrica, valor, descricao in metrics_data:
+        ws_resumo.append(_xl_row(ws_resumo, [(metrica, 'pbi_cell'), (valor, 'pbi_cell_center'), (descricao, 'pbi_cell')]))
+    
+    # === ABA 2: RANKING DE COMPLEXIDADE ===
+    ws_complex = _xl_sheet(wb, "🔥 Complexidade", {'A': 12, 'B': 45, 'C': 15, 'D': 20, 'E': 16, 'F': 16, 'G': 16, 'H': 16, 'I': 16})
+    
+    headers = ['Posição', 'Medida', 'Score', 'Classificação', 'D1 Funções', 'D2 Contexto', 'D3 Estrutura', 'D4 Dependências', 'D5 Anti-patterns']
+    ws_complex.append(_xl_row(ws_complex, [(h, 'pbi_header') for h in headers]))
+    
+    ordem = np.argsort(-scores, kind='stable')
+    # Remover emojis da classificação (apenas texto), uma vez por categoria
+    classificacao_texto = df_complexidade['classificacao'].astype(str).str.split(' ').str[-1].to_numpy()
+    colunas = [df_complexidade['medida'].to_numpy(), scores, classificacao_texto] + [df_complexidade[c].to_numpy() for c in COMPLEXITY_COLUMNS[3:]]
+    for posicao, i in enumerate(ordem, start=1):
+        medida, score_val, classificacao, *dims = (col[i] for col in colunas)
+        ws_complex.append(_xl_row(ws_complex, [
+            (posicao, 'pbi_cell_center'),
+            (medida, 'pbi_cell'),
+            (int(score_val), _faixa_score(score_val)),  # Formatação condicional por score
+            (classificacao, 'pbi_cell_center'),
+            *((int(d), 'pbi_cell_center') for d in dims)
+        ]))
+    
+    # === ABA 3: DESCARTE SEGURO ===
+    ws_trash = _xl_sheet(wb, "🗑️ Descarte Seguro", {'A': 50, 'B': 15, 'C': 25})
+    
+    score_map = dict(zip(df_complexidade['medida'], scores.tolist()))
+    trash_data = sorted(
+        ((m, score_map.get(m, 0)) for m in candidatas_descarte),
+        key=lambda x: x[1],
+        reverse=True
+    )
+    
+    ws_trash.append(_xl_row(ws_trash, [(h, 'pbi_header') for h in ['Medida', 'Complexidade', 'Status']]))
+    for medida, score_val in trash_data:
+        ws_trash.append(_xl_row(ws_trash, [(medida, 'pbi_cell'), (score_val, 'pbi_cell_center'), ('✅ Seguro para deletar', 'pbi_cell_center')]))
+    
+    # === ABA 4: MEDIDAS POR PÁGINA ===
+    if page_stats is not None:
+        ws_pages = _xl_sheet(wb, "📄 Por Página", {'A': 40, 'B': 20, 'C': 22, 'D': 45, 'E': 45})
+        ws_pages.append(_xl_row(ws_pages, [(h, 'pbi_header') for h in ['Página', 'Total de Medidas', 'Complexidade Média', 'Mais Complexa', 'Mais Reutilizada']]))
+        
+        for page, total, media, top_c, top_d in zip(page_stats['Página'], page_stats['Total de Medidas'].tolist(), page_stats['Complexidade Média'].tolist(),
+                                                    page_stats['Top Complexidade'], page_stats['Top Dependências']):
+            ws_pages.append(_xl_row(ws_pages, [(page, 'pbi_cell'), (total, 'pbi_cell_center'), (media, 'pbi_cell_center'), (top_c, 'pbi_cell'), (top_d, 'pbi_cell')]))
+    
+    # === ABA 5: TOP DEPENDÊNCIAS ===
+    ws_deps = _xl_sheet(wb, "🔗 Top Dependências", {'A': 12, 'B': 50, 'C': 20, 'D': 18})
+    
+    deps_data = sorted(
+        ((m, global_dependentes_count.get(m, 0)) for m, info in info_map.items() if info.get('tipo') == 'MEASURE'),
+        key=lambda x: x[1],
+        reverse=True
+    )[:50]  # Top 50
+    
+    ws_deps.append(_xl_row(ws_deps, [(h, 'pbi_header') for h in ['Posição', 'Medida', 'Nº de Dependentes', 'Impacto']]))
+    for posicao, (medida, deps_count) in enumerate(deps_data, start=1):
+        impact, estilo = _faixa_impacto(deps_count)  # Classificar impacto
+        ws_deps.append(_xl_row(ws_deps, [(posicao, 'pbi_cell_center'), (medida, 'pbi_cell'), (deps_count, 'pbi_cell_center'), (impact, estilo)]))
+    
+    # Salvar
+    wb.save(output)
+    return output.getvalue()
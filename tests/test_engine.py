@@ -0,0 +1,78 @@
+"""
+Testes do motor de análise (engine.py) que fixam regras de negócio.
+
+Uso: python -m pytest tests
+"""
+import sys
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import engine  # noqa: E402
+
+
+def _page_index(linhas):
+    return engine.build_page_index(pd.DataFrame(linhas, columns=['Página', 'Visual', 'Tabela', 'Medida']))
+
+
+def test_page_stats_ties_go_to_first_measure_name():
+    # Visual com 'Zeta' antes de 'Alfa': o empate não depende da ordem dos visuais
+    page_index = _page_index([
+        ('Página 1', 'v1', 'T', 'Zeta'),
+        ('Página 1', 'v2', 'T', 'Alfa'),
+        ('Página 1', 'v3', 'T', 'Beta'),
+    ])
+    scores = pd.DataFrame({'medida': ['Zeta', 'Alfa', 'Beta'], 'score': [50, 50, 10]})
+    stats = engine.build_page_stats(page_index, scores, {'Zeta': 3, 'Alfa': 1, 'Beta': 3})
+
+    linha = stats.iloc[0]
+    assert linha['Medida Mais Complexa'] == 'Alfa'
+    assert linha['Score Máximo'] == 50
+    assert linha['Medida Mais Reutilizada'] == 'Beta'
+    assert linha['Dependentes'] == 3
+
+
+def _dependency_store(tmdl):
+    return engine.build_dependency_store([tmdl.encode('utf-8')], max_workers=1)
+
+
+def test_orphan_measures_are_the_ones_no_measure_references():
+    nodes, edges = _dependency_store(
+        "table Vendas\n"
+        "\tmeasure Base = SUM(Vendas[Valor])\n"
+        "\tmeasure Total = [Base] * 2\n"
+        "\tmeasure Isolada = [Base] + 1\n"
+        "\tmeasure Constante = 1\n"
+        "\tcolumn Valor\n"
+        "\t\tdataType: decimal\n"
+    )
+    # Base é referenciada por outras medidas e Total está em um visual; Isolada
+    # referencia Base, mas nenhuma medida a referencia
+    assert engine.find_orphan_measures(nodes, edges, {'Total'}) == {'Isolada', 'Constante'}
+
+
+def test_table_reference_allows_space_before_bracket():
+    assert engine.scan_dax_references("SUM ( Sales [Amount] )") == [('Sales', 'Amount')]
+    assert engine.scan_dax_references("SUM('Sales' [Amount])") == [('Sales', 'Amount')]
+
+
+def test_references_and_score_share_one_identifier_rule():
+    # Identificador com acento: mesma leitura para o grafo e para o score
+    expressao = "SUMX(Preço, Preço[Valor] * 2)"
+    assert engine.scan_dax_references(expressao) == [('Preço', None), ('Preço', 'Valor')]
+    score = engine.calcular_complexity_scores([('m', expressao)]).iloc[0]
+    assert score['d1_funcoes'] == 8
+
+
+def test_dependents_count_only_measure_references():
+    nodes, edges = _dependency_store(
+        "table Vendas\n"
+        "\tmeasure Base = SUM(Vendas[Valor])\n"
+        "\tmeasure Total = [Base] * 2 + COUNTROWS(Vendas)\n"
+        "\tcolumn Valor\n"
+        "\t\tdataType: decimal\n"
+    )
+    # A coluna e a tabela usadas não contam como dependências no D4
+    assert engine.count_measure_dependents(nodes, edges) == {'Total': 1}